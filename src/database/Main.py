@@ -1,46 +1,108 @@
 """Pipeline entry point for rebuilding local restaurant menus.
 
 This script orchestrates the end-to-end flow:
-1) Ensure `Restaurant_List.txt` exists (or prompt the user and create it).
+1) Ensure the restaurant registry (or `Restaurant_List.txt`) exists, or prompt the user and create it.
 2) Ensure `URL_List.txt` exists (or query and create it).
-3) Fetch and store cleaned text snapshots for each restaurant page.
-4) Ask the LLM to reconstruct menus from snapshots and write CSVs.
+3) Fetch cleaned text snapshots for each restaurant page into the snapshot store.
+4) Ask the LLM to reconstruct menus from snapshots and write CSVs (one call per distinct snapshot).
 5) Load all CSVs into a local SQLite database via `sqlite_connection.upload_data`.
 
 Folders & files under `relative_path` (default `src\\database\\`):
-- Raw_Website_Content\\ : text snapshots per restaurant
 - Menu_CSVs\\           : LLM-recreated menu rows as CSV (no header)
-- Restaurant_List.txt   : comma-separated restaurant names
+- Restaurant_List.txt   : comma-separated restaurant names (export of the registry)
+- restaurants_raleigh.db: `restaurant_registry` (see `restaurant_registry`), `restaurants` and `menu_items`
+                          (read through the `local_menu` view; see `sqlite_connection`)
 - URL_List.txt          : comma-separated source URLs
+- build_manifest.db     : per-restaurant URL, hashes and stage timestamps (see `manifest`)
+- snapshot_store.db     : compressed, deduplicated text snapshots with history (see `snapshot_store`)
+- llm_usage.db         : tokens, latency and text size of every LLM call (see `llm_usage`)
+
+Runs are incremental: the manifest lets a rerun skip pages fetched within
+`--refresh-hours`, menus whose snapshot is unchanged and CSVs already loaded, so a
+crashed run resumes at the restaurant that failed. `--force STAGE` (url, fetch,
+menu, load; repeatable) redoes a stage regardless.
+
+Pass `--mode concurrent` to overlap the network-bound stages; each stage then runs
+with its own concurrency limit (`--url-workers`, `--fetch-workers`, `--llm-workers`)
+and a per-stage throughput report is printed at the end. Downloaded pages are
+parsed on a process pool (`--parse-workers`, one per core by default), and menus
+are rebuilt with concurrent async LLM requests, each cancelled after `--llm-timeout`.
+
+Pass `--mode streaming` to push each restaurant through fetch -> extract -> LLM ->
+database insert on its own, connected by bounded queues (`--queue-size`). Menus are
+inserted as soon as they are ready and no snapshot or CSV files are written. Add
+`--structured` to request schema-constrained JSON rows and insert each row while the
+completion is still streaming in (see `menu_stream`).
+
+Every LLM call's tokens and latency are logged to `llm_usage.db` (see `llm_usage`) and
+summarized at the end of the run. `--token-budget N` stops starting new LLM
+extractions once the run has used N tokens; the remaining menus are left for the next run.
 """
 import os
+import shutil
+import threading
+import time
+import argparse
+import requests
 import google_tools
 import html_tools
 import menu_recreator
-import time
+import menu_pruner
+import menu_parser
+import menu_batch
+import menu_stream
+import llm_usage
 import sqlite_connection
+import executor
+import url_resolver
+import streaming
+import manifest
+import response_cache
+import restaurant_registry
+import parse_pool
+import snapshot_store
+
+# Per-stage timings (`executor.StageStats`) collected for the end-of-run report.
+stage_stats = []
 
 
 def create_restaurant_list():
-    """Prompt for cuisines & location and generate `Restaurant_List.txt`.
+    """Prompt for cuisines & location and fill the restaurant registry.
 
-    Uses :func:`google_tools.restaurant_search` to build a de-duplicated list of
-    restaurant names and saves it under `relative_path`.
+    Uses :func:`google_tools.restaurant_search` to register de-duplicated places in
+    `restaurants_raleigh.db` and export their names to `Restaurant_List.txt`.
     """
     cuisines = input("Enter Cuisines as a Comma-Separated List: ")
     cuisine_list = cuisines.split(",")
     location = input("Where would you like to search: ")
-    google_tools.restaurant_search(cuisine_list, location)
+    google_tools.restaurant_search(cuisine_list, location, db_path=relative_path+"restaurants_raleigh.db")
+
+
+def registered_restaurants():
+    """Return the names in the restaurant registry (empty if it was never filled)."""
+    conn = sqlite_connection.connect_db(f"{relative_path}restaurants_raleigh.db")
+    try:
+        restaurant_registry.create_registry_tables(conn)
+        return restaurant_registry.restaurant_names(conn)
+    finally:
+        conn.close()
 
 
 def open_restaurant_list():
-    """Load `Restaurant_List.txt`, creating it on demand if missing.
+    """Load the restaurant names, creating the list on demand if missing.
+
+    The registry in `restaurants_raleigh.db` is preferred; `Restaurant_List.txt` is
+    still read for builds that predate it.
 
     Returns
     -------
     list[str]
-        The restaurant names parsed from the file.
+        The restaurant names.
     """
+    restaurant_list = registered_restaurants()
+    if restaurant_list:
+        print("✅ Restaurant Registry Detected")
+        return restaurant_list
     try:
         with open(relative_path+"Restaurant_List.txt", "r", encoding="utf-8") as f:
             restaurant_list = f.read().split(",")
@@ -54,70 +116,226 @@ def open_restaurant_list():
             return restaurant_list
 
 
-def create_url_list():
+def menu_query(restaurant):
+    """Return the Custom Search query used to find a restaurant's menu."""
+    return f"{restaurant}-Raleigh Menu"
+
+
+def resolve_query(query):
+    """Return the top Google Custom Search link for `query`."""
+    payload = google_tools.build_payload(query, start=1, num=1)
+    return google_tools.send_payload(payload)
+
+
+def record_url_result(restaurant, url, error):
+    """Persist one resolved (or failed) restaurant to the manifest as soon as it finishes."""
+    if error is None:
+        build_manifest.record_url(restaurant, url)
+    else:
+        print(f"⚠️ No URL for {restaurant}: {error}")
+        build_manifest.record_url_failure(restaurant, error)
+
+
+def create_url_list(workers=1, restaurants=None):
     """Resolve each restaurant into a likely menu URL and save `URL_List.txt`.
 
     Under the hood:
-    - For each restaurant name, calls Google Custom Search for a `{name}-Raleigh Menu` query.
+    - Restaurants that already have a URL in the manifest are reused (unless `--force url`);
+      with `restaurants`, exactly those are looked up again.
+    - The rest go to :func:`url_resolver.resolve_urls`, which runs up to `workers`
+      Custom Search lookups at once for `{name}-Raleigh Menu`, sends duplicate
+      queries only once, and records each result in the manifest as it arrives.
+    - A failed lookup is logged and left blank instead of aborting the run.
     - Keeps only the top link for speed/cost.
-    - Writes a comma-separated list of URLs for later reuse.
+    - Stores the URLs in the restaurant registry and writes a comma-separated
+      list of URLs (in `restaurant_list` order) for later reuse.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Maximum number of concurrent Custom Search requests, by default 1.
+    restaurants : list[str], optional
+        Restaurants to resolve; by default every one without a URL.
     """
-    url_list = []
     # Generate and collect new URLs
-    for restaurant in restaurant_list:
-        query = f"{restaurant}-Raleigh Menu"
-        payload = google_tools.build_payload(query, start=1, num=1)
-        url = google_tools.send_payload(payload)
-        url_list.append(url)
+    pending = restaurants
+    if pending is None:
+        pending = [r for r in restaurant_list if "url" in force or not build_manifest.get(r).get("url")]
+    _, failures, stats = url_resolver.resolve_urls(pending, menu_query, resolve_query, workers, record_url_result)
+    stage_stats.append(stats)
+    if failures:
+        print(f"⚠️ {len(failures)} of {len(pending)} URL lookups failed; rerun to retry them.")
+    url_list = [build_manifest.get(r).get("url") or "" for r in restaurant_list]
+    conn = sqlite_connection.connect_db(f"{relative_path}restaurants_raleigh.db")
+    try:
+        restaurant_registry.create_registry_tables(conn)
+        restaurant_registry.set_urls(conn, {r: u for r, u in zip(restaurant_list, url_list) if u})
+    finally:
+        conn.close()
     # Save URLs to txt file to make subsequent runs faster and cheaper
     with open(relative_path+"URL_List.txt", "w", encoding="utf-8") as file:
         file.write(",".join(url_list))
 
 
-def open_url_list():
+def open_url_list(workers=1):
     """Load `URL_List.txt`, creating it on demand if missing.
 
+    Entries left blank, or whose lookup failed last time (a `url_error` in the
+    manifest), are resolved again and the file rewritten.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Concurrency limit passed to :func:`create_url_list`, by default 1.
+
     Returns
     -------
     list[str]
         A list of candidate menu-page URLs (comma separated in the file).
     """
+    if "url" in force:
+        create_url_list(workers)
     try:
         with open(relative_path+"URL_List.txt", "r", encoding="utf-8") as file:
             content = file.read().strip()
             url_list = content.split(",")
             print("✅ URL List Detected.")
-            return url_list
     except FileNotFoundError:
-        create_url_list()
+        create_url_list(workers)
         with open(relative_path+"URL_List.txt", "r", encoding="utf-8") as f:
             url_list = f.read().split(",")
             print("✅ URL List Created")
-            return url_list
+        return url_list
+    # Keep the manifest in sync with hand edits to URL_List.txt
+    for restaurant, url in zip(restaurant_list, url_list):
+        if url and build_manifest.get(restaurant).get("url") != url:
+            build_manifest.record_url(restaurant, url)
+    if "url" not in force:
+        url_list += [""] * (len(restaurant_list) - len(url_list))
+        retry = [r for r, url in zip(restaurant_list, url_list) if not url or build_manifest.get(r).get("url_error")]
+        if retry:
+            print(f"🔁 Retrying {len(retry)} URL lookups that were blank or failed.")
+            create_url_list(workers, retry)
+            with open(relative_path+"URL_List.txt", "r", encoding="utf-8") as f:
+                url_list = f.read().split(",")
+    return url_list
 
 
-def make_website_content_folder():
-    """Create the snapshot folder for raw website content if needed.
+def save_snapshot(job):
+    """Fetch one `(restaurant_name, url)` pair and store its text snapshot.
 
-    Uses the path configured in `content_folder_path`.
+    Skipped when the snapshot exists and was fetched within `refresh_hours`
+    (unless `--force fetch`). Otherwise the page is re-fetched conditionally with
+    the validators stored in the manifest, so an unchanged page is neither parsed
+    nor rewritten and keeps its snapshot hash (and therefore its menu and load).
     """
+    plan = plan_snapshot(job)
+    if plan is None:
+        return
+    restaurant_name, url, output_file, validators = plan
+    status, fresh = html_tools.refresh_content(url, output_file, validators)
+    record_snapshot_result(restaurant_name, status, fresh)
+
+
+def plan_snapshot(job):
+    """Decide whether a `(restaurant_name, url)` pair needs fetching.
+
+    Returns
+    -------
+    tuple[str, str, snapshot_store.StoreSink, dict | None] | None
+        `(restaurant_name, url, output_file, validators)`, or None when there is no
+        URL or the snapshot is still fresh. `output_file` stores the snapshot text
+        in the snapshot store.
+    """
+    restaurant_name, url = job
+    if not url:
+        print(f"⚠️ No URL for {restaurant_name}; skipping fetch.")
+        return None
+    output_file = snapshot_store.StoreSink(snapshot_db_path, restaurant_name)
+    stored = snapshots.latest_hash(restaurant_name) is not None
+    if ("fetch" not in force and stored
+            and build_manifest.snapshot_is_fresh(restaurant_name, refresh_hours)):
+        print(f"⏭️ {restaurant_name} snapshot is up to date.")
+        return None
+    # Validators only describe a stored snapshot, so a missing one means a full fetch
+    validators = None
+    if "fetch" not in force and stored:
+        validators = build_manifest.validators(restaurant_name)
+    return restaurant_name, url, output_file, validators
+
+
+def record_snapshot_result(restaurant_name, status, fresh):
+    """Record a saved or unchanged snapshot (hash and HTTP validators) in the manifest."""
+    if status in ("saved", "unchanged"):
+        build_manifest.record_snapshot(restaurant_name, snapshots.latest_hash(restaurant_name))
+        build_manifest.record_validators(restaurant_name, fresh)
+
+
+def download_snapshot(job, pool):
+    """Download one `(restaurant_name, url)` pair and queue its body on `pool`.
+
+    The same skip rules as :func:`save_snapshot` apply. Parsing and writing the
+    snapshot happen in a :class:`parse_pool.ParsePool` worker; the manifest is
+    updated as soon as that worker finishes.
+
+    Returns
+    -------
+    concurrent.futures.Future | None
+        The pending extraction, or None when nothing was queued.
+    """
+    plan = plan_snapshot(job)
+    if plan is None:
+        return None
+    restaurant_name, url, output_file, validators = plan
     try:
-        os.mkdir(content_folder_path)
-        print(f"Folder '{content_folder_path}' created successfully.")
-    except FileExistsError:
-        print(f"Folder '{content_folder_path}' already exists.")
+        body, encoding, fresh = html_tools.download_body(url, validators)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+    if body is None:
+        print(f"⏭️ {output_file} unchanged since last fetch.")
+        record_snapshot_result(restaurant_name, "unchanged", fresh)
+        return None
+
+    def parsed(future):
+        try:
+            status, _ = future.result()
+        except Exception as e:
+            print(f"⚠️ Extracting {restaurant_name} failed: {e}")
+            return
+        record_snapshot_result(restaurant_name, status, fresh)
+
+    future = pool.submit(body, encoding, output_file)
+    future.add_done_callback(parsed)
+    return future
 
 
-def extract_website_content():
-    """Fetch, clean, and save text snapshots for each URL in `url_list`.
+def extract_website_content(workers=1, parse_workers=1):
+    """Fetch, clean, and store text snapshots for each URL in `url_list`.
 
-    Writes files named after the corresponding restaurant under `content_folder_path`.
+    Snapshots go to the :class:`snapshot_store.SnapshotStore` at `snapshot_db_path`.
+    With `parse_workers > 1`, fetch threads only download and the CPU-bound
+    HTML-to-text step runs on a :class:`parse_pool.ParsePool` of that many processes;
+    otherwise each fetch thread parses its own page as it streams in.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Maximum number of pages fetched at once, by default 1.
+    parse_workers : int, optional
+        Number of parsing processes, by default 1 (parse in the fetch threads).
     """
-    i = 0
-    for url in url_list:
-        restaurant_name = restaurant_list[i]
-        html_tools.extract_content(url, f"{content_folder_path}\\{restaurant_name}.txt")
-        i += 1
+    jobs = list(zip(restaurant_list, url_list))
+    if parse_workers <= 1:
+        _, stats = executor.run_stage("fetch", save_snapshot, jobs, workers)
+        stage_stats.append(stats)
+        return
+    start = time.perf_counter()
+    with parse_pool.ParsePool(parse_workers) as pool:
+        futures, stats = executor.run_stage("fetch", lambda job: download_snapshot(job, pool), jobs, workers)
+        stage_stats.append(stats)
+    parsed = sum(1 for future in futures if future is not None)
+    stage_stats.append(executor.StageStats("parse", parsed, pool.workers, time.perf_counter() - start))
 
 
 def make_csv_folder():
@@ -129,37 +347,404 @@ def make_csv_folder():
         print(f"Folder '{csv_folder_path}' already exists.")
 
 
-def create_menu():
-    """Convert each text snapshot into a structured CSV via the LLM.
+def plan_menu(group):
+    """Pick the restaurants of one `(snapshot_hash, restaurants)` group that need a new menu.
+
+    Restaurants whose existing CSV was built from this exact snapshot are skipped
+    (unless `--force menu`).
+
+    Returns
+    -------
+    tuple[str, list[str]] | None
+        `(snapshot_hash, pending_restaurants)`, or None when all menus are up to date.
+    """
+    snapshot_hash, restaurants = group
+    pending = [
+        r for r in restaurants
+        if "menu" in force or not (os.path.exists(csv_folder_path+r) and build_manifest.menu_is_current(r, snapshot_hash))
+    ]
+    if not pending:
+        print(f"⏭️ {', '.join(restaurants)} menu is up to date.")
+        return None
+    return snapshot_hash, pending
+
+
+def record_menu_result(snapshot_hash, pending, error, path="llm"):
+    """Copy a rebuilt CSV to every restaurant sharing its snapshot and record them in the manifest.
+
+    Failures are logged (not raised) so the other menus carry on. `path` is how the
+    menu was built (`"rules"` or `"llm"`).
+    """
+    if error is not None:
+        print(f"Error recreating menu for {', '.join(pending)}: {error}")
+        return
+    first_csv = csv_folder_path+pending[0]
+    csv_hash = manifest.hash_file(first_csv)
+    for restaurant in pending:
+        if restaurant != pending[0]:
+            shutil.copyfile(first_csv, csv_folder_path+restaurant)
+        build_manifest.record_menu(restaurant, snapshot_hash, csv_hash, path)
+    print("Chat has returned" if path == "llm" else f"⚡ {pending[0]} menu parsed without the LLM")
+
+
+def create_menu(workers=1, timeout=menu_recreator.DEFAULT_TIMEOUT, batch=False):
+    """Convert each stored snapshot into a structured CSV via the LLM.
 
     Under the hood:
-    - Iterates `content_folder_path` for `.txt` files.
-    - Reads the snapshot text and calls :func:`menu_recreator.recreate_menu`.
-    - Sleeps briefly to be polite and to avoid hammering the API.
-    """
-    for filename in os.listdir(content_folder_path):
-        if filename.endswith(".txt"):
-            file_path = os.path.join(content_folder_path, filename)
-            try:
-                with open(file_path, "r", encoding="utf-8") as file:
-                    content = file.read()
-                    csv_name = filename.removesuffix(".txt")
-                    menu_recreator.recreate_menu(content, csv_folder_path+csv_name)
-                    print("Chat has returned")
-                    time.sleep(3)
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+    - Groups restaurants by the hash of their latest snapshot in the snapshot store,
+      so chain locations sharing one page cost a single LLM call; the CSV is copied
+      to the rest of the group.
+    - Unless `fast_path` is off, cleanly laid-out menus are parsed locally with
+      :func:`menu_parser.confident_rows`; the manifest records which path each took.
+    - Sends the remaining snapshots through :func:`menu_recreator.recreate_menus`, which keeps
+      up to `workers` async requests in flight and cancels any that exceed `timeout`.
+    - With `batch`, submits them instead as one OpenAI Batch API job with
+      :func:`menu_batch.run_batch` and waits for it to finish.
+    - Once the `--token-budget` is spent, menus not yet started are reported as
+      failed and left for the next run.
+    - API pacing is left to the shared `"openai"` limiter in :mod:`rate_limiter`.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Maximum number of concurrent LLM calls, by default 1.
+    timeout : float, optional
+        Seconds allowed per LLM call, by default `menu_recreator.DEFAULT_TIMEOUT`.
+    batch : bool, optional
+        Use the Batch API instead of concurrent requests, by default False.
+    """
+    plans = [plan for plan in map(plan_menu, snapshots.latest_by_hash().items()) if plan is not None]
+    by_output = {csv_folder_path+pending[0]: (snapshot_hash, pending) for snapshot_hash, pending in plans}
+    jobs = []
+    for output_file, (snapshot_hash, pending) in by_output.items():
+        text = snapshots.get(snapshot_hash)
+        rows = menu_parser.confident_rows(text) if fast_path else None
+        if rows is None:
+            jobs.append((text, output_file))
+            continue
+        menu_recreator.write_menu_csv(rows, output_file)
+        record_menu_result(snapshot_hash, pending, None, "rules")
+    if by_output:
+        print(f"⚡ {len(by_output) - len(jobs)} of {len(by_output)} menus parsed without the LLM")
+
+    def on_result(output_file, error):
+        record_menu_result(*by_output[output_file], error)
+
+    if batch:
+        _, stats = menu_batch.run_batch(jobs, menu_batch.OpenAIBatchBackend(), prune_snapshots, on_result=on_result)
+    else:
+        _, stats = menu_recreator.recreate_menus(jobs, workers, prune_snapshots, timeout, on_result=on_result)
+    stage_stats.append(stats)
+
+
+def load_menus():
+    """Load new or changed CSVs from `csv_folder_path` into the menu database.
+
+    The CSVs are loaded together with :func:`sqlite_connection.bulk_load` (one
+    transaction, replacing each restaurant's previous rows) and then recorded in the
+    manifest; CSVs whose hash was already loaded are skipped unless `--force load`
+    was given. New and edited dishes are then embedded (:func:`embed_menus`).
+    """
+    conn = sqlite_connection.connect_db(f"{relative_path}restaurants_raleigh.db")
+    sqlite_connection.create_table(conn)
+    pending = {}
+    for filename in sorted(os.listdir(csv_folder_path)):
+        file_path = os.path.join(csv_folder_path, filename)
+        if not os.path.isfile(file_path):
+            continue
+        csv_hash = manifest.hash_file(file_path)
+        if "load" not in force and build_manifest.load_is_current(filename, csv_hash):
+            continue
+        pending[file_path] = filename, csv_hash
+    try:
+        sqlite_connection.bulk_load(conn, pending, force="load" in force)
+        embed_menus(conn)
+    finally:
+        conn.close()
+    for filename, csv_hash in pending.values():
+        build_manifest.record_load(filename, csv_hash)
+    print("🎉 All files processed and saved into 'restaurants_raleigh.db' successfully.")
+
+
+def embed_menus(conn):
+    """Store embeddings for the dishes loaded or edited since the last run, for `semantic_search`."""
+    embedded = sqlite_connection.embed_missing(conn)
+    conn.commit()
+    if embedded:
+        print(f"🧭 {embedded} dishes embedded for semantic search.")
+
+
+def fetch_page(job):
+    """Streaming stage: download the HTML for one `(restaurant_name, url)` pair.
+
+    Returns None (dropping the restaurant) when the manifest shows it was fetched
+    within `refresh_hours` and its menu was built from that snapshot and loaded
+    (unless `--force fetch`), or when a conditional re-fetch finds the page
+    unchanged since its menu was built and loaded. A fresh snapshot whose menu was
+    not finished (failed LLM call, crash, spent token budget) is passed on without
+    downloading the page again.
+
+    Returns `(restaurant_name, html, validators, snapshot_hash)`: `html` and the
+    response's `validators` for a download, or None for both and the stored
+    `snapshot_hash` for a resumed snapshot.
+    """
+    restaurant_name, url = job
+    if not url:
+        print(f"⚠️ No URL for {restaurant_name}; skipping fetch.")
+        return None
+    entry = build_manifest.get(restaurant_name)
+    if "fetch" not in force and build_manifest.snapshot_is_fresh(restaurant_name, refresh_hours):
+        snapshot_hash = snapshots.latest_hash(restaurant_name)
+        if ("menu" not in force and build_manifest.menu_is_current(restaurant_name, snapshot_hash)
+                and build_manifest.load_is_current(restaurant_name, entry.get("csv_hash"))):
+            print(f"⏭️ {restaurant_name} snapshot is up to date.")
+            return None
+        if snapshot_hash is not None:
+            print(f"🔁 {restaurant_name} snapshot is up to date; resuming at the menu stage.")
+            return restaurant_name, None, None, snapshot_hash
+    validators = None
+    if (not force & {"fetch", "menu"}
+            and build_manifest.menu_is_current(restaurant_name, entry.get("snapshot_hash"))
+            and build_manifest.load_is_current(restaurant_name, entry.get("csv_hash"))):
+        validators = build_manifest.validators(restaurant_name)
+    html, fresh = html_tools.fetch_if_changed(url, validators)
+    if html is None:
+        build_manifest.record_snapshot(restaurant_name, entry["snapshot_hash"])
+        print(f"⏭️ {restaurant_name} unchanged since last fetch.")
+        return None
+    return restaurant_name, html, fresh, None
+
+
+def extract_page_text(item):
+    """Streaming stage: turn HTML into snapshot text, dropping pages outside the line limits.
+
+    Also drops restaurants whose snapshot is unchanged and whose menu built from it
+    has already been loaded (unless `--force menu`). A stored snapshot passed on by
+    :func:`fetch_page` (`html` None) goes to the next stage as is.
+    """
+    restaurant_name, html, validators, snapshot_hash = item
+    if html is None:
+        return restaurant_name, snapshots.get(snapshot_hash), snapshot_hash
+    lines = html_tools.html_to_lines(html, html_tools.MAX_LINES)
+    if not html_tools.within_line_limits(len(lines)):
+        print(f"⚠️ Skipped {restaurant_name} — only {len(lines)} lines.")
+        return None
+    text = "\n".join(lines)
+    snapshot_hash = snapshots.put(restaurant_name, text)
+    build_manifest.record_snapshot(restaurant_name, snapshot_hash)
+    build_manifest.record_validators(restaurant_name, validators)
+    entry = build_manifest.get(restaurant_name)
+    if ("menu" not in force and build_manifest.menu_is_current(restaurant_name, snapshot_hash)
+            and build_manifest.load_is_current(restaurant_name, entry.get("csv_hash"))):
+        print(f"⏭️ {restaurant_name} menu is up to date.")
+        return None
+    return restaurant_name, text, snapshot_hash
+
+
+def budget_spent(restaurant_name):
+    """True (with a message) when the run's LLM token budget is used up."""
+    if not llm_usage.budget_exhausted():
+        return False
+    print(f"⏸️ Token budget reached; {restaurant_name} menu left for the next run.")
+    return True
+
+
+def extract_menu_rows(item):
+    """Streaming stage: parse the menu locally when confident, else ask the LLM, and return the cleaned rows.
+
+    Returns None (dropping the restaurant) when it needs the LLM and the token budget is spent.
+    """
+    restaurant_name, text, snapshot_hash = item
+    rows = menu_parser.confident_rows(text) if fast_path else None
+    path = "rules"
+    if rows is None:
+        if budget_spent(restaurant_name):
+            return None
+        if prune_snapshots:
+            text = menu_pruner.prune_for_llm(text, restaurant_name)
+        with llm_usage.labelled(restaurant_name):
+            rows = menu_recreator.request_menu_rows(text)
+        path = "llm"
+    csv_hash = manifest.hash_text(repr(rows))
+    build_manifest.record_menu(restaurant_name, snapshot_hash, csv_hash, path)
+    print("Chat has returned" if path == "llm" else f"⚡ {restaurant_name} menu parsed without the LLM")
+    return restaurant_name, rows, csv_hash
+
+
+# One database connection per streaming LLM worker thread (`--structured`).
+_thread_db = threading.local()
+_thread_connections = []
+
+
+def thread_connection():
+    """Return this thread's connection to the menu database, opening it on first use."""
+    conn = getattr(_thread_db, "conn", None)
+    if conn is None:
+        conn = _thread_db.conn = sqlite_connection.connect_db(f"{relative_path}restaurants_raleigh.db")
+        _thread_connections.append(conn)
+    return conn
+
+
+def insert_streamed_rows(item):
+    """Streaming stage (`--structured`): insert each JSON row into the database as the LLM returns it.
+
+    Confident rule-based rows (see :mod:`menu_parser`) are inserted the same way
+    without an LLM call. Returns `(restaurant_name, inserted_count)`, or None when
+    the menu needs the LLM and the token budget is spent.
+    """
+    restaurant_name, text, snapshot_hash = item
+    rows = menu_parser.confident_rows(text) if fast_path else None
+    path = "rules" if rows is not None else "llm"
+    if rows is None:
+        if budget_spent(restaurant_name):
+            return None
+        if prune_snapshots:
+            text = menu_pruner.prune_for_llm(text, restaurant_name)
+    with llm_usage.labelled(restaurant_name):
+        inserted = menu_stream.stream_menu_to_db(thread_connection(), text, restaurant_name, rows)
+    rows_hash = manifest.hash_text(repr(inserted))
+    build_manifest.record_menu(restaurant_name, snapshot_hash, rows_hash, path)
+    build_manifest.record_load(restaurant_name, rows_hash)
+    return restaurant_name, len(inserted)
+
+
+def stream_menus(fetch_workers=1, extract_workers=1, llm_workers=1, queue_size=8, structured=False):
+    """Stream every restaurant through fetch -> extract -> LLM -> database insert.
+
+    Under the hood:
+    - Feeds `(restaurant_name, url)` pairs into :func:`streaming.run_streaming`.
+    - Each stage has its own worker count; stages are joined by bounded queues
+      of `queue_size`, so memory stays flat regardless of the restaurant count.
+    - Each restaurant's stored menu is synced to the new rows
+      (:func:`sqlite_connection.sync_menu`) and committed from the main thread, so the
+      first menus appear in the database while later pages are still downloading.
+    - With `structured`, the LLM stage asks for JSON rows instead and inserts each
+      one as it streams in (:func:`insert_streamed_rows`), on its own connection.
+    - Once every restaurant is through, new and edited dishes are embedded
+      (:func:`embed_menus`).
+
+    Parameters
+    ----------
+    fetch_workers : int, optional
+        Concurrent page downloads, by default 1.
+    extract_workers : int, optional
+        Concurrent HTML-to-text conversions, by default 1.
+    llm_workers : int, optional
+        Concurrent LLM calls, by default 1.
+    queue_size : int, optional
+        Capacity of each inter-stage queue, by default 8.
+    structured : bool, optional
+        Stream schema-constrained rows straight into the database, by default False.
+    """
+    conn = sqlite_connection.connect_db(f"{relative_path}restaurants_raleigh.db")
+    sqlite_connection.create_table(conn)
+
+    def report(item):
+        restaurant_name, inserted = item
+        print(f"✅ {inserted} rows inserted (restaurant='{restaurant_name}')")
+
+    def insert(item):
+        restaurant_name, rows, csv_hash = item
+        diff = sqlite_connection.sync_menu(conn, restaurant_name, rows)
+        conn.commit()
+        build_manifest.record_load(restaurant_name, csv_hash)
+        print(f"✅ {diff.inserted} rows inserted, {diff.updated} updated, {diff.deleted} deleted "
+              f"(restaurant='{restaurant_name}')")
+
+    stages = [
+        ("fetch", fetch_page, fetch_workers),
+        ("extract", extract_page_text, extract_workers),
+        ("llm", insert_streamed_rows if structured else extract_menu_rows, llm_workers),
+    ]
+    try:
+        stage_stats.extend(streaming.run_streaming(
+            zip(restaurant_list, url_list), stages, report if structured else insert, queue_size
+        ))
+        embed_menus(conn)
+    finally:
+        conn.close()
+        for thread_conn in _thread_connections:
+            thread_conn.close()
+        _thread_connections.clear()
+
+
+def parse_args(argv=None):
+    """Parse command-line options for the pipeline.
+
+    Parameters
+    ----------
+    argv : list[str] | None, optional
+        Arguments to parse, by default `sys.argv[1:]`.
+
+    Returns
+    -------
+    argparse.Namespace
+        Parsed options. In `sequential` mode every stage runs with one worker.
+    """
+    parser = argparse.ArgumentParser(description="Rebuild the local restaurant menu database.")
+    parser.add_argument("--mode", choices=["sequential", "concurrent", "streaming"], default="sequential",
+                        help="run each stage one item at a time, with bounded parallelism, "
+                             "or stream each restaurant through all stages")
+    parser.add_argument("--url-workers", type=int, default=16,
+                        help="concurrent Custom Search lookups in concurrent/streaming mode")
+    parser.add_argument("--fetch-workers", type=int, default=16,
+                        help="concurrent page fetches in concurrent/streaming mode")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1,
+                        help="HTML-parsing processes for snapshots in concurrent mode (default: one per core)")
+    parser.add_argument("--extract-workers", type=int, default=2,
+                        help="concurrent HTML-to-text conversions in streaming mode")
+    parser.add_argument("--llm-workers", type=int, default=4,
+                        help="concurrent menu_recreator calls in concurrent/streaming mode")
+    parser.add_argument("--llm-timeout", type=float, default=menu_recreator.DEFAULT_TIMEOUT,
+                        help="seconds before an LLM request is cancelled")
+    parser.add_argument("--llm-batch", action="store_true",
+                        help="rebuild menus with one OpenAI Batch API job instead of live requests "
+                             "(cheaper, may take hours; not used in streaming mode)")
+    parser.add_argument("--queue-size", type=int, default=8,
+                        help="capacity of each inter-stage queue in streaming mode")
+    parser.add_argument("--force", action="append", default=[], choices=["url", "fetch", "menu", "load"],
+                        help="redo a stage even if the manifest says it is up to date (repeatable)")
+    parser.add_argument("--structured", action="store_true",
+                        help="in streaming mode, request JSON rows and insert each one as it streams in")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="stop starting new LLM extractions once this run has used this many tokens")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="send whole snapshots to the LLM instead of only the detected menu regions")
+    parser.add_argument("--no-fast-path", action="store_true",
+                        help="send every menu to the LLM instead of parsing cleanly laid-out ones locally")
+    parser.add_argument("--refresh-hours", type=float, default=20.0,
+                        help="re-fetch pages whose snapshot is older than this many hours")
+    args = parser.parse_args(argv)
+    if args.mode == "sequential":
+        args.url_workers = args.fetch_workers = args.extract_workers = args.llm_workers = 1
+        args.parse_workers = 1
+    return args
 
 
 if __name__ == "__main__":
+    args = parse_args()
     relative_path = "src\\database\\"
-    content_folder_path = relative_path+"Raw_Website_Content"
     csv_folder_path = relative_path+"Menu_CSVs\\"
+    force = set(args.force)
+    refresh_hours = args.refresh_hours
+    prune_snapshots = not args.no_prune
+    fast_path = not args.no_fast_path
+    build_manifest = manifest.Manifest(relative_path+"build_manifest.db")
+    snapshot_db_path = relative_path+"snapshot_store.db"
+    snapshots = snapshot_store.SnapshotStore(snapshot_db_path)
+    llm_usage.set_budget(args.token_budget)
 
     restaurant_list = open_restaurant_list()
-    url_list = open_url_list()
-    make_website_content_folder()
-    extract_website_content()
-    make_csv_folder()
-    create_menu()
-    sqlite_connection.upload_data(relative_path)
\ No newline at end of file
+    url_list = open_url_list(args.url_workers)
+    if args.mode == "streaming":
+        stream_menus(args.fetch_workers, args.extract_workers, args.llm_workers, args.queue_size, args.structured)
+    else:
+        extract_website_content(args.fetch_workers, args.parse_workers)
+        make_csv_folder()
+        create_menu(args.llm_workers, args.llm_timeout, args.llm_batch)
+        load_menus()
+    build_manifest.close()
+    snapshots.close()
+    executor.print_stage_report(stage_stats)
+    response_cache.print_stats()
+    llm_usage.print_report()
\ No newline at end of file
@@ -3,17 +3,49 @@
 This module provides:
 - A thin wrapper around the Google Places Text Search API to collect restaurant names.
 - A helper to query the local SQLite database for menu rows matching a list of restaurants.
+- A free-text dish search (`search_dishes`) over the `menu_search` FTS5 index,
+  returning the top-k matches ranked by BM25.
+- A nearest-neighbour search (`semantic_search`) over the `menu_vectors` embeddings,
+  for requests worded unlike the menu ("something spicy with noodles").
+
+The embedding matrix is read from SQLite once and kept in memory (`VectorIndex`)
+until `menu_vectors` changes. Scoring uses NumPy when it is installed (one
+matrix-vector product and an `argpartition` top-k, or an inverted-file
+`IVFIndex` for large menus) and a pure-Python scan otherwise.
+
+Places responses are kept in the shared on-disk `response_cache`, so repeated
+searches from the app return without a network round trip.
 
 Environment:
 - PLACES_API_KEY must be set for Google Places API access.
 - The SQLite database is expected at `src/database/restaurants_raleigh.db` (preferred)
   or `./restaurants_raleigh.db` as a fallback.
 """
+import heapq
+import math
 import os
+import re
 import json
-import requests
+import http_client
 import sqlite_connection
+import rate_limiter
+import response_cache
+
+try:
+    import numpy as np
+except ImportError:  # optional, vectorized semantic_search backend
+    np = None
+
+# BM25 column weights for `menu_search` (name, description): a hit in the dish
+# name counts more than one in its description.
+SEARCH_WEIGHTS = (4.0, 1.0)
+DEFAULT_SEARCH_LIMIT = 20
+
+MIN_SIMILARITY = 0.1            # cosine below this is hashing noise, not a match
+APPROXIMATE_MIN_ITEMS = 50_000  # semantic_search switches to the IVF index from here
+DEFAULT_NPROBE = 16             # IVF lists scanned per query (~0.9 recall@20 at 100k items)
 
+_vector_indexes = {}  # database path -> VectorIndex
 
 # Used for the retrieval of relevant restaurants based on 
 # the user's parsed voice input
@@ -27,9 +59,12 @@ def local_search(query_string):
 
     Under the hood:
     - Builds a POST request to `https://places.googleapis.com/v1/places:searchText`
-      with the provided free-form query string.
+      with the provided free-form query string, sharing the `"places"` rate limiter
+      with the pipeline.
     - Requests only the `places.displayName` field to reduce payload size.
     - Parses the response and collects the visible place names.
+    - Reuses a cached response for the same (normalized) query when one exists;
+      a non-200 response raises and is not cached.
     - Delegates to :func:`query` to fetch matching menu rows from SQLite.
 
     Parameters
@@ -41,6 +76,11 @@ def local_search(query_string):
     -------
     list[tuple]
         Rows from the `local_menu` table for any matching restaurant names.
+
+    Raises
+    ------
+    Exception
+        If the Places request fails (non-200 status code).
     """
     search_list = []
     url = "https://places.googleapis.com/v1/places:searchText"
@@ -52,50 +92,315 @@ def local_search(query_string):
 
     payload = {"textQuery": f"{query_string}"}
 
-    r = requests.post(url, headers=headers, data=json.dumps(payload))
-    r = r.json()
+    def fetch():
+        r = rate_limiter.send("places", http_client.post, url, headers=headers, data=json.dumps(payload))
+        if r.status_code != 200:
+            print(r.status_code)
+            raise Exception('Request Failed')
+        return r.json().get('places') or None
+
+    request = {"url": url, "fields": headers["X-Goog-FieldMask"], "body": payload}
+    places = response_cache.cached("places", request, fetch) or []
 
-    for place in r['places']:
+    for place in places:
         search_list.append(place['displayName']['text'])
 
     return query(search_list)
   
   
+def _db_path():
+    # Prefer the test location (cwd/src/database/...), then fall back to ./restaurants_raleigh.db
+    primary = os.path.join("src", "database", "restaurants_raleigh.db")
+    return primary if os.path.exists(primary) else "restaurants_raleigh.db"
+
+
 # Used the database created through main.py to retieve menu items
 # for the restaurants found in local_search
-def query(search_list):
+def query(search_list, min_price=None, max_price=None):
     """Fetch menu rows for the given list of restaurants from SQLite.
 
     Under the hood:
     - Chooses the database path preferring `src/database/restaurants_raleigh.db`
       when present, otherwise falls back to `./restaurants_raleigh.db`.
-    - Uses a single parameterized `SELECT` with an IN-clause to fetch all rows.
+    - Uses a single parameterized `SELECT` with an IN-clause to fetch all rows;
+      restaurant names resolve through the `restaurants` table and the covering
+      `menu_items` index (see :mod:`sqlite_connection`).
+    - With a price bound, filters on the parsed `price_cents` / `price_max_cents`
+      in SQL, so only matching items are read.
     - Closes the connection reliably via a `try/finally` block.
 
     Parameters
     ----------
     search_list : list[str]
         Restaurant names to match against the `restaurant` column.
+    min_price, max_price : float | None, optional
+        Dollar bounds; an item is kept when its price (or price range) reaches
+        `min_price` and starts at or below `max_price`. Items without a
+        parseable price are dropped when either bound is set.
 
     Returns
     -------
     list[tuple]
         Result rows from the `local_menu` table. Empty list if `search_list` is empty.
     """
-    # Prefer the test location (cwd/src/database/...), then fall back to ./restaurants_raleigh.db
-    primary = os.path.join("src", "database", "restaurants_raleigh.db")
-    db_path = primary if os.path.exists(primary) else "restaurants_raleigh.db"
-
-    conn = sqlite_connection.connect_db(db_path)
+    conn = sqlite_connection.connect_db(_db_path())
     try:
         if not search_list:
             return []
         cur = conn.cursor()
         placeholders = ",".join("?" for _ in search_list)
+        if min_price is None and max_price is None:
+            return cur.execute(
+                f"SELECT * FROM local_menu WHERE restaurant IN ({placeholders})",
+                tuple(search_list)
+            ).fetchall()
         rows = cur.execute(
-            f"SELECT * FROM local_menu WHERE restaurant IN ({placeholders})",
-            tuple(search_list)
+            "SELECT m.id, m.name, m.price, m.description, r.name FROM restaurants r "
+            "JOIN menu_items m ON m.restaurant_id = r.id "
+            f"WHERE r.name IN ({placeholders}) AND m.price_cents <= ? AND m.price_max_cents >= ?",
+            (*search_list,
+             round(max_price * 100) if max_price is not None else 2 ** 62,
+             round(min_price * 100) if min_price is not None else 0)
         ).fetchall()
         return rows
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+def match_expression(text):
+    """Turn free text into an FTS5 `MATCH` expression, or None when it has no words.
+
+    Filler words (`sqlite_connection.STOPWORDS`) are dropped, so "I want
+    something with noodles" does not match every description containing "with".
+    Every remaining word is quoted (so FTS5 operators and punctuation in user
+    input are inert) and the words are OR-ed, leaving the ranking to BM25.
+    """
+    words = [word for word in re.findall(r"\w+", text.lower())
+             if word not in sqlite_connection.STOPWORDS]
+    return " OR ".join(f'"{word}"' for word in dict.fromkeys(words)) or None
+
+
+# Used to build prompt context from the dishes relevant to a chat message
+def search_dishes(text, limit=DEFAULT_SEARCH_LIMIT, restaurants=None):
+    """Return the menu rows that best match a free-text query.
+
+    Under the hood:
+    - Builds an OR query of the words in `text` with :func:`match_expression`.
+    - Looks them up in the `menu_search` FTS5 index (see :mod:`sqlite_connection`),
+      ordered by BM25 with `SEARCH_WEIGHTS`, so only the top `limit` rows are read.
+    - Opens the database read-only; the schema and index are created (and an older
+      database migrated) when menus are loaded, by :func:`sqlite_connection.create_table`.
+    - Closes the connection reliably via a `try/finally` block.
+
+    Parameters
+    ----------
+    text : str
+        Free text such as a chat message ("spicy noodles with tofu").
+    limit : int, optional
+        Maximum number of rows, by default `DEFAULT_SEARCH_LIMIT`.
+    restaurants : list[str] | None, optional
+        Only search these restaurants' menus.
+
+    Returns
+    -------
+    list[tuple]
+        `local_menu` rows (`id`, `name`, `price`, `description`, `restaurant`),
+        best match first. Empty list when `text` has no words or nothing matches.
+    """
+    expression = match_expression(text)
+    if expression is None or restaurants == []:
+        return []
+    conn = sqlite_connection.connect_db(_db_path(), read_only=True)
+    try:
+        where, params = "menu_search MATCH ?", [expression]
+        if restaurants is not None:
+            where += f" AND r.name IN ({','.join('?' for _ in restaurants)})"
+            params += list(restaurants)
+        return conn.execute(
+            "SELECT m.id, m.name, m.price, m.description, r.name FROM menu_search "
+            "JOIN menu_items m ON m.id = menu_search.rowid JOIN restaurants r ON r.id = m.restaurant_id "
+            f"WHERE {where} ORDER BY bm25(menu_search, ?, ?) LIMIT ?",
+            (*params, *SEARCH_WEIGHTS, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+class IVFIndex:
+    """Approximate nearest-neighbour index over unit-length rows (inverted file).
+
+    The rows are clustered with a few rounds of spherical k-means on a sample;
+    a query is scored against the `nprobe` closest centroids' rows only.
+
+    Parameters
+    ----------
+    matrix : numpy.ndarray
+        `(n, dim)` float32 rows.
+    nlist : int | None, optional
+        Number of clusters, by default `sqrt(n)`.
+    iterations : int, optional
+        k-means rounds, by default 4.
+    seed : int, optional
+        Seed for the sample and initial centroids, by default 0.
+    """
+
+    def __init__(self, matrix, nlist=None, iterations=4, seed=0):
+        rng = np.random.default_rng(seed)
+        nlist = min(len(matrix), nlist or max(1, math.isqrt(len(matrix))))
+        sample = matrix[rng.choice(len(matrix), min(len(matrix), 32 * nlist), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, self._assign(sample), sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            self.centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), self.centroids)
+        labels = np.concatenate([self._assign(matrix[i:i + 8192]) for i in range(0, len(matrix), 8192)])
+        self.order = np.argsort(labels, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=nlist))))
+
+    def _assign(self, rows):
+        return np.argmax(rows @ self.centroids.T, axis=1)
+
+    def candidates(self, query, nprobe=DEFAULT_NPROBE):
+        """Return the row numbers in the `nprobe` clusters closest to `query`."""
+        scores = self.centroids @ query
+        probe = np.argpartition(scores, -nprobe)[-nprobe:] if nprobe < len(scores) else range(len(scores))
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+
+class VectorIndex:
+    """In-memory copy of a database's `menu_vectors`, for nearest-neighbour queries.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection with the menu schema.
+    """
+
+    def __init__(self, conn):
+        self.signature = _vector_signature(conn)
+        rows = conn.execute(
+            "SELECT v.item_id, m.restaurant_id, v.vector FROM menu_vectors v "
+            "JOIN menu_items m ON m.id = v.item_id ORDER BY v.item_id"
+        ).fetchall()
+        self.ivf = None
+        if np is not None:
+            self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            self.rids = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+            self.matrix = np.frombuffer(b"".join(r[2] for r in rows), dtype=np.float32).reshape(
+                len(rows), sqlite_connection.EMBEDDING_DIM)
+        else:
+            self.rows = [(item_id, rid, memoryview(vector).cast("f")) for item_id, rid, vector in rows]
+
+    def __len__(self):
+        return len(self.ids) if np is not None else len(self.rows)
+
+    def search(self, query, limit, rids=None, approximate=False, nprobe=DEFAULT_NPROBE):
+        """Return up to `limit` `(item_id, similarity)` pairs, most similar first.
+
+        Parameters
+        ----------
+        query : array.array
+            Query embedding from :func:`sqlite_connection.embed_text`.
+        limit : int
+            Maximum number of hits.
+        rids : set[int] | None, optional
+            Only score these restaurants' items (always an exact scan).
+        approximate : bool, optional
+            Score only the IVF candidates (built on first use); needs NumPy.
+        nprobe : int, optional
+            IVF clusters scanned, by default `DEFAULT_NPROBE`.
+        """
+        if np is None:
+            weights = [(slot, w) for slot, w in enumerate(query) if w]
+            scored = ((sum(vector[slot] * w for slot, w in weights), item_id)
+                      for item_id, rid, vector in self.rows if rids is None or rid in rids)
+            return [(item_id, score) for score, item_id in heapq.nlargest(limit, scored) if score >= MIN_SIMILARITY]
+        query = np.frombuffer(query, dtype=np.float32)
+        if rids is not None:
+            rows = np.flatnonzero(np.isin(self.rids, list(rids)))
+        elif approximate:
+            if self.ivf is None:
+                self.ivf = IVFIndex(self.matrix)
+            rows = self.ivf.candidates(query, nprobe)
+        else:
+            rows = None
+        scores = (self.matrix if rows is None else self.matrix[rows]) @ query
+        k = min(limit, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top])]
+        ids = self.ids if rows is None else self.ids[rows]
+        return [(int(ids[t]), float(scores[t])) for t in top if scores[t] >= MIN_SIMILARITY]
+
+
+def _vector_signature(conn):
+    # Changes whenever a vector is added (AUTOINCREMENT id grows) or removed (count drops)
+    return conn.execute(
+        "SELECT (SELECT COUNT(*) FROM menu_vectors), (SELECT MAX(id) FROM menu_vectors)").fetchone()
+
+
+def vector_index(conn, db_path):
+    """Return the cached :class:`VectorIndex` for `db_path`, reloading it if `menu_vectors` changed."""
+    key = os.path.abspath(db_path)
+    index = _vector_indexes.get(key)
+    if index is None or index.signature != _vector_signature(conn):
+        index = _vector_indexes[key] = VectorIndex(conn)
+    return index
+
+
+# Used to build prompt context when the wording does not match the menu's
+def semantic_search(text, limit=DEFAULT_SEARCH_LIMIT, restaurants=None, approximate=None, nprobe=DEFAULT_NPROBE):
+    """Return the menu rows whose embeddings are nearest to a free-text query.
+
+    Under the hood:
+    - Embeds `text` with :func:`sqlite_connection.embed_text` (local, no network).
+    - Scores it against every stored item embedding by cosine similarity with
+      :class:`VectorIndex` (cached in memory per database) and keeps the top `limit`
+      with a similarity of at least `MIN_SIMILARITY`.
+    - Opens the database read-only: vectors are written after loading by
+      :func:`sqlite_connection.embed_missing`, and items loaded since then are not
+      found until it runs.
+
+    Parameters
+    ----------
+    text : str
+        Free text such as a chat message ("something spicy with noodles").
+    limit : int, optional
+        Maximum number of rows, by default `DEFAULT_SEARCH_LIMIT`.
+    restaurants : list[str] | None, optional
+        Only search these restaurants' menus.
+    approximate : bool | None, optional
+        Use the :class:`IVFIndex` instead of an exact scan; by default only for
+        `APPROXIMATE_MIN_ITEMS` items or more. Ignored without NumPy.
+    nprobe : int, optional
+        IVF clusters scanned per query, by default `DEFAULT_NPROBE`.
+
+    Returns
+    -------
+    list[tuple]
+        `local_menu` rows (`id`, `name`, `price`, `description`, `restaurant`),
+        most similar first.
+    """
+    query = sqlite_connection.embed_text(text)
+    if not any(query) or restaurants == []:
+        return []
+    db_path = _db_path()
+    conn = sqlite_connection.connect_db(db_path, read_only=True)
+    try:
+        index = vector_index(conn, db_path)
+        rids = None
+        if restaurants is not None:
+            rids = {rid for (rid,) in conn.execute(
+                f"SELECT id FROM restaurants WHERE name IN ({','.join('?' for _ in restaurants)})", list(restaurants))}
+        if approximate is None:
+            approximate = len(index) >= APPROXIMATE_MIN_ITEMS
+        hits = index.search(query, limit, rids, approximate and np is not None, nprobe)
+        if not hits:
+            return []
+        rows = {row[0]: row for row in conn.execute(
+            f"SELECT * FROM local_menu WHERE id IN ({','.join('?' for _ in hits)})", [item_id for item_id, _ in hits])}
+        return [rows[item_id] for item_id, _ in hits]
+    finally:
+        conn.close()
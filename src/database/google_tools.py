@@ -2,30 +2,101 @@
 
 This module provides:
 - `restaurant_search`: uses Google Places Text Search to compile a restaurant list
-  for a set of cuisines in a given location and writes it to `src\\database\\Restaurant_List.txt`.
+  for a set of cuisines in a given location, stores it in the Places-ID keyed
+  `restaurant_registry` and writes the names to `Restaurant_List.txt` beside it.
 - `build_payload` and `send_payload`: small helpers to call Google Custom Search and
   retrieve the first result link for a given query.
 
+Both APIs are paid, so responses are kept in the shared on-disk `response_cache`
+and repeated lookups (including ones that found nothing) skip the network.
+
 Environment:
 - PLACES_API_KEY (Places API) for `restaurant_search`.
 - SEARCH_API_KEY and CX_ID (Custom Search JSON API) for `send_payload`.
 """
 import os
-import requests
 import json
+import executor
+import http_client
+import rate_limiter
+import response_cache
+import restaurant_registry
+import sqlite_connection
+
+PLACES_URL = "https://places.googleapis.com/v1/places:searchText"
+SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+PLACES_FIELDS = "places.id,places.displayName,places.formattedAddress,nextPageToken"
+MAX_PLACES_PAGES = 3  # Text Search returns at most 60 results (3 pages of 20)
+REGISTRY_DB = os.path.join("src", "database", "restaurants_raleigh.db")
+
+
+def _post_places(headers, payload):
+    """POST one Places Text Search request; return the JSON body or None if it has no places.
+
+    A non-200 status (including a 429 left after the rate limiter's retries) raises,
+    so an error body is never cached as a search that found nothing.
+    """
+    r = rate_limiter.send("places", http_client.post, PLACES_URL, headers=headers, data=json.dumps(payload))
+    if r.status_code != 200:
+        print(r.status_code)
+        raise Exception('Request Failed')
+    body = r.json()
+    return body if body.get('places') else None
+
+
+def search_places(text_query, headers, max_pages=MAX_PLACES_PAGES):
+    """Return every place for `text_query`, following `nextPageToken` across pages.
+
+    Each page is cached in `response_cache` under its query and exact page token.
+    Pages are fetched one after another: each request needs the `nextPageToken`
+    returned by the page before it, so one query's pages cannot be requested
+    concurrently. `restaurant_search` overlaps the queries instead.
+
+    Parameters
+    ----------
+    text_query : str
+        Places Text Search query (e.g., `"Thai Restaurants in Raleigh"`).
+    headers : dict
+        Request headers including the API key and field mask.
+    max_pages : int, optional
+        Upper bound on pages fetched, by default `MAX_PLACES_PAGES`.
+
+    Returns
+    -------
+    list[dict]
+        The `places` entries from all pages, in result order.
+    """
+    places = []
+    token = None
+    for _ in range(max_pages):
+        payload = {"textQuery": text_query}
+        if token:
+            payload["pageToken"] = token
+        request = {"url": PLACES_URL, "fields": headers["X-Goog-FieldMask"], "body": payload}
+        page = response_cache.cached("places", request, lambda: _post_places(headers, payload)) or {}
+        places.extend(page.get('places', []))
+        token = page.get('nextPageToken')
+        if not token:
+            break
+    return places
 
 
 # Step one. 
 # Needs a list of strings containing cuisines and string of a location name
 # Example: ["Chinese", "Indian", "American", "South American"] "Raleigh"
-def restaurant_search(cuisine_list, location):
+def restaurant_search(cuisine_list, location, workers=4, db_path=REGISTRY_DB):
     """Build a de-duplicated list of restaurants for the given cuisines and location.
 
     Under the hood:
-    - Calls Google Places Text Search for each cuisine string combined with the `location`.
-    - Requests the `places.id` and `places.displayName` fields.
-    - Collects unique restaurant display names in memory.
-    - Writes the final comma-separated list to `src\\database\\Restaurant_List.txt`.
+    - Calls Google Places Text Search for each cuisine string combined with the `location`,
+      through the shared `"places"` rate limiter and `response_cache`. Up to `workers`
+      cuisines are searched at once; each follows its own `nextPageToken` pages in
+      order, since a page token only exists once the previous page has arrived.
+    - Requests the `places.id`, `places.displayName` and `places.formattedAddress` fields.
+    - De-duplicates on the Places ID (O(1) per place) and collects cuisine tags.
+    - Upserts every place into the `restaurant_registry` tables at `db_path`.
+    - Writes the distinct names as a comma-separated list to `Restaurant_List.txt` in the
+      directory of `db_path` for older tooling; the registry is the source of truth.
 
     Parameters
     ----------
@@ -33,33 +104,53 @@ def restaurant_search(cuisine_list, location):
         Example: `["Chinese", "Indian"]`.
     location : str
         Example: `"Raleigh"`.
+    workers : int, optional
+        Maximum number of cuisines searched concurrently, by default 4.
+    db_path : str, optional
+        SQLite file holding the registry, by default the menu database.
 
     Returns
     -------
-    None
-        This function writes to disk for subsequent pipeline steps.
+    list[str]
+        The distinct restaurant names, in discovery order.
     """
-    restaurant_list = []
-    file_name = "Restaurant_List.txt"
-
-    url = "https://places.googleapis.com/v1/places:searchText"
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": os.environ['PLACES_API_KEY'],
-        "X-Goog-FieldMask": "places.id,places.displayName"
+        "X-Goog-FieldMask": PLACES_FIELDS
     }
-
-    for cuisine in cuisine_list:
-        payload = {"textQuery": f"{cuisine} Restaurants in {location}"}
-        r = requests.post(url, headers=headers, data=json.dumps(payload))
-        r = r.json()
-
-        for place in r['places']:
-            if place['displayName']['text'] not in restaurant_list:
-                restaurant_list.append(place['displayName']['text'])
-
-    with open("src\\database\\Restaurant_List.txt", "w", encoding="utf-8") as file:
+    cuisines = [c.strip() for c in cuisine_list if c.strip()]
+
+    def search(cuisine):
+        return search_places(f"{cuisine} Restaurants in {location}", headers)
+
+    results, _ = executor.run_stage("places", search, cuisines, workers)
+
+    registry = {}
+    for cuisine, places in zip(cuisines, results):
+        for place in places:
+            name = place['displayName']['text']
+            place_id = place.get('id') or f"name:{name}"
+            entry = registry.setdefault(place_id, {
+                "place_id": place_id,
+                "name": name,
+                "address": place.get('formattedAddress'),
+                "cuisines": set(),
+            })
+            entry["cuisines"].add(cuisine)
+
+    conn = sqlite_connection.connect_db(db_path)
+    try:
+        restaurant_registry.create_registry_tables(conn)
+        restaurant_registry.upsert_places(conn, registry.values(), location)
+    finally:
+        conn.close()
+
+    restaurant_list = list(dict.fromkeys(entry["name"] for entry in registry.values()))
+    list_path = os.path.join(os.path.dirname(db_path), "Restaurant_List.txt")
+    with open(list_path, "w", encoding="utf-8") as file:
         file.write(",".join(restaurant_list))
+    return restaurant_list
 
 
 def build_payload(query, start=1, num=1, **params):
@@ -79,7 +170,7 @@ def build_payload(query, start=1, num=1, **params):
     Returns
     -------
     dict
-        A dictionary suitable for `requests.get(..., params=payload)`.
+        A dictionary suitable for `http_client.get(..., params=payload)`.
     """
     API_KEY = os.getenv('SEARCH_API_KEY')
     CX = os.getenv('CX_ID')
@@ -97,6 +188,10 @@ def build_payload(query, start=1, num=1, **params):
 def send_payload(payload):
     """Execute a Google Custom Search request and return the first result link.
 
+    The request goes through the shared `"customsearch"` rate limiter, which retries
+    on HTTP 429 and honors `Retry-After`. Links (and queries with no results) are
+    cached in `response_cache`, keyed on the payload without the API key.
+
     Parameters
     ----------
     payload : dict
@@ -110,12 +205,17 @@ def send_payload(payload):
     Raises
     ------
     Exception
-        If the HTTP request fails (non-200 status code).
+        If the HTTP request fails (non-200 status code) or returns no results.
     """
-    response = requests.get('https://www.googleapis.com/customsearch/v1', params=payload)
-    if response.status_code != 200:
-        print(response.status_code)
-        raise Exception('Request Failed')
-    result = response.json()
-    link = result['items'][0]['link']
+    def fetch():
+        response = rate_limiter.send("customsearch", http_client.get, SEARCH_URL, params=payload)
+        if response.status_code != 200:
+            print(response.status_code)
+            raise Exception('Request Failed')
+        items = response.json().get('items')
+        return items[0]['link'] if items else None
+
+    link = response_cache.cached("customsearch", {"url": SEARCH_URL, "params": payload}, fetch)
+    if link is None:
+        raise Exception('No Results')
     return link
\ No newline at end of file
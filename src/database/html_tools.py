@@ -2,58 +2,573 @@
 
 This module fetches a page, strips non-content tags, and writes a plain-text
 snapshot to disk for later downstream parsing.
+
+Refreshes are conditional: :func:`fetch_if_changed` sends the `ETag` and
+`Last-Modified` validators saved from the previous fetch, and a `304 Not Modified`
+answer (or a body whose hash is unchanged) is reported as "unchanged" without
+parsing anything.
+
+Text is extracted by a pluggable engine (see `ENGINES`), chosen with the
+`HTML_ENGINE` environment variable:
+- `stream` (default): feeds the markup through the stdlib event parser instead of
+  building a BeautifulSoup tree and stops as soon as the page has `max_lines`
+  lines. Its output is identical to the original BeautifulSoup extractor.
+- `lxml`: the same streaming extraction on libxml2, several times faster again;
+  available when `lxml` is installed. libxml2 repairs invalid nesting differently,
+  so text around misplaced tags may be joined into one line.
+- `bs4`: the original BeautifulSoup extractor, kept as the reference.
 """
+import codecs
+import hashlib
+import os
+from html.parser import HTMLParser
 import requests
 from bs4 import BeautifulSoup
+import http_client
+import rate_limiter
 
+try:
+    from lxml import etree
+except ImportError:  # optional, faster backend
+    etree = None
 
-def extract_content(url, output_file, min_lines=120, max_lines=10000):
-    """Fetch and save a cleaned, plain-text snapshot of a web page.
+# Snapshots outside these bounds are too short to be a menu or too noisy to be useful.
+MIN_LINES = 120
+MAX_LINES = 10000
+SKIP_TAGS = frozenset({"script", "style", "noscript"})
+# Elements without content; they never stay open (matches BeautifulSoup's list).
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem",
+    "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame",
+    "image", "isindex", "nextid", "spacer",
+})
+
+
+def fetch_html(url):
+    """Download a page and return its decoded HTML.
+
+    Requests to the same host share a `web:<host>` rate limiter so concurrent
+    fetches stay polite to each restaurant's site, and go through the pooled
+    :mod:`http_client` session (timeouts, retries, response size cap).
+
+    Parameters
+    ----------
+    url : str
+        The target page to fetch.
+
+    Returns
+    -------
+    str
+        The response body as text.
+
+    Raises
+    ------
+    requests.exceptions.RequestException
+        On connection problems, timeouts, oversized bodies or HTTP error status codes.
+    """
+    response = rate_limiter.send(rate_limiter.host_endpoint(url), http_client.get, url)
+    response.raise_for_status()  # raises error for bad status codes
+    return response.text
+
+
+def _conditional_kwargs(validators):
+    """Request kwargs carrying `If-None-Match` / `If-Modified-Since` for stored validators."""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return {"headers": headers} if headers else {}
+
+
+def _not_modified(response, validators):
+    """Validators to keep after a `304`, refreshed from any headers it carries."""
+    return {
+        "etag": response.headers.get("ETag") or validators.get("etag"),
+        "last_modified": response.headers.get("Last-Modified") or validators.get("last_modified"),
+        "body_hash": validators.get("body_hash"),
+    }
+
+
+def fetch_if_changed(url, validators=None):
+    """Download a page unless it is unchanged since the fetch that produced `validators`.
 
     Under the hood:
-    - Downloads the URL and raises on HTTP errors.
-    - Parses HTML with BeautifulSoup and removes `script`, `style`, and `noscript` tags.
+    - Sends `If-None-Match` / `If-Modified-Since` built from the stored `etag` and
+      `last_modified` validators (plain GET when there are none).
+    - A `304 Not Modified` response means unchanged.
+    - Otherwise hashes the body; a body identical to the stored `body_hash` (servers
+      that ignore conditional headers) is also reported as unchanged.
+
+    Parameters
+    ----------
+    url : str
+        The target page to fetch.
+    validators : dict | None, optional
+        `{"etag", "last_modified", "body_hash"}` from the previous fetch, by default None.
+
+    Returns
+    -------
+    tuple[str | None, dict]
+        The HTML, or None when the page is unchanged, and the validators to store
+        for the next refresh.
+
+    Raises
+    ------
+    requests.exceptions.RequestException
+        On connection problems, timeouts, oversized bodies or HTTP error status codes.
+    """
+    validators = validators or {}
+    response = rate_limiter.send(rate_limiter.host_endpoint(url), http_client.get, url,
+                                 **_conditional_kwargs(validators))
+    if response.status_code == 304:
+        return None, _not_modified(response, validators)
+    response.raise_for_status()
+    fresh = _fresh_validators(response, hashlib.sha256(response.content).hexdigest())
+    if validators.get("body_hash") == fresh["body_hash"]:
+        return None, fresh
+    return response.text, fresh
+
+
+class _LineBudgetReached(Exception):
+    """Raised inside a parser callback to stop parsing once enough lines were seen."""
+
+
+class _LineCollector:
+    """Turns parser events into stripped text lines, skipping `SKIP_TAGS` content.
+
+    Adjacent text events are joined before splitting, so text broken up by entities
+    or chunk boundaries yields the same lines as one BeautifulSoup string. Open tags
+    are tracked the way BeautifulSoup does: an end tag closes everything opened
+    after the matching start tag, and an end tag that matches nothing is ignored.
+    """
+
+    def __init__(self, max_lines=None):
+        self.lines = []
+        self.max_lines = max_lines
+        self.stack = []
+        self.skip_depth = 0
+        self.pending = []
+
+    def text(self, data):
+        if not self.skip_depth:
+            self.pending.append(data)
+
+    def flush(self):
+        if not self.pending:
+            return
+        for line in "".join(self.pending).splitlines():
+            line = line.strip()
+            if line:
+                self.lines.append(line)
+        self.pending = []
+        if self.max_lines is not None and len(self.lines) >= self.max_lines:
+            del self.lines[self.max_lines:]
+            raise _LineBudgetReached()
+
+    def open(self, tag):
+        self.flush()
+        if tag in VOID_TAGS:
+            return
+        self.stack.append(tag)
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def close(self, tag):
+        self.flush()
+        if tag not in self.stack:
+            return
+        while True:
+            popped = self.stack.pop()
+            if popped in SKIP_TAGS:
+                self.skip_depth -= 1
+            if popped == tag:
+                break
+
+
+class _StreamParser(HTMLParser):
+    """Incremental stdlib parser feeding a :class:`_LineCollector`."""
+
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.open(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.flush()
+
+    def handle_endtag(self, tag):
+        self.collector.close(tag)
+
+    def handle_data(self, data):
+        self.collector.text(data)
+
+    def handle_comment(self, data):
+        self.collector.flush()
+
+    def handle_decl(self, decl):
+        self.collector.flush()
+
+    def handle_pi(self, data):
+        self.collector.flush()
+
+    def unknown_decl(self, data):
+        self.collector.flush()
+        if data.startswith("CDATA["):
+            self.collector.text(data[len("CDATA["):])
+            self.collector.flush()
+
+
+class _LxmlTarget:
+    """`lxml` parser target feeding a :class:`_LineCollector`."""
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.open(tag)
+
+    def end(self, tag):
+        self.collector.close(tag)
+
+    def data(self, data):
+        self.collector.text(data)
+
+    def comment(self, text):
+        self.collector.flush()
+
+    def pi(self, target, data=None):
+        self.collector.flush()
+
+    def close(self):
+        self.collector.flush()
+
+
+def _stream_engine(chunks, max_lines=None):
+    collector = _LineCollector(max_lines)
+    parser = _StreamParser(collector)
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+        collector.flush()
+    except _LineBudgetReached:
+        pass
+    return collector.lines
+
+
+def _lxml_engine(chunks, max_lines=None):
+    collector = _LineCollector(max_lines)
+    parser = etree.HTMLParser(target=_LxmlTarget(collector))
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+    except _LineBudgetReached:
+        pass
+    except etree.XMLSyntaxError:
+        collector.flush()  # nothing parseable was fed (e.g., an empty body)
+    return collector.lines
+
+
+def _bs4_engine(chunks, max_lines=None):
+    soup = BeautifulSoup("".join(chunks), "html.parser")
+
+    # Remove unwanted tags
+    for tag in soup(list(SKIP_TAGS)):
+        tag.decompose()
+
+    # Extract visible text
+    text = soup.get_text(separator="\n")
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return lines if max_lines is None else lines[:max_lines]
+
+
+# Extraction engines: callables `(chunks, max_lines=None) -> list[str]` taking an
+# iterable of markup strings and returning at most `max_lines` lines.
+ENGINES = {
+    "bs4": _bs4_engine,
+    "stream": _stream_engine,
+}
+if etree is not None:
+    ENGINES["lxml"] = _lxml_engine
+
+
+def get_engine(name=None):
+    """Return the extraction engine `name`, else `HTML_ENGINE`, else `stream`.
+
+    Raises
+    ------
+    ValueError
+        If the requested engine is unknown or its library is not installed.
+    """
+    name = name or os.getenv("HTML_ENGINE") or "stream"
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable HTML engine '{name}' (available: {', '.join(ENGINES)})")
+
+
+def html_to_lines(html, max_lines=None, engine=None):
+    """Convert HTML into the list of visible, non-empty text lines.
+
+    Under the hood:
+    - Drops the content of `script`, `style`, and `noscript` tags.
     - Extracts visible text, normalizes whitespace, and splits on line breaks.
-    - Writes the text to `output_file` **only** if `min_lines < line_count < max_lines` to avoid
-      extremely short or extremely noisy pages.
+    - Stops once `max_lines` lines were found, so oversized pages are not parsed to the end.
+
+    Parameters
+    ----------
+    html : str
+        Raw page markup.
+    max_lines : int | None, optional
+        Stop after this many lines, by default None (no limit).
+    engine : str | None, optional
+        Name of the extraction engine, by default :func:`get_engine`'s choice.
+
+    Returns
+    -------
+    list[str]
+        Stripped text lines with blanks removed (at most `max_lines`).
+    """
+    return get_engine(engine)([html], max_lines)
+
+
+def decode_body(body, encoding=None):
+    """Decode raw body bytes (or any bytes-like view) with `encoding`, falling back to UTF-8."""
+    try:
+        return str(body, encoding or "utf-8", "replace")
+    except LookupError:
+        return str(body, "utf-8", "replace")
+
+
+def _incremental_decoder(encoding=None):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def _fresh_validators(response, body_hash=None):
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "body_hash": body_hash,
+    }
+
+
+def download_body(url, validators=None, max_bytes=http_client.MAX_RESPONSE_BYTES):
+    """Download a page's raw bytes unless it is unchanged since the last fetch.
+
+    Sends the same conditional request as :func:`fetch_if_changed` but leaves
+    decoding and parsing to the caller, e.g. a :mod:`parse_pool` worker.
 
     Parameters
     ----------
     url : str
         The target page to fetch.
-    output_file : str | os.PathLike
-        Path for the text snapshot to write.
-    min_lines : int, optional
-        Minimum number of non-empty lines required to write the file, by default 120.
+    validators : dict | None, optional
+        `{"etag", "last_modified", "body_hash"}` from the previous fetch, by default None.
+    max_bytes : int, optional
+        Largest body accepted, by default `http_client.MAX_RESPONSE_BYTES`.
+
+    Returns
+    -------
+    tuple[bytes | None, str | None, dict]
+        The body, or None when the page is unchanged; the response's text encoding;
+        and the validators to store.
+
+    Raises
+    ------
+    requests.exceptions.RequestException
+        On connection problems, timeouts, oversized bodies or HTTP error status codes.
+    """
+    validators = validators or {}
+    response = rate_limiter.send(rate_limiter.host_endpoint(url), http_client.get, url,
+                                 stream=True, **_conditional_kwargs(validators))
+    try:
+        if response.status_code == 304:
+            return None, response.encoding, _not_modified(response, validators)
+        response.raise_for_status()
+        body = b"".join(http_client.iter_body(response, max_bytes))
+        fresh = _fresh_validators(response, hashlib.sha256(body).hexdigest())
+        if validators.get("body_hash") == fresh["body_hash"]:
+            return None, response.encoding, fresh
+        return body, response.encoding, fresh
+    finally:
+        response.close()
+
+
+def fetch_lines_if_changed(url, validators=None, max_lines=MAX_LINES,
+                           max_bytes=http_client.MAX_RESPONSE_BYTES, engine=None):
+    """Stream a page into text lines unless it is unchanged since the last fetch.
+
+    Under the hood:
+    - Sends the same conditional request as :func:`fetch_if_changed`.
+    - Without a stored `body_hash`, decodes the body chunk by chunk straight into the
+      extraction engine and stops downloading once `max_lines` lines were found.
+    - With one, reads the body (up to `max_bytes`) first so an identical body is
+      skipped without parsing (:func:`download_body`).
+
+    Parameters
+    ----------
+    url : str
+        The target page to fetch.
+    validators : dict | None, optional
+        `{"etag", "last_modified", "body_hash"}` from the previous fetch, by default None.
     max_lines : int, optional
-        Maximum number of lines allowed, by default 10000.
+        Line budget; extraction stops once it is reached, by default `MAX_LINES`.
+    max_bytes : int, optional
+        Largest body accepted, by default `http_client.MAX_RESPONSE_BYTES`.
+    engine : str | None, optional
+        Name of the extraction engine, by default :func:`get_engine`'s choice.
 
     Returns
     -------
-    None
-        Writes a file and prints a short status message.
+    tuple[list[str] | None, dict]
+        The lines, or None when the page is unchanged, and the validators to store.
+        `body_hash` is None when the download stopped early.
+
+    Raises
+    ------
+    requests.exceptions.RequestException
+        On connection problems, timeouts, oversized bodies or HTTP error status codes.
     """
+    validators = validators or {}
+    if validators.get("body_hash"):
+        body, encoding, fresh = download_body(url, validators, max_bytes)
+        if body is None:
+            return None, fresh
+        return html_to_lines(decode_body(body, encoding), max_lines, engine), fresh
+
+    response = rate_limiter.send(rate_limiter.host_endpoint(url), http_client.get, url,
+                                 stream=True, **_conditional_kwargs(validators))
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # raises error for bad status codes
-        soup = BeautifulSoup(response.text, "html.parser")
+        if response.status_code == 304:
+            return None, _not_modified(response, validators)
+        response.raise_for_status()
+        hasher = hashlib.sha256()
+        decoder = _incremental_decoder(response.encoding)
+
+        def chunks():
+            for raw in http_client.iter_body(response, max_bytes):
+                hasher.update(raw)
+                yield decoder.decode(raw)
+            yield decoder.decode(b"", final=True)
+
+        fresh = _fresh_validators(response)
+        lines = get_engine(engine)(chunks(), max_lines)
+        if max_lines is None or len(lines) < max_lines:
+            fresh["body_hash"] = hasher.hexdigest()
+        return lines, fresh
+    finally:
+        response.close()
+
 
-        # Remove unwanted tags
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
+def within_line_limits(line_count, min_lines=MIN_LINES, max_lines=MAX_LINES):
+    """Return True when a snapshot of `line_count` lines is worth keeping."""
+    return line_count > min_lines and line_count < max_lines
 
-        # Extract visible text
-        text = soup.get_text(separator="\n")
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        line_count = len(lines)
 
-        # Only create the file if it meets the minimum line count
-        if line_count > min_lines and line_count < max_lines:
+def save_lines(lines, output_file, min_lines=MIN_LINES, max_lines=MAX_LINES):
+    """Write `lines` as a snapshot if their count is within the limits.
+
+    Parameters
+    ----------
+    lines : list[str]
+        Extracted text lines.
+    output_file : str | os.PathLike | Callable[[str], Any]
+        Snapshot path, or a callable that stores the snapshot text
+        (e.g., :class:`snapshot_store.StoreSink`).
+    min_lines, max_lines : int, optional
+        Line limits, as in :func:`extract_content`.
+
+    Returns
+    -------
+    str
+        `"saved"`, or `"skipped"` when the page is too short or too long.
+    """
+    line_count = len(lines)
+
+    # Only create the file if it meets the minimum line count
+    if within_line_limits(line_count, min_lines, max_lines):
+        if callable(output_file):
+            output_file("\n".join(lines))
+        else:
             with open(output_file, "w", encoding="utf-8") as file:
                 file.write("\n".join(lines))
-            print(f"✅ {output_file} saved ({line_count} lines).")
-        else:
-            print(f"⚠️ Skipped {output_file} — only {line_count} lines.")
+        print(f"✅ {output_file} saved ({line_count} lines).")
+        return "saved"
+    print(f"⚠️ Skipped {output_file} — only {line_count} lines.")
+    return "skipped"
+
+
+def refresh_content(url, output_file, validators=None, min_lines=MIN_LINES, max_lines=MAX_LINES):
+    """Conditionally re-fetch a page and rewrite its snapshot only when it changed.
+
+    Works like :func:`extract_content`, but fetches through :func:`fetch_lines_if_changed`;
+    an unchanged page leaves `output_file` untouched and is not parsed.
+
+    Parameters
+    ----------
+    url : str
+        The target page to fetch.
+    output_file : str | os.PathLike | Callable[[str], Any]
+        Path for the text snapshot to write, or a callable storing it (see :func:`save_lines`).
+    validators : dict | None, optional
+        Validators returned by the previous refresh; pass None to force a full fetch.
+    min_lines : int, optional
+        Minimum number of non-empty lines required to write the file, by default 120.
+    max_lines : int, optional
+        Maximum number of lines allowed, by default 10000.
+
+    Returns
+    -------
+    tuple[str, dict | None]
+        The outcome — `"saved"`, `"unchanged"`, `"skipped"` (outside the line limits)
+        or `"failed"` — and the validators to store (None when the fetch failed).
+    """
+    try:
+        lines, fresh = fetch_lines_if_changed(url, validators, max_lines)
+        if lines is None:
+            print(f"⏭️ {output_file} unchanged since last fetch.")
+            return "unchanged", fresh
+        return save_lines(lines, output_file, min_lines, max_lines), fresh
 
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching {url}: {e}")
\ No newline at end of file
+        print(f"Error fetching {url}: {e}")
+    return "failed", None
+
+
+def extract_content(url, output_file, min_lines=MIN_LINES, max_lines=MAX_LINES):
+    """Fetch and save a cleaned, plain-text snapshot of a web page.
+
+    Under the hood:
+    - Streams the URL into the extraction engine and raises on HTTP errors
+      (:func:`fetch_lines_if_changed`); the download stops once `max_lines` is reached.
+    - Drops `script`, `style`, and `noscript` content, normalizes whitespace, and
+      splits visible text on line breaks (:func:`html_to_lines` semantics).
+    - Writes the text to `output_file` **only** if `min_lines < line_count < max_lines` to avoid
+      extremely short or extremely noisy pages.
+
+    Parameters
+    ----------
+    url : str
+        The target page to fetch.
+    output_file : str | os.PathLike
+        Path for the text snapshot to write.
+    min_lines : int, optional
+        Minimum number of non-empty lines required to write the file, by default 120.
+    max_lines : int, optional
+        Maximum number of lines allowed, by default 10000.
+
+    Returns
+    -------
+    bool
+        True when the snapshot was written; False when it was skipped or the fetch failed.
+        A short status message is printed either way.
+    """
+    status, _ = refresh_content(url, output_file, None, min_lines, max_lines)
+    return status == "saved"
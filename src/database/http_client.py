@@ -0,0 +1,159 @@
+"""Shared, pooled HTTP transport for every `requests` call in the pipeline.
+
+`google_tools`, `html_tools` and `database_query` send their requests through this
+module instead of bare `requests.get` / `requests.post`, which gives them:
+- one process-wide `requests.Session` with per-host keep-alive connection pools,
+  so hundreds of fetches reuse warm TCP+TLS connections;
+- connect and read timeouts on every call, so one slow host cannot stall a build;
+- bounded retries with jittered exponential backoff for connection errors and
+  transient 5xx responses (HTTP 429 is left to `rate_limiter`, which honors
+  `Retry-After` across all threads);
+- a maximum response size, enforced while the body streams in;
+- `stream=True` for callers that consume the body chunk by chunk (see
+  :func:`iter_body`) and may stop reading early.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = 5.0          # seconds to establish a connection
+READ_TIMEOUT = 30.0            # seconds between bytes once connected
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5           # 0.5s, 1s, 2s, ... between retries
+BACKOFF_JITTER = 0.5           # plus up to this many random seconds
+RETRY_STATUSES = (500, 502, 503, 504)
+MAX_RESPONSE_BYTES = 10 * 1024 * 1024
+POOL_CONNECTIONS = 64          # number of hosts with a cached pool
+POOL_MAXSIZE = 16              # keep-alive connections kept per host
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """Raised when a response body exceeds the allowed number of bytes."""
+
+
+def build_session():
+    """Create a `requests.Session` with pooled, retrying adapters.
+
+    Returns
+    -------
+    requests.Session
+        Session whose HTTP and HTTPS adapters keep up to `POOL_MAXSIZE`
+        connections per host and retry transient failures.
+    """
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        # Places Text Search is a read despite being a POST
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Return the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def reset():
+    """Close the shared session and its pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def iter_body(response, max_bytes=MAX_RESPONSE_BYTES):
+    """Yield the raw body of a streamed response in `CHUNK_SIZE` pieces.
+
+    Raises
+    ------
+    ResponseTooLarge
+        As soon as the body (or its declared `Content-Length`) exceeds `max_bytes`.
+    """
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLarge(f"{response.url} declares {declared} bytes (limit {max_bytes})")
+    received = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        received += len(chunk)
+        if received > max_bytes:
+            raise ResponseTooLarge(f"{response.url} exceeded {max_bytes} bytes")
+        yield chunk
+
+
+def request(method, url, max_bytes=MAX_RESPONSE_BYTES, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            stream=False, **kwargs):
+    """Send a request on the shared session and read at most `max_bytes` of body.
+
+    Under the hood:
+    - Streams the body in `CHUNK_SIZE` pieces and aborts as soon as it grows past
+      `max_bytes` (or immediately when `Content-Length` already says so).
+    - Stores the body on the response, so `.text`, `.content` and `.json()` work as usual.
+    - With `stream=True` a successful (2xx) response is returned unread instead;
+      the caller reads it with :func:`iter_body` and must `close()` it. Other
+      statuses are read as usual so error handling is unchanged.
+
+    Parameters
+    ----------
+    method : str
+        HTTP method, e.g. `"GET"`.
+    url : str
+        Target URL.
+    max_bytes : int, optional
+        Largest body accepted, by default `MAX_RESPONSE_BYTES`.
+    timeout : float | tuple[float, float], optional
+        `(connect, read)` timeouts in seconds.
+    stream : bool, optional
+        Leave a successful body unread for :func:`iter_body`, by default False.
+    **kwargs :
+        Passed to `requests.Session.request` (`params`, `headers`, `data`, ...).
+
+    Returns
+    -------
+    requests.Response
+        The fully-read response (unread for a 2xx response when `stream=True`).
+
+    Raises
+    ------
+    ResponseTooLarge
+        If the body exceeds `max_bytes`.
+    requests.exceptions.RequestException
+        On connection errors and timeouts once retries are exhausted.
+    """
+    response = get_session().request(method, url, stream=True, timeout=timeout, **kwargs)
+    if stream and 200 <= response.status_code < 300:
+        return response
+    try:
+        response._content = b"".join(iter_body(response, max_bytes))
+    finally:
+        # Hands the connection back to the pool (or drops it after an abort)
+        response.close()
+    return response
+
+
+def get(url, **kwargs):
+    """`GET` through :func:`request`."""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """`POST` through :func:`request`."""
+    return request("POST", url, **kwargs)
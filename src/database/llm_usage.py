@@ -0,0 +1,244 @@
+"""Token, latency and cost accounting for LLM calls.
+
+This module provides:
+- `UsageLog`: a SQLite table (`llm_calls`) with one row per API call — prompt and
+  completion tokens, latency, size of the text sent, model, mode (`sync`, `async`,
+  `stream`, `batch`) and a label naming the restaurant or CSV it was made for;
+- `record_call`: called by :mod:`menu_recreator`, :mod:`menu_stream` and
+  :mod:`menu_batch` with each response's `usage`; cached replies make no call and
+  are not recorded;
+- a per-run token budget (`set_budget` / `budget_exhausted`) that the pipeline checks
+  before scheduling each new extraction;
+- `print_report`: run totals, estimated cost (`PRICES`) and the most expensive labels.
+
+Calls are labelled with the `labelled(label)` context manager; the label follows
+the caller into :func:`executor.run_stage` worker threads and asyncio tasks.
+
+Environment:
+- LLM_USAGE_PATH: SQLite file for the usage log (default `llm_usage.db` next to this
+  module). Set it to `off` to skip persisting calls; run totals and the budget still work.
+"""
+import contextlib
+import contextvars
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+# Estimated USD per million (prompt, completion) tokens, per model.
+PRICES = {
+    "gpt-5-mini": (0.25, 2.00),
+}
+
+_label = contextvars.ContextVar("llm_usage_label", default=None)
+
+_shared = None
+_shared_lock = threading.Lock()
+_run = {"id": uuid.uuid4().hex, "tokens": 0, "calls": 0, "budget": None}
+
+
+class UsageLog:
+    """Thread-safe accessor for the `llm_calls` table.
+
+    Parameters
+    ----------
+    db_path : str
+        SQLite file holding the log (created if missing).
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    called_at TEXT NOT NULL,
+                    label TEXT,
+                    model TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    snapshot_chars INTEGER NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    latency REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_llm_calls_run ON llm_calls(run_id);
+            """)
+            self.conn.commit()
+
+    def record(self, run_id, label, model, mode, snapshot_chars, prompt_tokens, completion_tokens, latency):
+        """Append one call to the log."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO llm_calls (run_id, called_at, label, model, mode, snapshot_chars, "
+                "prompt_tokens, completion_tokens, latency) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, datetime.now(timezone.utc).isoformat(timespec="seconds"), label, model, mode,
+                 snapshot_chars, prompt_tokens, completion_tokens, latency),
+            )
+            self.conn.commit()
+
+    def summary(self, run_id, limit=5):
+        """Summarize the calls of one run.
+
+        Parameters
+        ----------
+        run_id : str
+            Run to summarize (see :func:`run_id`).
+        limit : int, optional
+            Number of labels listed in `"top"`, by default 5.
+
+        Returns
+        -------
+        dict
+            `calls`, `prompt_tokens`, `completion_tokens`, `latency` (total seconds),
+            `cost` (estimated USD), `by_model` (`{model: (prompt, completion)}`) and
+            `top`: `(label, calls, tokens, latency, snapshot_chars)` for the labels
+            with the most tokens.
+        """
+        with self.lock:
+            by_model = {model: (p, c) for model, p, c in self.conn.execute(
+                "SELECT model, SUM(prompt_tokens), SUM(completion_tokens) FROM llm_calls "
+                "WHERE run_id = ? GROUP BY model", (run_id,))}
+            calls, latency = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(latency), 0) FROM llm_calls WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            top = self.conn.execute(
+                "SELECT label, COUNT(*), SUM(prompt_tokens + completion_tokens) AS tokens, "
+                "COALESCE(SUM(latency), 0), SUM(snapshot_chars) FROM llm_calls WHERE run_id = ? "
+                "GROUP BY label ORDER BY tokens DESC LIMIT ?", (run_id, limit)
+            ).fetchall()
+        return {
+            "calls": calls,
+            "prompt_tokens": sum(p for p, _ in by_model.values()),
+            "completion_tokens": sum(c for _, c in by_model.values()),
+            "latency": latency,
+            "cost": sum(cost(model, p, c) for model, (p, c) in by_model.items()),
+            "by_model": by_model,
+            "top": top,
+        }
+
+    def close(self):
+        """Close the underlying connection."""
+        with self.lock:
+            self.conn.close()
+
+
+def get_log():
+    """Return the shared log configured by `LLM_USAGE_PATH`, or None when disabled."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            path = os.getenv("LLM_USAGE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_usage.db"))
+            if path.lower() == "off":
+                return None
+            _shared = UsageLog(path)
+        return _shared
+
+
+def reset():
+    """Close the shared log and start a new run with no tokens spent and no budget."""
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+        _shared = None
+        _run.update(id=uuid.uuid4().hex, tokens=0, calls=0, budget=None)
+
+
+def run_id():
+    """Return the id under which this run's calls are logged."""
+    return _run["id"]
+
+
+def cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD for a call, per `PRICES` (0.0 for unknown models)."""
+    prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+@contextlib.contextmanager
+def labelled(label):
+    """Label every call recorded inside the block (e.g., with the restaurant name)."""
+    token = _label.set(label)
+    try:
+        yield
+    finally:
+        _label.reset(token)
+
+
+def _field(usage, name):
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return value if isinstance(value, int) else 0
+
+
+def record_call(usage, model, text, latency=None, mode="sync", label=None):
+    """Record one API call and add its tokens to the run total.
+
+    Parameters
+    ----------
+    usage : Any
+        The response's `usage` (object or dict with `prompt_tokens` and
+        `completion_tokens`); None counts as zero tokens.
+    model : str
+        Model the call was made with.
+    text : str
+        Snapshot text (or chunk) sent with the prompt; its length is logged.
+    latency : float | None, optional
+        Seconds the API took to answer, when known.
+    mode : str, optional
+        `"sync"`, `"async"`, `"stream"` or `"batch"`, by default `"sync"`.
+    label : str | None, optional
+        Overrides the label set with :func:`labelled`.
+
+    Returns
+    -------
+    int
+        Total tokens of the call.
+    """
+    prompt_tokens, completion_tokens = _field(usage, "prompt_tokens"), _field(usage, "completion_tokens")
+    with _shared_lock:
+        _run["tokens"] += prompt_tokens + completion_tokens
+        _run["calls"] += 1
+    log = get_log()
+    if log is not None:
+        log.record(_run["id"], label if label is not None else _label.get(), model, mode,
+                   len(text), prompt_tokens, completion_tokens, latency)
+    return prompt_tokens + completion_tokens
+
+
+def set_budget(tokens):
+    """Stop scheduling new extractions once this run has used `tokens` tokens (None: no limit)."""
+    _run["budget"] = tokens
+
+
+def run_tokens():
+    """Return the tokens used by calls recorded in this run."""
+    return _run["tokens"]
+
+
+def budget_remaining():
+    """Return the tokens left in this run's budget, or None without a budget."""
+    budget = _run["budget"]
+    return None if budget is None else max(0, budget - _run["tokens"])
+
+
+def budget_exhausted():
+    """True when a budget is set and this run has used all of it."""
+    return budget_remaining() == 0
+
+
+def print_report(limit=5):
+    """Print this run's LLM calls, tokens, latency, estimated cost and costliest labels."""
+    log = get_log()
+    if log is None:
+        print(f"🧾 LLM usage: {_run['calls']} calls, {_run['tokens']} tokens")
+        return
+    s = log.summary(_run["id"], limit)
+    print(f"🧾 LLM usage: {s['calls']} calls, {s['prompt_tokens']} prompt + {s['completion_tokens']} "
+          f"completion tokens, {s['latency']:.1f}s, ~${s['cost']:.4f}")
+    if _run["budget"] is not None:
+        print(f"   token budget: {_run['tokens']} of {_run['budget']} used")
+    for label, calls, tokens, latency, chars in s["top"]:
+        print(f"   {label or '(unlabelled)':<30} {calls} calls, {tokens} tokens, {latency:.1f}s, {chars} chars sent")
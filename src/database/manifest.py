@@ -0,0 +1,152 @@
+"""Persistent build manifest for resumable, incremental pipeline runs.
+
+The manifest is a small SQLite table with one row per restaurant recording:
+- the resolved menu `url` (or the `url_error` of a failed lookup) and when,
+- the `snapshot_hash` of the last saved page snapshot and when it was fetched,
+  plus the HTTP validators (`etag`, `last_modified`, `body_hash`) of that fetch,
+- the snapshot hash and `csv_hash` of the last rebuilt menu, when it finished and
+  whether it came from the rule-based parser or the LLM (`menu_path`),
+- the CSV hash that was last loaded into the menu database and when.
+
+`Main.py` consults it before every unit of work so that a rerun skips restaurants
+whose inputs have not changed and resumes after a crash at the exact restaurant
+that failed. Each stage writes its row as soon as that restaurant finishes.
+"""
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+
+def hash_text(text):
+    """Return the SHA-256 hex digest of `text` (UTF-8)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file's bytes, or None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class Manifest:
+    """Thread-safe accessor for the `build_manifest` table.
+
+    Parameters
+    ----------
+    db_path : str
+        SQLite file holding the manifest (created if missing).
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS build_manifest (
+                    restaurant TEXT PRIMARY KEY,
+                    url TEXT,
+                    url_at TEXT,
+                    url_error TEXT,
+                    snapshot_hash TEXT,
+                    snapshot_at TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash TEXT,
+                    menu_snapshot_hash TEXT,
+                    csv_hash TEXT,
+                    menu_at TEXT,
+                    menu_path TEXT,
+                    loaded_csv_hash TEXT,
+                    load_at TEXT
+                )
+            """)
+            # Columns added after the first release of the manifest
+            existing = {row["name"] for row in self.conn.execute("PRAGMA table_info(build_manifest)")}
+            for column in ("url_error", "etag", "last_modified", "body_hash", "menu_path"):
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE build_manifest ADD COLUMN {column} TEXT")
+            self.conn.commit()
+
+    def get(self, restaurant):
+        """Return the manifest row for `restaurant` as a dict (empty if unknown)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM build_manifest WHERE restaurant = ?", (restaurant,)
+            ).fetchone()
+        return dict(row) if row else {}
+
+    def _update(self, restaurant, **fields):
+        assignments = ", ".join(f"{k} = excluded.{k}" for k in fields)
+        names = ", ".join(("restaurant",) + tuple(fields))
+        marks = ", ".join("?" for _ in range(len(fields) + 1))
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO build_manifest ({names}) VALUES ({marks}) "
+                f"ON CONFLICT(restaurant) DO UPDATE SET {assignments}",
+                (restaurant, *fields.values()),
+            )
+            self.conn.commit()
+
+    def record_url(self, restaurant, url):
+        """Store the resolved URL; a changed URL invalidates the previous snapshot."""
+        if self.get(restaurant).get("url") not in (None, url):
+            self._update(restaurant, snapshot_at=None, etag=None, last_modified=None, body_hash=None)
+        self._update(restaurant, url=url, url_at=_now(), url_error=None)
+
+    def record_url_failure(self, restaurant, error):
+        """Store why a URL lookup failed; a later run retries it."""
+        self._update(restaurant, url_error=error, url_at=_now())
+
+    def record_snapshot(self, restaurant, snapshot_hash):
+        """Mark the fetch stage finished with the given snapshot hash."""
+        self._update(restaurant, snapshot_hash=snapshot_hash, snapshot_at=_now())
+
+    def record_validators(self, restaurant, validators):
+        """Store the `etag`, `last_modified` and `body_hash` of the last fetch."""
+        self._update(restaurant, **{k: validators.get(k) for k in ("etag", "last_modified", "body_hash")})
+
+    def validators(self, restaurant):
+        """Return the stored validators for a conditional re-fetch (values may be None)."""
+        entry = self.get(restaurant)
+        return {k: entry.get(k) for k in ("etag", "last_modified", "body_hash")}
+
+    def record_menu(self, restaurant, snapshot_hash, csv_hash, path="llm"):
+        """Mark the menu stage finished for `snapshot_hash`, producing `csv_hash`.
+
+        `path` records how the menu was built: `"rules"` (:mod:`menu_parser`) or `"llm"`.
+        """
+        self._update(restaurant, menu_snapshot_hash=snapshot_hash, csv_hash=csv_hash, menu_at=_now(), menu_path=path)
+
+    def record_load(self, restaurant, csv_hash):
+        """Mark the database load finished for `csv_hash`."""
+        self._update(restaurant, loaded_csv_hash=csv_hash, load_at=_now())
+
+    def snapshot_is_fresh(self, restaurant, max_age_hours):
+        """True when the snapshot was fetched less than `max_age_hours` ago."""
+        fetched = self.get(restaurant).get("snapshot_at")
+        if not fetched:
+            return False
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(fetched)
+        return age < timedelta(hours=max_age_hours)
+
+    def menu_is_current(self, restaurant, snapshot_hash):
+        """True when the last menu was rebuilt from exactly this snapshot."""
+        return snapshot_hash is not None and self.get(restaurant).get("menu_snapshot_hash") == snapshot_hash
+
+    def load_is_current(self, restaurant, csv_hash):
+        """True when exactly this CSV has already been loaded into the database."""
+        return csv_hash is not None and self.get(restaurant).get("loaded_csv_hash") == csv_hash
+
+    def close(self):
+        """Close the underlying connection."""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,249 @@
+"""OpenAI Batch API mode for bulk menu rebuilds.
+
+A full rebuild does not need interactive latency, so `run_batch` sends every
+snapshot as one asynchronous batch job instead of one request per restaurant:
+- snapshots are split with :func:`menu_recreator.chunk_text`; chunks whose reply
+  is already in the `"llm"` response cache are left out of the batch;
+- the rest are packaged as Chat Completions requests (one JSONL line per chunk)
+  and submitted through a *backend*, which is polled until the job finishes;
+- each reply is stored in the LLM cache and goes through
+  :func:`menu_recreator.clean_menu_rows`; the chunks of a snapshot are merged with
+  :func:`menu_recreator.merge_rows` into its CSV, exactly like a synchronous call;
+- each answered request is recorded with :mod:`llm_usage`. With a token budget set,
+  snapshots whose estimated prompt tokens no longer fit in it are left out of the batch.
+
+Backends implement `submit(requests) -> batch_id`, `poll(batch_id) -> (status, counts)`
+and `results(batch_id) -> {custom_id: (reply, error)}`, and may expose the token usage
+of each answered request as `usage` (`{custom_id: usage}`). `OpenAIBatchBackend` talks to
+the Batch API; `LocalBatchBackend` answers in-process so the flow can be tested offline.
+"""
+import json
+import os
+import time
+
+import llm_usage
+import menu_pruner
+import menu_recreator
+import rate_limiter
+import response_cache
+from executor import StageStats
+
+DEFAULT_POLL_INTERVAL = 30.0  # seconds between status checks
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _reply_from_line(line):
+    """Return `(reply, error)` for one Batch API output or error line."""
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or (response.get("body") or {}).get("error") or {}
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        return None, message or f"HTTP {response.get('status_code')}"
+    choice = (response["body"].get("choices") or [{}])[0]
+    content = (choice.get("message") or {}).get("content")
+    try:
+        return menu_recreator.checked_reply(content, choice.get("finish_reason")), None
+    except menu_recreator.IncompleteReply as e:
+        return None, str(e)
+
+
+class OpenAIBatchBackend:
+    """Submit and poll jobs on the OpenAI Batch API.
+
+    Parameters
+    ----------
+    client : openai.OpenAI | None, optional
+        Client to use, by default :data:`menu_recreator.client`.
+    completion_window : str, optional
+        Batch completion window, by default `"24h"`.
+    """
+
+    def __init__(self, client=None, completion_window="24h"):
+        self.client = client or menu_recreator.client
+        self.completion_window = completion_window
+        self.output_files = {}
+        self.usage = {}
+
+    def submit(self, requests):
+        """Upload `requests` (dicts with `custom_id` and `body`) as JSONL and create the batch."""
+        lines = [
+            json.dumps({"custom_id": r["custom_id"], "method": "POST", "url": "/v1/chat/completions", "body": r["body"]})
+            for r in requests
+        ]
+        upload = self.client.files.create(
+            file=("menus.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window=self.completion_window
+        )
+        return batch.id
+
+    def poll(self, batch_id):
+        """Return `(status, {"completed": n, "failed": n, "total": n})` for the batch."""
+        batch = self.client.batches.retrieve(batch_id)
+        self.output_files[batch_id] = (batch.output_file_id, batch.error_file_id)
+        counts = batch.request_counts
+        return batch.status, {
+            "completed": getattr(counts, "completed", 0),
+            "failed": getattr(counts, "failed", 0),
+            "total": getattr(counts, "total", 0),
+        }
+
+    def results(self, batch_id):
+        """Download the output and error files of a finished batch, keeping each reply's `usage`."""
+        replies = {}
+        for file_id in self.output_files.get(batch_id, ()):
+            if not file_id:
+                continue
+            for raw in self.client.files.content(file_id).text.splitlines():
+                if raw.strip():
+                    line = json.loads(raw)
+                    replies[line["custom_id"]] = _reply_from_line(line)
+                    self.usage[line["custom_id"]] = ((line.get("response") or {}).get("body") or {}).get("usage")
+        return replies
+
+
+class LocalBatchBackend:
+    """In-process stand-in for the Batch API, for offline runs and tests.
+
+    Parameters
+    ----------
+    complete : Callable[[dict], str]
+        Returns the reply text for one Chat Completions request body; raising (or
+        an empty reply) marks that request as failed.
+    polls_until_done : int, optional
+        Number of `poll` calls reporting `"in_progress"` before `"completed"`, by default 1.
+    """
+
+    def __init__(self, complete, polls_until_done=1):
+        self.complete = complete
+        self.polls_until_done = polls_until_done
+        self.batches = {}
+
+    def submit(self, requests):
+        """Store the requests and return a new batch id."""
+        batch_id = f"batch_local_{len(self.batches) + 1}"
+        self.batches[batch_id] = {"requests": list(requests), "polls": 0}
+        return batch_id
+
+    def poll(self, batch_id):
+        """Report `"in_progress"` for `polls_until_done` calls, then `"completed"`."""
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        total = len(batch["requests"])
+        if batch["polls"] <= self.polls_until_done:
+            return "in_progress", {"completed": 0, "failed": 0, "total": total}
+        return "completed", {"completed": total, "failed": 0, "total": total}
+
+    def results(self, batch_id):
+        """Answer every stored request with `complete`."""
+        replies = {}
+        for request in self.batches[batch_id]["requests"]:
+            try:
+                replies[request["custom_id"]] = menu_recreator.checked_reply(self.complete(request["body"]), None), None
+            except Exception as e:
+                replies[request["custom_id"]] = None, str(e) or type(e).__name__
+        return replies
+
+
+def wait_for_batch(backend, batch_id, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Poll `batch_id` every `poll_interval` seconds until it reaches a terminal status.
+
+    Returns
+    -------
+    str
+        The final status (`"completed"`, `"failed"`, `"expired"` or `"cancelled"`).
+    """
+    while True:
+        status, counts = backend.poll(batch_id)
+        print(f"⏳ Batch {batch_id}: {status} ({counts['completed']}/{counts['total']} done, {counts['failed']} failed)")
+        if status in TERMINAL_STATUSES:
+            return status
+        time.sleep(poll_interval)
+
+
+def run_batch(jobs, backend, prune=True, poll_interval=DEFAULT_POLL_INTERVAL, on_result=None):
+    """Rebuild many menus with one batch job, recording failures per output file.
+
+    Parameters
+    ----------
+    jobs : Iterable[tuple[str, str]]
+        `(raw_text, output_file)` pairs.
+    backend : OpenAIBatchBackend | LocalBatchBackend
+        Submission and polling layer.
+    prune : bool, optional
+        Send only the detected menu regions to the model, by default True.
+    poll_interval : float, optional
+        Seconds between status checks, by default `DEFAULT_POLL_INTERVAL`.
+    on_result : Callable[[str, str | None], None] | None, optional
+        Called as `on_result(output_file, error)` when each job finishes.
+
+    Returns
+    -------
+    tuple[dict[str, str], StageStats]
+        Error messages by output file, and stage timing.
+    """
+    jobs = list(jobs)
+    start = time.perf_counter()
+    cache = response_cache.get_cache()
+    failures = {}
+
+    def cache_key(chunk):
+        return response_cache.request_key("llm", menu_recreator.llm_cache_request(chunk))
+
+    # replies[i][j] is `(reply, error)` for chunk j of job i, or None while pending
+    chunks, replies, pending = [], [], {}
+    budget = llm_usage.budget_remaining()
+    for index, (raw_text, output_file) in enumerate(jobs):
+        text = menu_pruner.prune_for_llm(raw_text, output_file) if prune else raw_text
+        chunks.append(menu_recreator.chunk_text(text))
+        replies.append([None] * len(chunks[-1]))
+        misses = []
+        for part, chunk in enumerate(chunks[-1]):
+            hit, reply = cache.get("llm", cache_key(chunk)) if cache is not None else (False, None)
+            if hit:
+                replies[index][part] = reply, None
+            else:
+                misses.append(part)
+        if budget is not None and misses:
+            estimated = sum(rate_limiter.estimate_tokens(menu_recreator.build_prompt(chunks[-1][part]))
+                            for part in misses)
+            if estimated > budget:
+                for part in misses:
+                    replies[index][part] = None, "token budget reached"
+                continue
+            budget -= estimated
+        for part in misses:
+            pending[f"menu-{index}-{part}"] = index, part
+
+    if pending:
+        batch_id = backend.submit(
+            [{"custom_id": custom_id, "body": menu_recreator.chat_request(chunks[index][part])}
+             for custom_id, (index, part) in pending.items()]
+        )
+        print(f"📦 Submitted batch {batch_id} with {len(pending)} requests")
+        status = wait_for_batch(backend, batch_id, poll_interval)
+        results = backend.results(batch_id)
+        usage = getattr(backend, "usage", {})
+        for custom_id, (index, part) in pending.items():
+            reply, error = results.get(custom_id, (None, f"no result (batch {status})"))
+            if error is None:
+                llm_usage.record_call(usage.get(custom_id), menu_recreator.MODEL, chunks[index][part],
+                                      mode="batch", label=os.path.basename(str(jobs[index][1])))
+                if cache is not None:
+                    cache.set("llm", cache_key(chunks[index][part]), reply)
+            replies[index][part] = reply, error
+
+    for (_, output_file), parts in zip(jobs, replies):
+        errors = [error for _, error in parts if error is not None]
+        if errors:
+            failures[output_file] = errors[0]
+        else:
+            rows = [menu_recreator.clean_menu_rows(reply) for reply, _ in parts]
+            menu_recreator.write_menu_csv(rows[0] if len(rows) == 1 else menu_recreator.merge_rows(rows), output_file)
+            print(f"✅ Menu successfully saved to {output_file}")
+        if on_result is not None:
+            on_result(output_file, errors[0] if errors else None)
+
+    stats = StageStats("llm", len(jobs), 1, time.perf_counter() - start)
+    return failures, stats
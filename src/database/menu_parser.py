@@ -0,0 +1,129 @@
+"""Rule-based fast path for menus that are already cleanly laid out.
+
+Many snapshots list their items as `Dish ... $9.99` lines (or a dish line followed by
+a price line). `parse_menu` extracts those locally and scores how much of the page it
+understood; when the score reaches `FAST_PATH_THRESHOLD`, the rows are used as-is
+and the LLM is skipped:
+- an item is a short dish-like line ending in a price, or a dish-like line directly
+  followed by a price-only line; a prose line right after an item is its description;
+- items under a drinks heading, or named only as a drink ("Coke", "Large Iced Tea";
+  not "Beer-Battered Fish"), are dropped (the LLM prompt ignores drinks too), but
+  still count as understood;
+- the confidence is the share of priced lines (per :data:`menu_pruner.PRICE_RE`) that
+  were consumed as item prices, and 0 for pages with fewer than `MIN_ITEMS` items.
+Pages with several prices per line, prices inside prose or unusual layouts score low
+and go to the LLM.
+"""
+import re
+from dataclasses import dataclass
+
+from menu_pruner import BOILERPLATE_RE, PRICE_RE
+
+FAST_PATH_THRESHOLD = 0.9  # minimum confidence for skipping the LLM
+MIN_ITEMS = 5              # fewer items than this is never confident
+MAX_DISH_WORDS = 8
+MIN_DESCRIPTION_WORDS = 4
+
+_PRICE = r"(?:[$€£]\s?\d{1,4}(?:[.,]\d{2})?|\d{1,4}[.,]\d{2})"
+INLINE_RE = re.compile(rf"^(?P<dish>.*?[A-Za-z].*?)[\s.·…_:|-]*(?P<price>{_PRICE})$")
+PRICE_ONLY_RE = re.compile(rf"^{_PRICE}$")
+DRINK_TERMS = (r"(?:drinks?|beverages?|soda|pop|coke|sprite|lemonade|iced tea|hot tea|coffee|espresso|latte|"
+               r"cappuccino|juice|smoothie|milkshake|beer|wine|sake|cocktails?|margaritas?|bar menu)")
+# A section heading mentioning a drink ("Drinks", "Beer & Wine")
+DRINK_RE = re.compile(rf"\b{DRINK_TERMS}\b", re.IGNORECASE)
+# An item name that is nothing but a drink, give or take a size or serving word
+DRINK_NAME_RE = re.compile(
+    rf"(?:(?:small|medium|large|regular|fountain|bottled|canned|draft|house|diet|fresh)\s+)*{DRINK_TERMS}s?",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ParseResult:
+    """Outcome of :func:`parse_menu` for one snapshot."""
+
+    rows: list
+    confidence: float
+    priced_lines: int
+
+
+def _dish_like(line):
+    words = line.split()
+    return (1 <= len(words) <= MAX_DISH_WORDS and len(line) <= 60 and re.search(r"[A-Za-z]", line)
+            and not line.endswith((".", "!", "?")) and not BOILERPLATE_RE.search(line))
+
+
+def _starts_split_item(lines, i):
+    """True when `lines[i]` is a dish name whose price is on the next line."""
+    return i + 1 < len(lines) and PRICE_ONLY_RE.match(lines[i + 1]) and _dish_like(lines[i])
+
+
+def _description_like(lines, i):
+    line = lines[i]
+    return (len(line.split()) >= MIN_DESCRIPTION_WORDS and not PRICE_RE.search(line)
+            and not BOILERPLATE_RE.search(line) and not _starts_split_item(lines, i))
+
+
+def parse_menu(text):
+    """Extract `[Dish, Price, Description]` rows from a snapshot with local rules.
+
+    Parameters
+    ----------
+    text : str
+        Snapshot text, one line per visible text line.
+
+    Returns
+    -------
+    ParseResult
+        The rows (drinks excluded), a confidence in `[0, 1]` and the number of
+        priced lines on the page.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    priced = sum(1 for line in lines if PRICE_RE.search(line))
+    rows = []
+    items = 0
+    in_drinks = False
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        match = INLINE_RE.match(line)
+        if match and _dish_like(match["dish"].strip()):
+            item = [match["dish"].strip(), match["price"], ""]
+            i += 1
+        elif _starts_split_item(lines, i):
+            item = [line, lines[i + 1], ""]
+            i += 2
+        else:
+            if not PRICE_RE.search(line) and len(line.split()) <= 4:
+                # A short unpriced line between items is a section heading
+                in_drinks = bool(DRINK_RE.search(line))
+            i += 1
+            continue
+        items += 1
+        if i < len(lines) and _description_like(lines, i):
+            item[2] = lines[i]
+            i += 1
+        if not (in_drinks or DRINK_NAME_RE.fullmatch(item[0])):
+            rows.append(item)
+    confidence = items / priced if priced and items >= MIN_ITEMS else 0.0
+    return ParseResult(rows, confidence, priced)
+
+
+def confident_rows(text, threshold=None):
+    """Return the rule-based rows when :func:`parse_menu` is confident enough, else None.
+
+    Parameters
+    ----------
+    text : str
+        Snapshot text.
+    threshold : float | None, optional
+        Minimum confidence, by default `FAST_PATH_THRESHOLD`.
+
+    Returns
+    -------
+    list[list[str]] | None
+        Rows to use instead of an LLM call, or None to fall back to the LLM.
+    """
+    threshold = FAST_PATH_THRESHOLD if threshold is None else threshold
+    result = parse_menu(text)
+    return result.rows if result.rows and result.confidence >= threshold else None
@@ -0,0 +1,172 @@
+"""Deterministic menu-region detection for text snapshots.
+
+Snapshots contain every visible line of a page: navigation, opening hours, reviews,
+cookie banners and footers as well as the menu. Before a snapshot is sent to the
+LLM, `prune_menu_text` keeps only the regions that look like a menu:
+- every line gets a score from local signals: a price (`$12.99`, `14.95`), a short
+  dish-like line, a line shape that repeats across the page (menus are lists of
+  similarly-built entries), and penalties for boilerplate keywords and long prose;
+- sliding windows of `WINDOW` lines whose average score reaches `MIN_WINDOW_SCORE`
+  are kept, as is the neighbourhood of every priced line, so no priced item is lost;
+  boilerplate at the edges of a kept region is trimmed off again;
+- pages with fewer than `MIN_PRICED_LINES` priced lines are left untouched, since
+  there is no reliable signal to prune on.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+WINDOW = 8                 # lines per scoring window
+MIN_WINDOW_SCORE = 1.0     # average line score for a window to count as menu
+MIN_PRICED_LINES = 3       # below this the page is returned unchanged
+CONTEXT_BEFORE = 2         # lines kept above a priced line (dish name, section)
+CONTEXT_AFTER = 2          # lines kept below a priced line (description)
+MAX_GAP = 3                # kept regions closer than this are joined
+REPEATED_SHAPE = 3         # a line shape seen this often is "repeated structure"
+
+PRICE_RE = re.compile(r"(?:[$€£]\s?\d{1,4}(?:[.,]\d{2})?\b|\b\d{1,4}[.,]\d{2}\b)")
+BOILERPLATE_RE = re.compile(
+    r"\b(cookie (?:policy|settings|preferences)|(?:uses|accept(?: all)?) cookies|privacy|copyright|"
+    r"all rights reserved|terms of (?:use|service)|sign in|log ?in|sign up|subscribe|newsletter|"
+    r"follow us|reviews?|careers|powered by|accessibility)\b|©",
+    re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z'&-]*")
+
+
+@dataclass
+class PruneResult:
+    """Outcome of :func:`prune_menu_text` for one page."""
+
+    text: str
+    original_lines: int
+    kept_lines: int
+
+    @property
+    def ratio(self):
+        """Fraction of the page's lines that were kept (1.0 when nothing was pruned)."""
+        return self.kept_lines / self.original_lines if self.original_lines else 1.0
+
+
+def line_shape(line):
+    """Collapse a line into a coarse shape: words, numbers and prices become tokens."""
+    shape = PRICE_RE.sub(" P ", line)
+    shape = re.sub(r"\d+", " N ", shape)
+    shape = _WORD_RE.sub(" W ", shape)
+    tokens = shape.split()
+    # Runs of words collapse so "Pad Thai $9.99" and "Green Curry Chicken $12.99" match
+    collapsed = [t for i, t in enumerate(tokens) if i == 0 or t != tokens[i - 1] or t != "W"]
+    return " ".join(collapsed)
+
+
+def score_lines(lines):
+    """Return one menu-likelihood score per line.
+
+    Parameters
+    ----------
+    lines : list[str]
+        Snapshot lines (already stripped, no blanks).
+
+    Returns
+    -------
+    list[float]
+        Higher is more menu-like; boilerplate scores negative.
+    """
+    shapes = [line_shape(line) for line in lines]
+    shape_counts = Counter(shapes)
+    scores = []
+    for line, shape in zip(lines, shapes):
+        words = len(line.split())
+        score = 0.0
+        if PRICE_RE.search(line):
+            score += 3
+        if 1 <= words <= 8 and len(line) <= 60 and _WORD_RE.search(line) and not line.endswith((".", "!", "?")):
+            score += 1
+        if shape_counts[shape] >= REPEATED_SHAPE and "P" in shape.split():
+            score += 1
+        if BOILERPLATE_RE.search(line):
+            score -= 3
+        if words > 25:
+            score -= 1
+        scores.append(score)
+    return scores
+
+
+def menu_regions(lines, scores=None):
+    """Return the `(start, end)` line ranges (end exclusive) that look like menu content."""
+    scores = score_lines(lines) if scores is None else scores
+    n = len(lines)
+    keep = [False] * n
+    for start in range(max(1, n - WINDOW + 1)):
+        window = scores[start:start + WINDOW]
+        if window and sum(window) / len(window) >= MIN_WINDOW_SCORE:
+            for i in range(start, start + len(window)):
+                keep[i] = True
+    for i, line in enumerate(lines):
+        if PRICE_RE.search(line):
+            keep[i] = True
+            for j in range(max(0, i - CONTEXT_BEFORE), min(n, i + CONTEXT_AFTER + 1)):
+                keep[j] = keep[j] or scores[j] >= 0
+
+    regions = []
+    for i, kept in enumerate(keep):
+        if not kept:
+            continue
+        if regions and i - regions[-1][1] <= MAX_GAP:
+            regions[-1][1] = i + 1
+        else:
+            regions.append([i, i + 1])
+
+    def trimmable(i):
+        return scores[i] < 0 and not PRICE_RE.search(lines[i])
+
+    trimmed = []
+    for start, end in regions:
+        while start < end and trimmable(start):
+            start += 1
+        while end > start and trimmable(end - 1):
+            end -= 1
+        if start < end:
+            trimmed.append((start, end))
+    return trimmed
+
+
+def prune_menu_text(text):
+    """Keep only the menu-bearing regions of a snapshot.
+
+    Parameters
+    ----------
+    text : str
+        Snapshot text, one line per visible text line.
+
+    Returns
+    -------
+    PruneResult
+        The pruned text and the line counts before and after.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    priced = sum(1 for line in lines if PRICE_RE.search(line))
+    if priced < MIN_PRICED_LINES:
+        return PruneResult(text, len(lines), len(lines))
+    kept = [line for start, end in menu_regions(lines) for line in lines[start:end]]
+    return PruneResult("\n".join(kept), len(lines), len(kept))
+
+
+def prune_for_llm(text, label):
+    """Prune a snapshot and print its reduction ratio, e.g. before an LLM call.
+
+    Parameters
+    ----------
+    text : str
+        Snapshot text.
+    label : str
+        Page name used in the report line.
+
+    Returns
+    -------
+    str
+        The pruned text.
+    """
+    result = prune_menu_text(text)
+    print(f"✂️ {label}: kept {result.kept_lines}/{result.original_lines} lines ({result.ratio:.0%})")
+    return result.text
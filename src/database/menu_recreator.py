@@ -2,40 +2,92 @@
 
 This module asks an OpenAI chat model to extract structured menu items (Dish, Price, Description)
 from raw text snapshots and writes a clean CSV with exactly three columns (no header).
+
+Replies are memoized in the shared :mod:`response_cache` under the `"llm"` namespace,
+keyed by the hash of the text sent, `PROMPT_VERSION` and `MODEL`, so a rerun over
+unchanged snapshots makes no API calls. Bump `PROMPT_VERSION` whenever
+:func:`build_prompt` changes. Empty or truncated replies raise
+:class:`IncompleteReply` and are never cached.
+
+Snapshots longer than `CHUNK_LINES` lines or `CHUNK_CHARS` characters are split into
+overlapping chunks that are extracted in parallel and merged, with duplicate dishes
+from the overlaps removed (:func:`request_menu_rows`).
+
+:func:`recreate_menus` rebuilds many menus concurrently on one `AsyncOpenAI` client,
+with a per-request timeout; the API endpoint can be redirected (e.g., to a local
+stand-in server) with the `OPENAI_BASE_URL` environment variable.
+
+Every API call's token usage and latency is recorded with :mod:`llm_usage`;
+:func:`recreate_menus` stops starting new menus once the run's token budget
+(:func:`llm_usage.set_budget`) is spent.
 """
+import asyncio
 import os
-from openai import OpenAI
+import re
+import time
+from openai import AsyncOpenAI, OpenAI
 import csv
 import io
+import rate_limiter
+import menu_pruner
+import menu_parser
+import response_cache
+import executor
+import llm_usage
+from executor import StageStats
+from manifest import hash_text
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+MODEL = "gpt-5-mini"
+PROMPT_VERSION = 1
+DEFAULT_TIMEOUT = 120.0  # seconds per LLM request in recreate_menus
+SYSTEM_PROMPT = "You extract structured menus from messy restaurant text."
+CHUNK_LINES = 300      # max snapshot lines per LLM request
+CHUNK_CHARS = 16_000   # max characters per LLM request (about 4k tokens)
+CHUNK_OVERLAP = 10     # lines repeated at the start of the next chunk
+CHUNK_WORKERS = 8      # chunks of one snapshot extracted at once
 
-def recreate_menu(raw_text, output_file):
-    """Extract a CSV of menu items from raw page text using an LLM.
 
-    Under the hood:
-    - Builds a carefully-scoped prompt instructing the model to return CSV only,
-      with three columns in each row: Dish, Price, Description (no header).
-    - Calls the OpenAI Chat Completions API and captures the first message content.
-    - Normalizes line-endings and streams rows through `csv.reader`.
-    - Drops obvious "section" and accidental "header" lines to keep the CSV clean.
-    - Ensures each written row has exactly 3 cells.
-    - Writes the result to `output_file` and prints a success message.
+class IncompleteReply(Exception):
+    """The model returned no text, or stopped before finishing (e.g., at the token limit)."""
+
+
+def checked_reply(content, finish_reason, require_finish=False):
+    """Return the reply text, or raise :class:`IncompleteReply` if it is empty or cut short.
+
+    Parameters
+    ----------
+    content : str | None
+        The first choice's message content.
+    finish_reason : str | None
+        Its `finish_reason`; anything but `"stop"` (e.g., `"length"`) means the CSV
+        is incomplete. None (not reported) is accepted unless `require_finish`.
+    require_finish : bool, optional
+        Also reject a missing `finish_reason`, as for a stream that ended without
+        one, by default False.
+    """
+    if finish_reason not in (None, "stop") or (require_finish and finish_reason is None):
+        raise IncompleteReply(f"reply cut short (finish_reason={finish_reason!r})")
+    if not content or not content.strip():
+        raise IncompleteReply("empty reply")
+    return content
+
+
+def build_prompt(raw_text):
+    """Build the CSV-only extraction prompt for a page snapshot.
 
     Parameters
     ----------
     raw_text : str
         The cleaned text snapshot harvested from a restaurant webpage.
-    output_file : str | os.PathLike
-        Target path (typically under `Menu_CSVs/`).
 
     Returns
     -------
-    None
-        Writes a CSV file to disk.
+    str
+        The user message sent to the chat model.
     """
-    prompt = f"""
+    return f"""
 You are a precise menu reconstruction system.
 
 INPUT TEXT:
@@ -53,56 +105,423 @@ Extract and rebuild the restaurant's menu clearly and concisely.
 Return only the CSV (no commentary).
 """
 
-    response = client.chat.completions.create(
-        model="gpt-5-mini",
-        messages=[
-            {"role": "system", "content": "You extract structured menus from messy restaurant text."},
-            {"role": "user", "content": prompt}
-        ]
+
+def request_menu_csv(raw_text):
+    """Call the OpenAI Chat Completions API and return the raw CSV reply.
+
+    A reply cached for the same text, `PROMPT_VERSION` and `MODEL` is returned
+    without calling the API. Otherwise the call goes through the shared `"openai"`
+    rate limiter with an estimated token cost; the estimate is corrected from the
+    response's `usage` when available.
+
+    Parameters
+    ----------
+    raw_text : str
+        The cleaned text snapshot harvested from a restaurant webpage.
+
+    Returns
+    -------
+    str
+        The first message content.
+
+    Raises
+    ------
+    IncompleteReply
+        If the reply is empty or did not finish with `"stop"`; nothing is cached.
+    """
+    return response_cache.cached("llm", llm_cache_request(raw_text), lambda: _complete(raw_text))
+
+
+def llm_cache_request(raw_text):
+    """Return the `"llm"` response-cache request describing a reply for `raw_text`."""
+    return {"snapshot": hash_text(raw_text), "prompt_version": PROMPT_VERSION, "model": MODEL}
+
+
+def _messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def chat_request(raw_text):
+    """Return the Chat Completions request body (`model`, `messages`) for a snapshot."""
+    return {"model": MODEL, "messages": _messages(build_prompt(raw_text))}
+
+
+def _reply_text(response, estimated, raw_text, latency, mode):
+    """Correct the rate limiter from the response's `usage`, record the call and return the reply text.
+
+    The call is recorded before the reply is checked with :func:`checked_reply`,
+    since a truncated reply still spent its tokens.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        rate_limiter.get_limiter("openai").adjust_tokens(usage.total_tokens - estimated)
+    llm_usage.record_call(usage, MODEL, raw_text, latency, mode)
+    choice = response.choices[0]
+    return checked_reply(choice.message.content, getattr(choice, "finish_reason", None))
+
+
+def _complete(raw_text):
+    """Send the prompt for `raw_text` to `MODEL` under the `"openai"` rate limiter and return the reply text."""
+    prompt = build_prompt(raw_text)
+    estimated = rate_limiter.estimate_tokens(prompt)
+    started = []
+
+    def create(**kwargs):
+        started.append(time.perf_counter())
+        return client.chat.completions.create(**kwargs)
+
+    response = rate_limiter.send(
+        "openai",
+        create,
+        tokens=estimated,
+        model=MODEL,
+        messages=_messages(prompt)
     )
+    return _reply_text(response, estimated, raw_text, time.perf_counter() - started[-1], "sync")
+
+
+async def request_menu_csv_async(raw_text, async_client, timeout=DEFAULT_TIMEOUT):
+    """Asynchronous :func:`request_menu_csv` on an `AsyncOpenAI` client.
+
+    Parameters
+    ----------
+    raw_text : str
+        The cleaned text snapshot harvested from a restaurant webpage.
+    async_client : openai.AsyncOpenAI
+        Client used for the call.
+    timeout : float, optional
+        Seconds allowed for the API call itself, by default `DEFAULT_TIMEOUT`;
+        time spent waiting for the rate limiter does not count.
+
+    Returns
+    -------
+    str
+        The first message content.
+
+    Raises
+    ------
+    TimeoutError
+        If the API does not answer within `timeout`; the request is cancelled.
+    IncompleteReply
+        If the reply is empty or did not finish with `"stop"`; nothing is cached.
+    """
+    async def complete():
+        prompt = build_prompt(raw_text)
+        estimated = rate_limiter.estimate_tokens(prompt)
+        started = []
+
+        async def create(**kwargs):
+            started.append(time.perf_counter())
+            return await asyncio.wait_for(async_client.chat.completions.create(**kwargs), timeout)
+
+        response = await rate_limiter.send_async(
+            "openai", create, tokens=estimated, model=MODEL, messages=_messages(prompt)
+        )
+        return _reply_text(response, estimated, raw_text, time.perf_counter() - started[-1], "async")
+
+    return await response_cache.cached_async("llm", llm_cache_request(raw_text), complete)
+
+
+def clean_menu_rows(csv_output):
+    """Parse the model's CSV reply into clean `[Dish, Price, Description]` rows.
+
+    Under the hood:
+    - Normalizes line-endings and streams rows through `csv.reader`.
+    - Drops obvious "section" and accidental "header" lines to keep the CSV clean.
+    - Ensures each row has exactly 3 cells.
 
-    csv_output = response.choices[0].message.content or ""
+    Parameters
+    ----------
+    csv_output : str
+        Raw CSV text returned by the model.
+
+    Returns
+    -------
+    list[list[str]]
+        Cleaned rows, each with exactly three cells.
+    """
     # Normalize line endings so csv.reader behaves consistently
     csv_text = csv_output.replace("\r\n", "\n").replace("\r", "\n")
 
-    reader = csv.reader(io.StringIO(csv_text))
+    rows = []
+    for row in csv.reader(io.StringIO(csv_text)):
+        # Skip empty / all-whitespace rows
+        if not row or all(not (cell or "").strip() for cell in row):
+            continue
+
+        # Normalize cells once (trim quotes & whitespace)
+        cells = [(c or "").strip().strip('"').strip("'").strip() for c in row]
+
+        # Skip again if it turned blank after cleaning
+        if not any(cells):
+            continue
+
+        # --- Key fix #1: drop any "Section: ..." rows, case-insensitive ---
+        first = cells[0].lower()
+        if first.startswith("section"):
+            continue
+
+        # --- Key fix #2 (recommended): skip header-ish rows ---
+        # If the model accidentally emits a header row like "Dish, Price, Description"
+        # or similar, don't write it.
+        headerish = (
+            any(w in cells[0].lower() for w in ("dish", "item")) or
+            any("price" in (c or "").lower() for c in cells)
+        )
+        if headerish and len(cells) <= 3:
+            # Treat short, clearly header-ish lines as headers to drop
+            continue
+
+        # Ensure exactly 3 columns (Dish, Price, Description)
+        if len(cells) < 3:
+            cells = (cells + [""] * 3)[:3]
+        else:
+            cells = cells[:3]
+
+        rows.append(cells)
+    return rows
+
+
+def chunk_text(raw_text, max_lines=None, max_chars=None, overlap=None):
+    """Split a snapshot into overlapping chunks on line boundaries.
+
+    Each chunk holds at most `max_lines` lines and `max_chars` characters (a single
+    longer line becomes its own chunk); consecutive chunks share `overlap` lines,
+    so an item cut between two chunks appears whole in one of them. The limits
+    default to `CHUNK_LINES`, `CHUNK_CHARS` and `CHUNK_OVERLAP`.
+
+    Returns
+    -------
+    list[str]
+        `[raw_text]` when the snapshot fits in one request.
+    """
+    max_lines = CHUNK_LINES if max_lines is None else max_lines
+    max_chars = CHUNK_CHARS if max_chars is None else max_chars
+    overlap = CHUNK_OVERLAP if overlap is None else overlap
+    lines = raw_text.splitlines()
+    if len(lines) <= max_lines and len(raw_text) <= max_chars:
+        return [raw_text]
+    chunks = []
+    start = 0
+    while start < len(lines):
+        end, size = start, 0
+        while end < len(lines) and end - start < max_lines and (end == start or size + len(lines[end]) < max_chars):
+            size += len(lines[end]) + 1
+            end += 1
+        chunks.append("\n".join(lines[start:end]))
+        if end >= len(lines):
+            break
+        # Never overlap more than half a chunk, so every chunk moves forward
+        start = end - min(overlap, (end - start) // 2)
+    return chunks
+
+
+def dish_key(row):
+    """Normalized `(dish, price)` used to spot the same item extracted from two chunks."""
+    return " ".join(row[0].split()).casefold(), re.sub(r"[^\d.]", "", row[1])
+
+
+def merge_rows(row_lists):
+    """Merge per-chunk rows in order, keeping one row per dish and price.
+
+    When a duplicate carries a description and the kept row does not, the
+    described row wins.
+
+    Parameters
+    ----------
+    row_lists : Iterable[list[list[str]]]
+        Rows from :func:`clean_menu_rows`, one list per chunk.
+
+    Returns
+    -------
+    list[list[str]]
+        The merged rows.
+    """
+    merged = {}
+    for rows in row_lists:
+        for row in rows:
+            key = dish_key(row)
+            if key not in merged or (row[2] and not merged[key][2]):
+                merged[key] = row
+    return list(merged.values())
+
+
+def request_menu_rows(raw_text, workers=CHUNK_WORKERS):
+    """Extract cleaned menu rows for a snapshot, map-reducing over chunks when it is large.
+
+    Each chunk from :func:`chunk_text` is sent with :func:`request_menu_csv` (up to
+    `workers` at once) and the rows are combined with :func:`merge_rows`, so a large
+    menu takes about as long as its slowest chunk.
+
+    Returns
+    -------
+    list[list[str]]
+        Cleaned rows, each with exactly three cells.
+    """
+    chunks = chunk_text(raw_text)
+    if len(chunks) == 1:
+        return clean_menu_rows(request_menu_csv(raw_text))
+    replies, _ = executor.run_stage("chunks", request_menu_csv, chunks, min(workers, len(chunks)))
+    return merge_rows(clean_menu_rows(reply) for reply in replies)
+
+
+async def request_menu_rows_async(raw_text, async_client, timeout=DEFAULT_TIMEOUT, workers=CHUNK_WORKERS):
+    """Asynchronous :func:`request_menu_rows`; up to `workers` chunks are requested at once."""
+    chunks = chunk_text(raw_text)
+    semaphore = asyncio.Semaphore(max(1, workers))
+
+    async def request(chunk):
+        async with semaphore:
+            return await request_menu_csv_async(chunk, async_client, timeout)
+
+    replies = await asyncio.gather(*(request(chunk) for chunk in chunks))
+    if len(chunks) == 1:
+        return clean_menu_rows(replies[0])
+    return merge_rows(clean_menu_rows(reply) for reply in replies)
+
+
+def write_menu_csv(rows, output_file):
+    """Write cleaned menu rows to `output_file` as CSV (no header).
+
+    Parameters
+    ----------
+    rows : Iterable[list[str]]
+        Rows produced by :func:`clean_menu_rows`.
+    output_file : str | os.PathLike
+        Target path (typically under `Menu_CSVs/`).
+    """
     with open(output_file, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+        writer.writerows(rows)
+
+
+def recreate_menu(raw_text, output_file, prune=True, fast_path=True):
+    """Extract a CSV of menu items from raw page text using an LLM.
+
+    Under the hood:
+    - Unless `fast_path` is False, first tries :func:`menu_parser.confident_rows`;
+      a cleanly laid-out menu is written from those rows without an LLM call.
+    - Unless `prune` is False, drops non-menu regions with
+      :func:`menu_pruner.prune_for_llm` and prints the reduction ratio.
+    - Builds a carefully-scoped prompt instructing the model to return CSV only,
+      with three columns in each row: Dish, Price, Description (no header).
+    - Calls the OpenAI Chat Completions API (or reuses a cached reply for the same
+      text, prompt version and model) and captures the first message content;
+      large snapshots are split into chunks extracted in parallel
+      (:func:`request_menu_rows`).
+    - Cleans the reply with :func:`clean_menu_rows` (drops section/header lines,
+      ensures each row has exactly 3 cells) and merges duplicate dishes across chunks.
+    - Writes the result to `output_file` and prints a success message.
+
+    Parameters
+    ----------
+    raw_text : str
+        The cleaned text snapshot harvested from a restaurant webpage.
+    output_file : str | os.PathLike
+        Target path (typically under `Menu_CSVs/`).
+    prune : bool, optional
+        Send only the detected menu regions to the model, by default True.
+    fast_path : bool, optional
+        Try the rule-based parser before the LLM, by default True.
+
+    Returns
+    -------
+    str
+        `"rules"` or `"llm"`: how the menu was built. Writes a CSV file to disk.
+    """
+    rows = menu_parser.confident_rows(raw_text) if fast_path else None
+    path = "rules"
+    if rows is None:
+        if prune:
+            raw_text = menu_pruner.prune_for_llm(raw_text, output_file)
+        rows = request_menu_rows(raw_text)
+        path = "llm"
+    write_menu_csv(rows, output_file)
+    print(f"✅ Menu successfully saved to {output_file}")
+    return path
+
+
+async def recreate_menu_async(raw_text, output_file, async_client, prune=True, timeout=DEFAULT_TIMEOUT):
+    """Asynchronous :func:`recreate_menu`; see :func:`request_menu_csv_async` for `async_client` and `timeout`."""
+    if prune:
+        raw_text = menu_pruner.prune_for_llm(raw_text, output_file)
+    rows = await request_menu_rows_async(raw_text, async_client, timeout)
+    write_menu_csv(rows, output_file)
+    print(f"✅ Menu successfully saved to {output_file}")
+
+
+async def recreate_menus_async(jobs, concurrency=8, prune=True, timeout=DEFAULT_TIMEOUT,
+                               async_client=None, on_result=None):
+    """Coroutine behind :func:`recreate_menus`; see there for the parameters."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failures = {}
+    if not jobs:
+        return failures
+
+    async def rebuild(raw_text, output_file, api):
+        async with semaphore:
+            try:
+                if llm_usage.budget_exhausted():
+                    error = f"token budget reached ({llm_usage.run_tokens()} tokens used)"
+                else:
+                    with llm_usage.labelled(os.path.basename(str(output_file))):
+                        await recreate_menu_async(raw_text, output_file, api, prune, timeout)
+                    error = None
+            except TimeoutError:
+                error = f"timed out after {timeout:g}s"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        if error is not None:
+            failures[output_file] = error
+        if on_result is not None:
+            on_result(output_file, error)
+
+    if async_client is not None:
+        await asyncio.gather(*(rebuild(text, out, async_client) for text, out in jobs))
+    else:
+        async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")) as api:
+            await asyncio.gather(*(rebuild(text, out, api) for text, out in jobs))
+    return failures
+
 
-        for row in reader:
-            # Skip empty / all-whitespace rows
-            if not row or all(not (cell or "").strip() for cell in row):
-                continue
-
-            # Normalize cells once (trim quotes & whitespace)
-            cells = [(c or "").strip().strip('"').strip("'").strip() for c in row]
-
-            # Skip again if it turned blank after cleaning
-            if not any(cells):
-                continue
-
-            # --- Key fix #1: drop any "Section: ..." rows, case-insensitive ---
-            first = cells[0].lower()
-            if first.startswith("section"):
-                continue
-
-            # --- Key fix #2 (recommended): skip header-ish rows ---
-            # If the model accidentally emits a header row like "Dish, Price, Description"
-            # or similar, don't write it.
-            headerish = (
-                any(w in cells[0].lower() for w in ("dish", "item")) or
-                any("price" in (c or "").lower() for c in cells)
-            )
-            if headerish and len(cells) <= 3:
-                # Treat short, clearly header-ish lines as headers to drop
-                continue
-
-            # Ensure exactly 3 columns (Dish, Price, Description)
-            if len(cells) < 3:
-                cells = (cells + [""] * 3)[:3]
-            else:
-                cells = cells[:3]
-
-            writer.writerow(cells)
-
-    print(f"✅ Menu successfully saved to {output_file}")
\ No newline at end of file
+def recreate_menus(jobs, concurrency=8, prune=True, timeout=DEFAULT_TIMEOUT, async_client=None, on_result=None):
+    """Rebuild many menus concurrently, recording failures per output file.
+
+    Under the hood:
+    - Runs :func:`recreate_menu_async` for every job on one `AsyncOpenAI` client,
+      with at most `concurrency` menus in flight; a large menu split into chunks
+      sends at most `CHUNK_WORKERS` of them at once.
+    - Each API call is cancelled after `timeout` seconds; a timed-out or failed job
+      is recorded and the rest carry on.
+    - Calls are labelled with the output file's name in :mod:`llm_usage`; once the
+      run's token budget is spent, jobs not yet started fail without a call.
+    - Interrupting the run (e.g., Ctrl+C) cancels every in-flight request.
+
+    Parameters
+    ----------
+    jobs : Iterable[tuple[str, str]]
+        `(raw_text, output_file)` pairs.
+    concurrency : int, optional
+        Maximum number of menus rebuilt at once, by default 8.
+    prune : bool, optional
+        Send only the detected menu regions to the model, by default True.
+    timeout : float, optional
+        Seconds allowed per API call, by default `DEFAULT_TIMEOUT`.
+    async_client : openai.AsyncOpenAI | None, optional
+        Client to use; by default one is created (and closed) for the run.
+    on_result : Callable[[str, str | None], None] | None, optional
+        Called as `on_result(output_file, error)` when each job finishes.
+
+    Returns
+    -------
+    tuple[dict[str, str], StageStats]
+        Error messages by output file, and stage timing.
+    """
+    jobs = list(jobs)
+    start = time.perf_counter()
+    failures = asyncio.run(recreate_menus_async(jobs, concurrency, prune, timeout, async_client, on_result))
+    stats = StageStats("llm", len(jobs), max(1, concurrency), time.perf_counter() - start)
+    return failures, stats
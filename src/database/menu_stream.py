@@ -0,0 +1,295 @@
+"""Streaming, schema-constrained menu extraction written straight into SQLite.
+
+Instead of waiting for a whole CSV reply, `stream_menu_rows` asks the model for JSON
+that must match `MENU_SCHEMA` (`{"items": [{"dish", "price", "description"}, ...]}`)
+and streams the completion:
+- `RowStreamParser` scans the streamed text and emits each item object as soon as
+  its closing brace arrives, so rows are available long before the reply ends;
+- every item is validated (`validate_row`) instead of going through the loose
+  header/"Section" heuristics of :func:`menu_recreator.clean_menu_rows`;
+- `stream_menu_to_db` upserts each row into `local_menu` as it arrives and commits
+  it at once, so there is no CSV file in between and no write transaction stays
+  open while the next row is awaited (other workers can write); dishes left over
+  from the restaurant's previous menu are deleted once every stream has finished.
+  Large snapshots are streamed chunk by chunk (:func:`menu_recreator.chunk_text`),
+  skipping dishes already inserted from the overlap.
+
+Finished replies are cached in the `"llm"` response cache like CSV replies, keyed by
+snapshot hash, `PROMPT_VERSION` and model plus the `"json_rows"` format. A stream
+that is cut short or yields no rows raises :class:`menu_recreator.IncompleteReply`
+and is neither cached nor used to prune the stored menu.
+"""
+import json
+import time
+
+import llm_usage
+import menu_recreator
+import rate_limiter
+import response_cache
+import sqlite_connection
+from manifest import hash_text
+
+PROMPT_VERSION = 1
+MENU_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "dish": {"type": "string"},
+                    "price": {"type": "string"},
+                    "description": {"type": "string"},
+                },
+                "required": ["dish", "price", "description"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["items"],
+    "additionalProperties": False,
+}
+
+
+def build_json_prompt(raw_text):
+    """Build the structured-output extraction prompt for a page snapshot."""
+    return f"""
+You are a precise menu reconstruction system.
+
+INPUT TEXT:
+{raw_text}
+
+TASK:
+Extract and rebuild the restaurant's menu clearly and concisely.
+- Ignore non-menu content (about us, contact info, etc.)
+- Detect only item names, prices, and descriptions
+- If there is no description for an item. Make one but make it no more than 10 words
+- Only look for food items. Ignore drinks and their prices
+- Give subtypes different items (Pad Thai Chicken 6.99 and Pad Thai Tofu 5.99)
+- Return one entry in "items" per menu item, in the order they appear, with the price as written
+"""
+
+
+def validate_row(item):
+    """Return `[dish, price, description]` for a well-formed item, or None.
+
+    Parameters
+    ----------
+    item : Any
+        One decoded element of the reply's `items` array.
+
+    Returns
+    -------
+    list[str] | None
+        Stripped cells; None when the item is not an object or has no dish name.
+    """
+    if not isinstance(item, dict):
+        return None
+    cells = [item.get(key) for key in ("dish", "price", "description")]
+    if not all(isinstance(cell, str) or cell is None for cell in cells):
+        return None
+    dish, price, description = ((cell or "").strip() for cell in cells)
+    if not dish:
+        return None
+    return [dish, price, description]
+
+
+class RowStreamParser:
+    """Incrementally pull item objects out of a streamed `{"items": [...]}` reply.
+
+    Feed text deltas with :meth:`feed`; each call returns the items completed by
+    that delta, decoded with `json.loads`. Tracks string/escape state and brace
+    depth, so braces inside strings are handled.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.in_items = False
+        self.in_item = False
+        self.top_level = ""
+
+    def feed(self, text):
+        """Consume `text` and return the list of item objects it completed."""
+        items = []
+        for char in text:
+            if self.depth == 1:
+                # Keep the tail of the top-level object to recognise the "items" key
+                self.top_level = (self.top_level + char)[-16:]
+            if self.in_item:
+                self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                if char == "[" and self.depth == 2 and '"items"' in self.top_level:
+                    self.in_items = True
+                elif char == "{" and self.in_items and self.depth == 3:
+                    self.in_item = True
+                    self.buffer = ["{"]
+            elif char in "}]":
+                if char == "}" and self.in_item and self.depth == 3:
+                    items.append(json.loads("".join(self.buffer)))
+                    self.in_item = False
+                elif char == "]" and self.depth == 2:
+                    self.in_items = False
+                self.depth -= 1
+        return items
+
+
+def _json_cache_request(raw_text):
+    return {"snapshot": hash_text(raw_text), "prompt_version": PROMPT_VERSION,
+            "model": menu_recreator.MODEL, "format": "json_rows"}
+
+
+def stream_menu_rows(raw_text, client=None):
+    """Yield validated `[dish, price, description]` rows while the completion streams in.
+
+    Under the hood:
+    - Rows cached for the same snapshot, prompt version and model are yielded
+      without calling the API.
+    - Otherwise a streamed Chat Completions request with a strict `json_schema`
+      response format is sent through the shared `"openai"` rate limiter.
+    - Each text delta goes through :class:`RowStreamParser`; complete items are
+      validated with :func:`validate_row` and yielded at once.
+    - When the stream ends, the token estimate is corrected from the final usage
+      chunk and the call is recorded with :mod:`llm_usage`. The rows are cached
+      only if the reply passes :func:`menu_recreator.checked_reply` (finished with
+      `"stop"`) and held at least one row.
+
+    Parameters
+    ----------
+    raw_text : str
+        The cleaned text snapshot harvested from a restaurant webpage.
+    client : openai.OpenAI | None, optional
+        Client to use, by default :data:`menu_recreator.client`.
+
+    Yields
+    ------
+    list[str]
+        One validated row per menu item, in reply order.
+
+    Raises
+    ------
+    menu_recreator.IncompleteReply
+        After the last row, if the stream did not finish with `"stop"` or yielded
+        no rows.
+    """
+    cache = response_cache.get_cache()
+    key = response_cache.request_key("llm", _json_cache_request(raw_text))
+    if cache is not None:
+        hit, rows = cache.get("llm", key)
+        if hit:
+            yield from rows
+            return
+    client = client or menu_recreator.client
+    prompt = build_json_prompt(raw_text)
+    estimated = rate_limiter.estimate_tokens(prompt)
+    started = []
+
+    def create(**kwargs):
+        started.append(time.perf_counter())
+        return client.chat.completions.create(**kwargs)
+
+    stream = rate_limiter.send(
+        "openai",
+        create,
+        tokens=estimated,
+        model=menu_recreator.MODEL,
+        messages=[
+            {"role": "system", "content": menu_recreator.SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_schema",
+                         "json_schema": {"name": "menu", "strict": True, "schema": MENU_SCHEMA}},
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parser = RowStreamParser()
+    rows = []
+    reply = []
+    usage = finish_reason = None
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        for choice in getattr(chunk, "choices", None) or ():
+            finish_reason = getattr(choice, "finish_reason", None) or finish_reason
+            delta = getattr(choice.delta, "content", None)
+            if not delta:
+                continue
+            reply.append(delta)
+            for item in parser.feed(delta):
+                row = validate_row(item)
+                if row is not None:
+                    rows.append(row)
+                    yield row
+    if usage is not None and getattr(usage, "total_tokens", None):
+        rate_limiter.get_limiter("openai").adjust_tokens(usage.total_tokens - estimated)
+    llm_usage.record_call(usage, menu_recreator.MODEL, raw_text, time.perf_counter() - started[-1], "stream")
+    menu_recreator.checked_reply("".join(reply), finish_reason, require_finish=True)
+    if not rows:
+        raise menu_recreator.IncompleteReply("reply has no menu rows")
+    if cache is not None:
+        cache.set("llm", key, rows)
+
+
+def stream_menu_to_db(conn, raw_text, restaurant, rows=None):
+    """Replace a restaurant's menu in `local_menu` row by row as it is extracted.
+
+    Each row is written with :func:`sqlite_connection.upsert_row` and committed
+    before the next one is awaited, so the previous menu stays readable while the
+    new one streams in and the database is never locked across a network wait.
+    Only once every stream has finished with at least one row are the dishes it
+    did not contain removed with :func:`sqlite_connection.prune_menu`; a stream
+    cut short raises :class:`menu_recreator.IncompleteReply` and an empty one
+    writes nothing, leaving the stored menu (plus any rows already upserted) in
+    place.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection with the `local_menu` table.
+    raw_text : str
+        Snapshot text to extract from.
+    restaurant : str
+        Restaurant name stored with every row.
+    rows : Iterable[list[str]] | None, optional
+        Rows to insert instead of calling :func:`stream_menu_rows` (e.g., from the
+        rule-based parser).
+
+    Returns
+    -------
+    list[list[str]]
+        The rows written.
+
+    Raises
+    ------
+    menu_recreator.IncompleteReply
+        If a :func:`stream_menu_rows` stream is cut short or empty; nothing is pruned.
+    """
+    if rows is None:
+        rows = (row for chunk in menu_recreator.chunk_text(raw_text) for row in stream_menu_rows(chunk))
+    inserted = []
+    seen = set()
+    for row in rows:
+        key = menu_recreator.dish_key(row)
+        if key in seen:
+            continue
+        seen.add(key)
+        sqlite_connection.upsert_row(conn, *row, restaurant)
+        conn.commit()
+        inserted.append(row)
+    if not inserted:
+        return inserted
+    sqlite_connection.prune_menu(conn, restaurant, [(row[0], row[1]) for row in inserted])
+    conn.commit()
+    return inserted
@@ -0,0 +1,98 @@
+"""Process pool for the CPU-bound HTML-to-text step of snapshot extraction.
+
+Parsing holds the GIL, so extra fetch threads cannot speed it up. `ParsePool`
+moves it to worker processes (one per core by default):
+- download threads hand over each raw body through a `multiprocessing.shared_memory`
+  block instead of pickling it through a pipe, so the bytes are copied once into
+  shared memory and workers decode them in place;
+- each worker decodes, extracts the lines with :mod:`html_tools` and writes the
+  snapshot itself (to a file or a :class:`snapshot_store.StoreSink`), so snapshots
+  are stored as workers finish;
+- the shared block is released as soon as its worker is done.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import html_tools
+
+
+def _extract_to_file(shm_name, size, encoding, output_file, min_lines, max_lines, engine):
+    """Worker: decode a body from shared memory and write its snapshot.
+
+    Returns
+    -------
+    tuple[str, Any]
+        `(status, output_file)` with `status` as returned by :func:`html_tools.save_lines`.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    try:
+        with shm.buf[:size] as view:
+            html = html_tools.decode_body(view, encoding)
+    finally:
+        shm.close()
+    lines = html_tools.html_to_lines(html, max_lines, engine)
+    return html_tools.save_lines(lines, output_file, min_lines, max_lines), output_file
+
+
+class ParsePool:
+    """Extract and write snapshots on a pool of worker processes.
+
+    Parameters
+    ----------
+    workers : int | None, optional
+        Number of worker processes, by default one per CPU core.
+    engine : str | None, optional
+        Extraction engine name passed to :func:`html_tools.html_to_lines`.
+    """
+
+    def __init__(self, workers=None, engine=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.executor = ProcessPoolExecutor(self.workers)
+
+    def submit(self, body, encoding, output_file,
+               min_lines=html_tools.MIN_LINES, max_lines=html_tools.MAX_LINES):
+        """Queue one downloaded body for extraction into `output_file`.
+
+        Parameters
+        ----------
+        body : bytes | bytearray
+            Raw response body.
+        encoding : str | None
+            Text encoding of the body (UTF-8 when None or unknown).
+        output_file : str | os.PathLike | Callable[[str], Any]
+            Path for the text snapshot, or a picklable callable storing it
+            (e.g., :class:`snapshot_store.StoreSink`).
+        min_lines, max_lines : int, optional
+            Line limits, as in :func:`html_tools.extract_content`.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to `(status, output_file)`; see :func:`_extract_to_file`.
+        """
+        size = len(body)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        shm.buf[:size] = body
+        future = self.executor.submit(
+            _extract_to_file, shm.name, size, encoding,
+            output_file if callable(output_file) else str(output_file), min_lines, max_lines, self.engine
+        )
+
+        def release(_):
+            shm.close()
+            shm.unlink()
+
+        future.add_done_callback(release)
+        return future
+
+    def close(self):
+        """Wait for queued extractions and stop the workers."""
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,323 @@
+"""Shared, adaptive rate limiting for every outbound API call in the pipeline.
+
+This module provides:
+- `TokenBucket`: a thread-safe token bucket that hands out reservations.
+- `EndpointLimiter`: a request budget plus an optional token budget for one endpoint,
+  which halves its rate on HTTP 429 and creeps back up on success (AIMD).
+- `get_limiter`: a process-wide registry so `google_tools`, `html_tools` and
+  `menu_recreator` share one limiter per endpoint across all worker threads.
+- `send`: call a function through an endpoint's limiter, retrying on 429 and
+  honoring `Retry-After`; `send_async` does the same for coroutine functions.
+
+Budgets are per minute. Defaults live in `DEFAULT_LIMITS` and can be overridden with
+environment variables named `RATE_LIMIT_<ENDPOINT>`, e.g. `RATE_LIMIT_OPENAI=500/200000`
+(requests/tokens per minute) or `RATE_LIMIT_CUSTOMSEARCH=100` (requests only).
+Restaurant websites are limited per host under the `web:<host>` endpoint names.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# (requests per minute, tokens per minute or None)
+DEFAULT_LIMITS = {
+    "places": (600, None),
+    "customsearch": (100, None),
+    "openai": (500, 200_000),
+    "web": (60, None),
+}
+
+MIN_SCALE = 0.05      # never throttle an endpoint below 5% of its budget
+RECOVERY_STEP = 0.1   # additive increase per successful call
+MAX_BACKOFF = 60.0    # seconds, when no Retry-After header is given
+MAX_RETRIES = 5
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second.
+
+    Parameters
+    ----------
+    rate : float
+        Refill rate in tokens per second.
+    capacity : float
+        Maximum burst size.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take `amount` tokens now and return how many seconds to wait before using them.
+
+        The level may go negative; later callers then queue up behind the deficit,
+        which keeps waiting threads roughly first-come, first-served.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, amount):
+        """Consume (positive) or refund (negative) tokens after the fact."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level - amount)
+
+    def set_rate(self, rate):
+        """Change the refill rate, keeping tokens accrued at the old rate."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+class EndpointLimiter:
+    """Request and token budgets for one endpoint, adapted on 429 responses.
+
+    Parameters
+    ----------
+    name : str
+        Endpoint name (e.g., `"openai"`).
+    requests_per_minute : float
+        Request budget.
+    tokens_per_minute : float | None, optional
+        Token budget (LLM endpoints), by default None for no token limit.
+    """
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute=None):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+        self.throttled_count = 0
+        self.lock = threading.Lock()
+        # A burst of up to ten seconds' worth of budget
+        self.requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 6))
+        self.tokens = None
+        if tokens_per_minute:
+            self.tokens = TokenBucket(tokens_per_minute / 60, max(1.0, tokens_per_minute / 6))
+
+    def acquire(self, tokens=0):
+        """Block until one request (and `tokens` tokens) may be sent."""
+        with self.lock:
+            wait = max(0.0, self.blocked_until - time.monotonic())
+        wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+
+    def adjust_tokens(self, delta):
+        """Correct the token budget once the real usage of a call is known."""
+        if self.tokens is not None and delta:
+            self.tokens.adjust(delta)
+
+    def _apply_scale(self):
+        self.requests.set_rate(self.requests_per_minute / 60 * self.scale)
+        if self.tokens is not None:
+            self.tokens.set_rate(self.tokens_per_minute / 60 * self.scale)
+
+    def throttled(self, retry_after=None):
+        """Record a 429: halve the rate and pause the endpoint.
+
+        Parameters
+        ----------
+        retry_after : float | None, optional
+            Seconds requested by the server; exponential backoff is used when None.
+        """
+        with self.lock:
+            self.throttled_count += 1
+            self.consecutive_throttles += 1
+            self.scale = max(MIN_SCALE, self.scale / 2)
+            if retry_after is None:
+                retry_after = min(MAX_BACKOFF, 2.0 ** (self.consecutive_throttles - 1))
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self._apply_scale()
+
+    def succeeded(self):
+        """Record a successful call: creep the rate back towards the full budget."""
+        with self.lock:
+            self.consecutive_throttles = 0
+            if self.scale < 1.0:
+                self.scale = min(1.0, self.scale + RECOVERY_STEP)
+                self._apply_scale()
+
+
+def _limits_for(endpoint):
+    """Return `(requests_per_minute, tokens_per_minute)` for an endpoint name.
+
+    Raises
+    ------
+    ValueError
+        If its `RATE_LIMIT_<ENDPOINT>` override is malformed, zero or negative.
+    """
+    base = endpoint.split(":", 1)[0]
+    rpm, tpm = DEFAULT_LIMITS.get(base, DEFAULT_LIMITS["web"])
+    name = f"RATE_LIMIT_{base.upper()}"
+    override = os.getenv(name)
+    if override:
+        parts = override.split("/")
+        try:
+            budgets = [float(part) for part in parts]
+        except ValueError:
+            budgets = []
+        if not 1 <= len(budgets) <= 2 or not all(math.isfinite(b) and b > 0 for b in budgets):
+            raise ValueError(f"{name}={override!r} must be a positive requests-per-minute budget, "
+                             f"optionally followed by '/<tokens per minute>' (e.g. '500/200000')")
+        rpm = budgets[0]
+        tpm = budgets[1] if len(budgets) > 1 else tpm
+    return rpm, tpm
+
+
+def get_limiter(endpoint):
+    """Return the shared :class:`EndpointLimiter` for `endpoint`, creating it on first use."""
+    with _registry_lock:
+        limiter = _registry.get(endpoint)
+        if limiter is None:
+            limiter = EndpointLimiter(endpoint, *_limits_for(endpoint))
+            _registry[endpoint] = limiter
+        return limiter
+
+
+def reset():
+    """Forget every limiter (budgets and backoff state), e.g. between tests."""
+    with _registry_lock:
+        _registry.clear()
+
+
+def host_endpoint(url):
+    """Return the per-host endpoint name used for fetching restaurant pages."""
+    return f"web:{urlparse(url).netloc.lower()}"
+
+
+def estimate_tokens(text):
+    """Rough token estimate for budgeting (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def retry_after_seconds(headers):
+    """Parse a `Retry-After` header (seconds or HTTP date) into seconds, or None."""
+    value = (headers or {}).get("Retry-After") or (headers or {}).get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _status_and_headers(obj):
+    """Return `(status_code, headers)` for a response or an exception carrying one."""
+    response = getattr(obj, "response", obj)
+    return getattr(response, "status_code", None), getattr(response, "headers", None)
+
+
+def send(endpoint, func, *args, tokens=0, max_retries=MAX_RETRIES, **kwargs):
+    """Call `func(*args, **kwargs)` under `endpoint`'s budget, retrying on HTTP 429.
+
+    Under the hood:
+    - Waits for a request slot (and `tokens` tokens) from the shared limiter.
+    - Treats a returned response with `status_code == 429`, or a raised exception
+      whose `.response` has status 429 (e.g., `openai.RateLimitError`), as throttling:
+      the limiter backs off (honoring `Retry-After`) and the call is retried.
+    - After `max_retries` throttled attempts the last 429 response is returned
+      (or the exception re-raised) so the caller's normal error handling applies.
+
+    Parameters
+    ----------
+    endpoint : str
+        Limiter name, e.g. `"places"`, `"openai"` or :func:`host_endpoint` output.
+    func : Callable
+        The request function (e.g., `requests.get`).
+    tokens : int, optional
+        Estimated tokens consumed by the call, by default 0.
+    max_retries : int, optional
+        Retries after throttling, by default `MAX_RETRIES`.
+
+    Returns
+    -------
+    Any
+        Whatever `func` returns.
+    """
+    limiter = get_limiter(endpoint)
+    for attempt in range(max_retries + 1):
+        limiter.acquire(tokens)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            status, headers = _status_and_headers(e)
+            if status != 429 or attempt == max_retries:
+                raise
+            limiter.throttled(retry_after_seconds(headers))
+            continue
+        status, headers = _status_and_headers(result)
+        if status != 429:
+            limiter.succeeded()
+            return result
+        if attempt == max_retries:
+            return result
+        limiter.throttled(retry_after_seconds(headers))
+
+
+async def send_async(endpoint, func, *args, tokens=0, max_retries=MAX_RETRIES, **kwargs):
+    """Await `func(*args, **kwargs)` under `endpoint`'s budget, retrying on HTTP 429.
+
+    The asynchronous counterpart of :func:`send`, sharing the same limiters. Waiting
+    for a slot happens on a worker thread, so other coroutines keep running.
+
+    Parameters
+    ----------
+    endpoint : str
+        Limiter name, e.g. `"openai"`.
+    func : Callable[..., Awaitable]
+        The coroutine function (e.g., `AsyncOpenAI().chat.completions.create`).
+    tokens : int, optional
+        Estimated tokens consumed by the call, by default 0.
+    max_retries : int, optional
+        Retries after throttling, by default `MAX_RETRIES`.
+
+    Returns
+    -------
+    Any
+        Whatever `func` returns.
+    """
+    limiter = get_limiter(endpoint)
+    for attempt in range(max_retries + 1):
+        await asyncio.to_thread(limiter.acquire, tokens)
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            status, headers = _status_and_headers(e)
+            if status != 429 or attempt == max_retries:
+                raise
+            limiter.throttled(retry_after_seconds(headers))
+            continue
+        status, headers = _status_and_headers(result)
+        if status != 429:
+            limiter.succeeded()
+            return result
+        if attempt == max_retries:
+            return result
+        limiter.throttled(retry_after_seconds(headers))
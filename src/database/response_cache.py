@@ -0,0 +1,308 @@
+"""Persistent, SQLite-backed cache for paid API responses.
+
+This module provides:
+- `ResponseCache`: an on-disk cache keyed on a normalized request, with a TTL per
+  namespace (endpoint), negative caching for lookups that found nothing,
+  least-recently-used eviction once the cache exceeds a size budget, and
+  hit/miss counters persisted next to the entries.
+- `cached`: the helper `google_tools` and `database_query` call around their
+  Google Places / Custom Search requests, and `menu_recreator` around LLM calls.
+
+Environment:
+- HTTP_CACHE_PATH: SQLite file for the shared cache (default `http_cache.db` next to
+  this module). Set it to `off` to disable caching.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DAY = 24 * 60 * 60
+
+# Seconds a successful response stays valid, per namespace.
+DEFAULT_TTLS = {
+    "places": 7 * DAY,
+    "customsearch": 30 * DAY,
+    "llm": 90 * DAY,
+}
+DEFAULT_TTL = DAY
+NEGATIVE_TTL = DAY
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Request fields that identify the caller, not the request; never part of the key.
+# They are dropped from the top level of a request and from its transport sections.
+SECRET_FIELDS = {"key", "x-goog-api-key", "authorization", "api_key"}
+SECRET_SECTIONS = {"headers", "params"}
+# Free-text search fields; case and runs of whitespace do not change their results.
+QUERY_FIELDS = {"q", "textquery"}
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def _normalize(value, drop_secrets=True):
+    """Recursively drop secrets and collapse whitespace/case in query text.
+
+    Secrets are only dropped where `drop_secrets` is set (the top level and the
+    `SECRET_SECTIONS` below it), and only `QUERY_FIELDS` strings are folded, so
+    opaque values such as page tokens keep their exact bytes.
+    """
+    if isinstance(value, dict):
+        normalized = {}
+        for k, v in value.items():
+            name = str(k).lower()
+            if drop_secrets and name in SECRET_FIELDS:
+                continue
+            if name in QUERY_FIELDS and isinstance(v, str):
+                normalized[str(k)] = " ".join(v.split()).casefold()
+            else:
+                normalized[str(k)] = _normalize(v, drop_secrets=name in SECRET_SECTIONS)
+        return normalized
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v, drop_secrets=False) for v in value]
+    return value
+
+
+def request_key(namespace, request):
+    """Return the cache key for `request` (a JSON-serializable description of the call).
+
+    Parameters
+    ----------
+    namespace : str
+        Endpoint name (e.g., `"places"`); part of the key.
+    request : dict
+        URL, parameters, body and any headers that change the response.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest of the normalized request.
+    """
+    canonical = json.dumps([namespace, _normalize(request)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe SQLite cache of JSON-serializable values.
+
+    Parameters
+    ----------
+    db_path : str
+        SQLite file holding the cache (created if missing).
+    max_bytes : int, optional
+        Size budget for stored values; least-recently-used entries are evicted
+        beyond it. By default 64 MiB.
+    ttls : dict[str, float] | None, optional
+        Per-namespace TTLs in seconds, by default `DEFAULT_TTLS`.
+    """
+
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value TEXT,
+                    negative INTEGER NOT NULL DEFAULT 0,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_last_access ON cache_entries(last_access);
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    namespace TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            self.conn.commit()
+
+    def _count(self, namespace, column):
+        self.conn.execute(
+            f"INSERT INTO cache_stats (namespace, {column}) VALUES (?, 1) "
+            f"ON CONFLICT(namespace) DO UPDATE SET {column} = {column} + 1",
+            (namespace,),
+        )
+
+    def get(self, namespace, key):
+        """Look up `key`, counting a hit or a miss.
+
+        Returns
+        -------
+        tuple[bool, Any]
+            `(True, value)` on a hit — `value` is None for a cached negative result —
+            or `(False, None)` on a miss or an expired entry.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, negative, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[2] <= now:
+                if row is not None:
+                    self.conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._count(namespace, "misses")
+                self.conn.commit()
+                return False, None
+            self.conn.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+            self._count(namespace, "hits")
+            self.conn.commit()
+        value, negative, _ = row
+        return True, None if negative else json.loads(value)
+
+    def set(self, namespace, key, value, ttl=None):
+        """Store `value` (None means "nothing found" and uses the negative TTL).
+
+        Parameters
+        ----------
+        namespace : str
+            Endpoint name; selects the TTL.
+        key : str
+            Cache key from :func:`request_key`.
+        value : Any
+            JSON-serializable value, or None to cache a failed lookup.
+        ttl : float | None, optional
+            Override the namespace TTL in seconds.
+        """
+        negative = value is None
+        if ttl is None:
+            ttl = NEGATIVE_TTL if negative else self.ttls.get(namespace, DEFAULT_TTL)
+        payload = None if negative else json.dumps(value)
+        size = len(payload or "") + len(key)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(key, namespace, value, negative, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, payload, int(negative), size, now + ttl, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then least-recently-used ones until under the size budget."""
+        self.conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM cache_entries ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany("DELETE FROM cache_entries WHERE key = ?", victims)
+
+    def stats(self):
+        """Return `{namespace: {"hits", "misses", "entries", "bytes"}}` for every namespace."""
+        with self.lock:
+            counters = {ns: {"hits": h, "misses": m, "entries": 0, "bytes": 0}
+                        for ns, h, m in self.conn.execute("SELECT namespace, hits, misses FROM cache_stats")}
+            for ns, entries, size in self.conn.execute(
+                    "SELECT namespace, COUNT(*), SUM(size) FROM cache_entries GROUP BY namespace"):
+                counters.setdefault(ns, {"hits": 0, "misses": 0})
+                counters[ns].update(entries=entries, bytes=size)
+        return counters
+
+    def close(self):
+        """Close the underlying connection."""
+        with self.lock:
+            self.conn.close()
+
+
+def get_cache():
+    """Return the shared cache configured by `HTTP_CACHE_PATH`, or None when disabled."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            path = os.getenv("HTTP_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache.db"))
+            if path.lower() == "off":
+                return None
+            _shared = ResponseCache(path)
+        return _shared
+
+
+def reset():
+    """Close and forget the shared cache so the next call re-reads `HTTP_CACHE_PATH`."""
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+        _shared = None
+
+
+def cached(namespace, request, fetch, ttl=None):
+    """Return the cached value for `request`, calling `fetch()` on a miss.
+
+    Under the hood:
+    - Normalizes `request` into a key with :func:`request_key` (API keys are ignored).
+    - On a hit returns the stored value without calling `fetch`.
+    - On a miss calls `fetch()`; its return value is stored, including None, which
+      marks a lookup that found nothing and is cached for `NEGATIVE_TTL`.
+    - Exceptions from `fetch` (HTTP errors, timeouts) are never cached.
+
+    Parameters
+    ----------
+    namespace : str
+        Endpoint name used for the TTL and the hit/miss counters.
+    request : dict
+        JSON-serializable description of the request.
+    fetch : Callable[[], Any]
+        Performs the real call and returns a JSON-serializable value or None.
+    ttl : float | None, optional
+        Override the namespace TTL in seconds.
+
+    Returns
+    -------
+    Any
+        The cached or freshly fetched value.
+    """
+    cache = get_cache()
+    if cache is None:
+        return fetch()
+    key = request_key(namespace, request)
+    hit, value = cache.get(namespace, key)
+    if hit:
+        return value
+    value = fetch()
+    cache.set(namespace, key, value, ttl)
+    return value
+
+
+async def cached_async(namespace, request, fetch, ttl=None):
+    """Like :func:`cached`, for a `fetch` coroutine function.
+
+    Returns
+    -------
+    Any
+        The cached or freshly fetched value.
+    """
+    cache = get_cache()
+    if cache is None:
+        return await fetch()
+    key = request_key(namespace, request)
+    hit, value = cache.get(namespace, key)
+    if hit:
+        return value
+    value = await fetch()
+    cache.set(namespace, key, value, ttl)
+    return value
+
+
+def print_stats():
+    """Print hit/miss counters for the shared cache."""
+    cache = get_cache()
+    if cache is None:
+        return
+    print("🗄️ Response cache:")
+    for namespace, s in sorted(cache.stats().items()):
+        print(f"   {namespace:<12} {s['hits']} hits, {s['misses']} misses, "
+              f"{s['entries']} entries ({s['bytes']} bytes)")
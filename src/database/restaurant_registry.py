@@ -0,0 +1,141 @@
+"""Persistent restaurant registry keyed on Google Places IDs.
+
+This module replaces the comma-joined `Restaurant_List.txt` as the source of truth
+for discovered restaurants. Two tables live in the menu database:
+- `restaurant_registry`: one row per Places ID with the display name, formatted
+  address, searched location and resolved menu URL;
+- `restaurant_cuisines`: the cuisine searches each place was found under.
+
+Every column used for lookups has an index, and the Places ID primary key makes
+de-duplication an O(1) upsert instead of a linear scan.
+"""
+from datetime import datetime, timezone
+
+
+def create_registry_tables(conn):
+    """Create the registry tables and their indexes if they do not exist.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection on which to execute the DDL.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS restaurant_registry (
+            place_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            address TEXT,
+            location TEXT,
+            url TEXT,
+            updated_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_registry_name ON restaurant_registry(name);
+        CREATE INDEX IF NOT EXISTS idx_registry_address ON restaurant_registry(address);
+        CREATE INDEX IF NOT EXISTS idx_registry_location ON restaurant_registry(location);
+        CREATE INDEX IF NOT EXISTS idx_registry_url ON restaurant_registry(url);
+        CREATE TABLE IF NOT EXISTS restaurant_cuisines (
+            place_id TEXT NOT NULL REFERENCES restaurant_registry(place_id),
+            cuisine TEXT NOT NULL,
+            PRIMARY KEY (place_id, cuisine)
+        );
+        CREATE INDEX IF NOT EXISTS idx_cuisines_cuisine ON restaurant_cuisines(cuisine);
+    """)
+    conn.commit()
+
+
+def upsert_places(conn, places, location):
+    """Insert or refresh discovered places and their cuisine tags.
+
+    A place that is already registered keeps its resolved `url`; its name and
+    address are refreshed and new cuisine tags are added.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection.
+    places : Iterable[dict]
+        Records with `place_id`, `name`, `address` and `cuisines` (a set of strings).
+    location : str
+        The searched location (e.g., `"Raleigh"`).
+
+    Returns
+    -------
+    int
+        Number of places written.
+    """
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    count = 0
+    for place in places:
+        conn.execute(
+            "INSERT INTO restaurant_registry (place_id, name, address, location, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(place_id) DO UPDATE SET "
+            "name = excluded.name, address = excluded.address, "
+            "location = excluded.location, updated_at = excluded.updated_at",
+            (place["place_id"], place["name"], place.get("address"), location, now),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO restaurant_cuisines (place_id, cuisine) VALUES (?, ?)",
+            ((place["place_id"], cuisine) for cuisine in sorted(place.get("cuisines", ()))),
+        )
+        count += 1
+    conn.commit()
+    return count
+
+
+def restaurant_names(conn):
+    """Return the distinct registered restaurant names in discovery order.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection.
+
+    Returns
+    -------
+    list[str]
+        One entry per name; chain locations sharing a name appear once.
+    """
+    rows = conn.execute(
+        "SELECT name FROM restaurant_registry GROUP BY name ORDER BY MIN(rowid)"
+    ).fetchall()
+    return [name for (name,) in rows]
+
+
+def set_urls(conn, urls_by_name):
+    """Store resolved menu URLs for every place with the given names.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection.
+    urls_by_name : dict[str, str]
+        Resolved URL for each restaurant name.
+    """
+    conn.executemany(
+        "UPDATE restaurant_registry SET url = ? WHERE name = ?",
+        ((url, name) for name, url in urls_by_name.items()),
+    )
+    conn.commit()
+
+
+def places_for_cuisine(conn, cuisine):
+    """Return `(place_id, name, url)` rows tagged with `cuisine`.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection.
+    cuisine : str
+        Cuisine as entered for the search (e.g., `"Chinese"`).
+
+    Returns
+    -------
+    list[tuple]
+        Matching registry rows ordered by name.
+    """
+    return conn.execute(
+        "SELECT r.place_id, r.name, r.url FROM restaurant_cuisines c "
+        "JOIN restaurant_registry r ON r.place_id = c.place_id "
+        "WHERE c.cuisine = ? ORDER BY r.name",
+        (cuisine,),
+    ).fetchall()
@@ -0,0 +1,190 @@
+"""Content-addressed, compressed store for page snapshots.
+
+Replaces the one-`.txt`-per-restaurant `Raw_Website_Content/` folder with two
+SQLite tables:
+- `snapshot_blobs`: zlib-compressed snapshot text keyed by its SHA-256 hash
+  (the same hash the build manifest records), so identical pages — e.g. chain
+  locations sharing one menu page — are stored once;
+- `snapshot_versions`: the history of snapshot hashes per restaurant. A new
+  version is added only when a restaurant's page changed; the newest
+  `keep_versions` are kept and blobs no version refers to are evicted.
+
+`Main.create_menu` groups restaurants by their latest hash, so every distinct
+page is sent to the LLM once.
+"""
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timezone
+
+from manifest import hash_text
+
+DEFAULT_KEEP_VERSIONS = 5
+COMPRESSION_LEVEL = 6
+
+
+class SnapshotStore:
+    """Thread-safe accessor for the snapshot tables.
+
+    Parameters
+    ----------
+    db_path : str
+        SQLite file holding the store (created if missing).
+    keep_versions : int, optional
+        Versions kept per restaurant, by default 5.
+    """
+
+    def __init__(self, db_path, keep_versions=DEFAULT_KEEP_VERSIONS):
+        self.keep_versions = max(1, keep_versions)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS snapshot_blobs (
+                    hash TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS snapshot_versions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    restaurant TEXT NOT NULL,
+                    hash TEXT NOT NULL REFERENCES snapshot_blobs(hash),
+                    fetched_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_versions_restaurant ON snapshot_versions(restaurant, id);
+                CREATE INDEX IF NOT EXISTS idx_versions_hash ON snapshot_versions(hash);
+            """)
+            self.conn.commit()
+
+    def put(self, restaurant, text):
+        """Store `text` as the latest snapshot for `restaurant` and return its hash.
+
+        The blob is written only if no restaurant has stored the same text before, and
+        a version is added only if it differs from the restaurant's latest one.
+        """
+        digest = hash_text(text)
+        raw = text.encode("utf-8")
+        with self.lock:
+            if not self.conn.execute("SELECT 1 FROM snapshot_blobs WHERE hash = ?", (digest,)).fetchone():
+                data = zlib.compress(raw, COMPRESSION_LEVEL)
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO snapshot_blobs (hash, data, size, stored_size) VALUES (?, ?, ?, ?)",
+                    (digest, data, len(raw), len(data)),
+                )
+            if self._latest_hash(restaurant) != digest:
+                self.conn.execute(
+                    "INSERT INTO snapshot_versions (restaurant, hash, fetched_at) VALUES (?, ?, ?)",
+                    (restaurant, digest, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+                )
+                self._evict(restaurant)
+            self.conn.commit()
+        return digest
+
+    def _latest_hash(self, restaurant):
+        row = self.conn.execute(
+            "SELECT hash FROM snapshot_versions WHERE restaurant = ? ORDER BY id DESC LIMIT 1", (restaurant,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _evict(self, restaurant):
+        """Drop versions beyond `keep_versions` for `restaurant`, then unreferenced blobs."""
+        self.conn.execute(
+            "DELETE FROM snapshot_versions WHERE restaurant = ? AND id NOT IN ("
+            "SELECT id FROM snapshot_versions WHERE restaurant = ? ORDER BY id DESC LIMIT ?)",
+            (restaurant, restaurant, self.keep_versions),
+        )
+        self.conn.execute(
+            "DELETE FROM snapshot_blobs WHERE hash NOT IN (SELECT hash FROM snapshot_versions)"
+        )
+
+    def latest_hash(self, restaurant):
+        """Return the hash of the restaurant's latest snapshot, or None."""
+        with self.lock:
+            return self._latest_hash(restaurant)
+
+    def get(self, digest):
+        """Return the snapshot text stored under `digest`, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM snapshot_blobs WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def latest(self, restaurant):
+        """Return the restaurant's latest snapshot text, or None."""
+        digest = self.latest_hash(restaurant)
+        return None if digest is None else self.get(digest)
+
+    def history(self, restaurant):
+        """Return `(hash, fetched_at)` for each kept version, newest first."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT hash, fetched_at FROM snapshot_versions WHERE restaurant = ? ORDER BY id DESC",
+                (restaurant,),
+            ).fetchall()
+
+    def latest_by_hash(self):
+        """Group restaurants by the hash of their latest snapshot.
+
+        Returns
+        -------
+        dict[str, list[str]]
+            Restaurants (sorted) sharing each distinct latest snapshot.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT v.restaurant, v.hash FROM snapshot_versions v "
+                "JOIN (SELECT restaurant, MAX(id) AS id FROM snapshot_versions GROUP BY restaurant) latest "
+                "ON latest.id = v.id ORDER BY v.restaurant"
+            ).fetchall()
+        groups = {}
+        for restaurant, digest in rows:
+            groups.setdefault(digest, []).append(restaurant)
+        return groups
+
+    def stats(self):
+        """Return blob/version counts and raw vs stored bytes."""
+        with self.lock:
+            blobs, raw, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM snapshot_blobs"
+            ).fetchone()
+            versions = self.conn.execute("SELECT COUNT(*) FROM snapshot_versions").fetchone()[0]
+        return {"blobs": blobs, "versions": versions, "bytes": raw, "stored_bytes": stored}
+
+    def close(self):
+        """Close the underlying connection."""
+        with self.lock:
+            self.conn.close()
+
+
+_open_stores = {}
+_open_stores_lock = threading.Lock()
+
+
+class StoreSink:
+    """Picklable snapshot destination: calling it stores the text for one restaurant.
+
+    Used wherever a snapshot used to be written to a file (e.g., by
+    :func:`html_tools.save_lines` in a :mod:`parse_pool` worker). Each process
+    opens the store at `db_path` once and reuses it.
+
+    Parameters
+    ----------
+    db_path : str
+        SQLite file of the :class:`SnapshotStore`.
+    restaurant : str
+        Restaurant the snapshot belongs to.
+    """
+
+    def __init__(self, db_path, restaurant):
+        self.db_path = db_path
+        self.restaurant = restaurant
+
+    def __call__(self, text):
+        with _open_stores_lock:
+            store = _open_stores.get(self.db_path)
+            if store is None:
+                store = _open_stores[self.db_path] = SnapshotStore(self.db_path)
+        return store.put(self.restaurant, text)
+
+    def __str__(self):
+        return f"{self.restaurant} snapshot"
@@ -1,57 +1,483 @@
 """SQLite helpers for loading reconstructed menus into a database.
 
-This module creates a `local_menu` table (if needed) and bulk-loads rows from
+This module creates the menu schema (if needed) and bulk-loads rows from
 CSV-formatted text files produced by the menu reconstruction step.
+
+Schema (:func:`create_table`):
+- `restaurants`: one row per restaurant name, referenced by integer key;
+- `menu_items`: dishes with the price as written plus `price_cents` and
+  `price_max_cents` parsed from it (:func:`parse_price`; a range such as
+  "9.99/12.99" gives 999 and 1299), with covering indexes for restaurant lookups
+  and price ranges (`MENU_INDEXES`);
+- `local_menu`: a view with the original flat columns (`id`, `name`, `price`,
+  `description`, `restaurant`), so existing queries keep working;
+- `menu_loads`: the checksum of each restaurant's last loaded CSV;
+- `menu_search`: an FTS5 index over dish names and descriptions (external content
+  on `menu_items`, kept in sync by triggers), ranked with BM25 by
+  :func:`database_query.search_dishes`;
+- `menu_vectors`: an `EMBEDDING_DIM`-float32 blob per item (:func:`embed_text`),
+  searched by :func:`database_query.semantic_search`.
+A database holding the old flat `local_menu` table is migrated in place
+(:func:`migrate`).
+
+Bulk loads (:func:`bulk_load`) stream each file through a single `csv.reader`, so
+quoted descriptions spanning several lines stay intact, and write with
+`executemany` in batches of `BATCH_SIZE` inside one transaction, under the
+`LOAD_PRAGMAS`.
+
+Reloads are idempotent: menu rows are keyed on `(restaurant, name, price)`, so a
+dish listed at several prices (e.g., two portion sizes) keeps one row per price.
+- A restaurant whose CSV checksum matches the one recorded in `menu_loads` is skipped.
+- A changed restaurant is diffed against its stored rows (:func:`sync_menu`), and
+  only the new, changed and removed dishes are written.
+- Duplicate rows left by older append-only loads are removed on the way.
+- Loading into an empty `menu_items` skips the diff: the indexes are dropped, the
+  rows inserted and the indexes rebuilt once at the end; the search triggers are
+  dropped too and `menu_search` is rebuilt in one pass.
+
+Embeddings come from a local hashing vectorizer, with no model download or network
+call: each dish-name and description word adds a signed weight at its hashed
+position plus one per character trigram, so "noodle" and "noodles" land close.
+Loads do not embed anything: :func:`embed_missing`, run by `Main.py` as its own
+step after loading, fills in the items without a vector (new ones, and those
+whose name or description changed, whose vector a trigger drops) in NumPy
+batches. `semantic_search` only reads the stored vectors.
 """
+import contextlib
+import functools
+import math
 import os
 import csv
+import re
 import sqlite3
+import zlib
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+
+from manifest import hash_file
+
+try:
+    import numpy as np
+except ImportError:  # optional, batched embed_missing
+    np = None
+
+BATCH_SIZE = 5000  # rows per executemany call
+
+# Connection settings applied while bulk loading (restored afterwards, except journal_mode).
+LOAD_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "OFF",
+    "cache_size": -64000,  # KiB (negative), i.e. 64 MiB of page cache
+}
+
+MENU_INDEXES = {
+    # Restaurant lookups and per-dish diffs, covering the columns of `local_menu`
+    "idx_menu_items_restaurant": "menu_items(restaurant_id, name, price, description)",
+    # Price-range filters
+    "idx_menu_items_price": "menu_items(price_cents, price_max_cents, restaurant_id)",
+}
+
+INSERT_ITEM = ("INSERT INTO menu_items (restaurant_id, name, price, price_cents, price_max_cents, description) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+UPDATE_ITEM = "UPDATE menu_items SET price = ?, price_cents = ?, price_max_cents = ?, description = ? WHERE id = ?"
+
+# Full-text index over `menu_items`; the Porter stemmer lets "noodles" match "noodle".
+SEARCH_TABLE = ("CREATE VIRTUAL TABLE IF NOT EXISTS menu_search USING fts5("
+                "name, description, content='menu_items', content_rowid='id', "
+                "tokenize='porter unicode61 remove_diacritics 2')")
+SEARCH_TRIGGERS = {
+    "menu_search_insert": (
+        "AFTER INSERT ON menu_items BEGIN "
+        "INSERT INTO menu_search (rowid, name, description) VALUES (new.id, new.name, new.description); END"
+    ),
+    "menu_search_delete": (
+        "AFTER DELETE ON menu_items BEGIN "
+        "INSERT INTO menu_search (menu_search, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END"
+    ),
+    "menu_search_update": (
+        "AFTER UPDATE OF name, description ON menu_items BEGIN "
+        "INSERT INTO menu_search (menu_search, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO menu_search (rowid, name, description) VALUES (new.id, new.name, new.description); END"
+    ),
+    # Stale embeddings are dropped here and recomputed by embed_missing
+    "menu_vectors_delete": "AFTER DELETE ON menu_items BEGIN DELETE FROM menu_vectors WHERE item_id = old.id; END",
+    "menu_vectors_update": (
+        "AFTER UPDATE OF name, description ON menu_items BEGIN "
+        "DELETE FROM menu_vectors WHERE item_id = old.id; END"
+    ),
+}
+
+# Filler words in free-text requests ("can I get something with noodles"), ignored
+# wherever text is matched against menus, so a chatty query matches on its content words
+STOPWORDS = frozenset(
+    "a an and any anything are be but can for from get give have i in is it like me my of on or please "
+    "some something that the to want we with would you".split()
+)
+
+EMBEDDING_DIM = 256
+NAME_WEIGHT = 2.0  # dish-name words count twice as much as description words
+# Words with at least one letter; bare numbers (item numbers, counts) are not embedded
+WORD_RE = re.compile(r"[^\W_]*[^\W\d_][^\W_]*")
+_ZERO_VECTOR = array("f", bytes(4 * EMBEDDING_DIM))
+
+# A number in a price, with its optional currency sign and an "add"/"extra"/"+" marking
+# an add-on; numbers followed by a unit ("5pc", "2 for", "1 lb", "10%") are quantities
+# and never match.
+PRICE_NUMBER_RE = re.compile(
+    r"(?P<addon>\b(?:add|extra|plus)\s+|\+\s*)?(?P<currency>[$\u20ac\u00a3]\s*)?"
+    r"(?<![\d.,])(?P<whole>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<fraction>\d{1,2}))?(?![\d%])"
+    r"(?!\s*(?:pcs?|pieces?|for|lbs?|oz|ct|count)\b)",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class MenuDiff:
+    """Rows written for one restaurant by :func:`sync_menu`."""
+
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
 
 
 # ---------- Database Setup ----------
 
-def connect_db(db_path: str):
+def connect_db(db_path: str, read_only=False):
     """Connect to (or create) the SQLite database.
 
     Parameters
     ----------
     db_path : str
         Path to the SQLite file (will be created if it doesn't exist).
+    read_only : bool, optional
+        Open an existing file with `mode=ro`, so queries never write or take the
+        write lock, by default False.
 
     Returns
     -------
     sqlite3.Connection
         An open SQLite connection. Caller is responsible for closing it.
     """
+    if read_only:
+        return sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
     return sqlite3.connect(db_path)
 
 
+def parse_price(price):
+    """Parse a price as written into `(min_cents, max_cents)`.
+
+    Every amount in the text counts ("$9.99" gives `(999, 999)`, "9.99/12.99" or
+    "Small 9 / Large 12" a range); text without one gives `(None, None)`.
+
+    Under the hood:
+    - Quantities are not amounts: a number followed by a unit ("5pc", "6 pcs",
+      "2 for", "1 lb", "8 oz", "10%") is skipped, as is an add-on ("add $2").
+    - When the text has an amount written with a currency sign or cents, only
+      those count, so "6 pcs $8.50" gives `(850, 850)` rather than a range.
+    """
+    if not price:
+        return None, None
+    amounts = [
+        (bool(match["currency"] or match["fraction"]),
+         int(match["whole"].replace(",", "")) * 100 + int((match["fraction"] or "0").ljust(2, "0")))
+        for match in PRICE_NUMBER_RE.finditer(str(price))
+        if not match["addon"]
+    ]
+    cents = [value for marked, value in amounts if marked] or [value for _, value in amounts]
+    if not cents:
+        return None, None
+    return min(cents), max(cents)
+
+
 def create_table(conn):
-    """Create the `local_menu` table if it does not already exist.
+    """Create the menu tables, indexes and the `local_menu` view if they do not already exist.
 
     The schema includes:
-    - `id` INTEGER PRIMARY KEY AUTOINCREMENT
-    - `name` TEXT
-    - `price` TEXT (nullable)
-    - `description` TEXT
-    - `restaurant` TEXT
+    - `restaurants`: `id` INTEGER PRIMARY KEY, `name` TEXT UNIQUE
+    - `menu_items`: `id` INTEGER PRIMARY KEY AUTOINCREMENT, `restaurant_id` INTEGER
+      (references `restaurants`), `name` TEXT, `price` TEXT (nullable),
+      `price_cents` / `price_max_cents` INTEGER (nullable), `description` TEXT
+    - `local_menu`: view with `id`, `name`, `price`, `description`, `restaurant`
+    - `menu_loads`: checksum of each restaurant's last loaded CSV
+    - `menu_search`: FTS5 index over `menu_items.name` and `description`
+    - `menu_vectors`: `item_id` INTEGER UNIQUE, `vector` BLOB (float32 embedding)
+
+    plus the indexes in `MENU_INDEXES`. An old flat `local_menu` table is migrated
+    with :func:`migrate`; a database created before `menu_search` existed gets it
+    built from the stored rows.
 
     Parameters
     ----------
     conn : sqlite3.Connection
         Open database connection on which to execute the DDL.
     """
-    cur = conn.cursor()
+    legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'local_menu'").fetchone()
+    if legacy:
+        migrate(conn)
+        return
+    searchable = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'menu_search'").fetchone()
+    _create_schema(conn.cursor())
+    if not searchable:
+        create_search_index(conn, rebuild=True)
+    conn.commit()
+
+
+def _create_schema(cur):
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS local_menu (
+        CREATE TABLE IF NOT EXISTS restaurants (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS menu_items (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
+            restaurant_id INTEGER NOT NULL REFERENCES restaurants(id),
             name TEXT,
             price TEXT DEFAULT NULL,
-            description TEXT,
-            restaurant TEXT
+            price_cents INTEGER DEFAULT NULL,
+            price_max_cents INTEGER DEFAULT NULL,
+            description TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE VIEW IF NOT EXISTS local_menu AS
+        SELECT m.id AS id, m.name AS name, m.price AS price, m.description AS description, r.name AS restaurant
+        FROM menu_items m JOIN restaurants r ON r.id = m.restaurant_id
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS menu_loads (
+            restaurant TEXT PRIMARY KEY,
+            checksum TEXT NOT NULL,
+            loaded_at TEXT NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS menu_vectors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL UNIQUE REFERENCES menu_items(id),
+            vector BLOB NOT NULL
         )
     """)
+    create_indexes(cur)
+    create_search_index(cur)
+
+
+def migrate(conn):
+    """Move an old flat `local_menu` table into the normalized schema, in one transaction.
+
+    Restaurants are numbered in name order, item ids are kept and prices parsed;
+    the old table and its indexes are then replaced by the `local_menu` view.
+
+    Returns
+    -------
+    int
+        Number of menu rows migrated.
+    """
+    conn.commit()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        cur.execute("ALTER TABLE local_menu RENAME TO local_menu_old")
+        for (index,) in cur.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'local_menu_old' "
+                "AND sql IS NOT NULL").fetchall():
+            cur.execute(f"DROP INDEX {index}")
+        _create_schema(cur)
+        cur.execute(
+            "INSERT OR IGNORE INTO restaurants (name) "
+            "SELECT DISTINCT COALESCE(restaurant, '') FROM local_menu_old ORDER BY 1"
+        )
+        rows = cur.execute(
+            "SELECT o.id, r.id, o.name, o.price, o.description FROM local_menu_old o "
+            "JOIN restaurants r ON r.name = COALESCE(o.restaurant, '') ORDER BY o.id"
+        ).fetchall()
+        _executemany_batched(
+            cur,
+            "INSERT INTO menu_items (id, restaurant_id, name, price, price_cents, price_max_cents, description) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((row_id, restaurant_id, name, price, *parse_price(price), description)
+             for row_id, restaurant_id, name, price, description in rows),
+        )
+        cur.execute("DROP TABLE local_menu_old")
+    return len(rows)
+
+
+def create_indexes(conn):
+    """Create the `MENU_INDEXES` on `menu_items` if missing. The caller commits."""
+    for name, target in MENU_INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def drop_indexes(conn):
+    """Drop the `MENU_INDEXES` so a bulk load does not maintain them row by row."""
+    for name in MENU_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def create_search_index(conn, rebuild=False):
+    """Create `menu_search` and the triggers that keep it and `menu_vectors` in sync with `menu_items`.
+
+    With `rebuild`, the index is repopulated from `menu_items` (after a load that
+    ran without the triggers). The caller commits.
+    """
+    conn.execute(SEARCH_TABLE)
+    for name, body in SEARCH_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if rebuild:
+        conn.execute("INSERT INTO menu_search (menu_search) VALUES ('rebuild')")
+
+
+def drop_search_triggers(conn):
+    """Drop the `SEARCH_TRIGGERS`; restore them with `create_search_index(conn, rebuild=True)`."""
+    for name in SEARCH_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+@functools.lru_cache(maxsize=65536)
+def _word_slots(word):
+    """`((position, signed weight), ...)` for a word and its character trigrams."""
+    padded = f"#{word}#"
+    features = [(f"w:{word}", 1.0)] + [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+    slots = {}
+    for feature, weight in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        slots[h % EMBEDDING_DIM] = slots.get(h % EMBEDDING_DIM, 0.0) + (weight if h & 0x80000000 else -weight)
+    return tuple(slots.items())
+
+
+def embed_text(name, description=""):
+    """Embed a dish (or a free-text query passed as `name`) as a unit-length vector.
+
+    Parameters
+    ----------
+    name : str
+        Dish name; its words weigh `NAME_WEIGHT` times more than the description's.
+    description : str | None, optional
+        Dish description.
+
+    Returns
+    -------
+    array.array
+        `EMBEDDING_DIM` float32 values (`array("f")`; `.tobytes()` is the stored
+        blob). All zeros when the text has no words outside `STOPWORDS`.
+    """
+    weights = {}
+    for text, scale in ((name, NAME_WEIGHT), (description, 1.0)):
+        for word in WORD_RE.findall((text or "").lower()):
+            if word not in STOPWORDS:
+                for slot, weight in _word_slots(word):
+                    weights[slot] = weights.get(slot, 0.0) + weight * scale
+    vector = _ZERO_VECTOR[:]
+    norm = math.hypot(*weights.values())
+    if norm:
+        for slot, weight in weights.items():
+            vector[slot] = weight / norm
+    return vector
+
+
+def _embed_batch(items):
+    """:func:`embed_text` of each `(name, description)` as the rows of a float32 matrix.
+
+    Each distinct word's `(slot, weight)` pairs are looked up once per batch; every
+    word occurrence is then expanded to its pairs and summed per item with one
+    `np.bincount`, and the rows are normalized together.
+    """
+    vocabulary, words, items_of, scales = {}, [], [], []
+    for i, (name, description) in enumerate(items):
+        for text, scale in ((name, NAME_WEIGHT), (description, 1.0)):
+            found = [vocabulary.setdefault(word, len(vocabulary))
+                     for word in WORD_RE.findall((text or "").lower()) if word not in STOPWORDS]
+            words += found
+            items_of += [i] * len(found)
+            scales += [scale] * len(found)
+    pairs = [_word_slots(word) for word in vocabulary]
+    lengths = np.array([len(p) for p in pairs], dtype=np.intp)
+    slots = np.fromiter((slot for p in pairs for slot, _ in p), dtype=np.intp, count=int(lengths.sum()))
+    weights = np.fromiter((weight for p in pairs for _, weight in p), dtype=np.float64, count=len(slots))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.intp)
+    words = np.array(words, dtype=np.intp)
+    repeat = lengths[words]
+    occurrence = np.repeat(np.arange(len(words)), repeat)
+    pair = np.repeat(starts[words] - np.concatenate(([0], np.cumsum(repeat)[:-1])), repeat) + np.arange(len(occurrence))
+    flat = np.array(items_of, dtype=np.intp)[occurrence] * EMBEDDING_DIM + slots[pair]
+    matrix = np.bincount(flat, weights[pair] * np.array(scales)[occurrence], minlength=len(items) * EMBEDDING_DIM)
+    matrix = matrix.reshape(len(items), EMBEDDING_DIM)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def embed_missing(conn, rid=None, batch_size=BATCH_SIZE):
+    """Store embeddings for the items that have none in `menu_vectors`. The caller commits.
+
+    Under the hood:
+    - Returns at once when `menu_vectors` has as many rows as `menu_items` (the
+      triggers drop the vector of a deleted or edited item, so every item has one).
+    - Otherwise embeds the missing items `batch_size` at a time, with NumPy when it
+      is installed (:func:`_embed_batch`) and :func:`embed_text` otherwise.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection | sqlite3.Cursor
+        Open database connection.
+    rid : int | None, optional
+        Only embed this restaurant's items (`restaurants.id`), by default all.
+    batch_size : int, optional
+        Rows per `executemany` call, by default `BATCH_SIZE`.
+
+    Returns
+    -------
+    int
+        Number of items embedded.
+    """
+    if rid is None and conn.execute(
+            "SELECT (SELECT COUNT(*) FROM menu_items) = (SELECT COUNT(*) FROM menu_vectors)").fetchone()[0]:
+        return 0
+    sql = ("SELECT m.id, m.name, m.description FROM menu_items m "
+           "LEFT JOIN menu_vectors v ON v.item_id = m.id WHERE v.item_id IS NULL")
+    items = conn.execute(sql + " AND m.restaurant_id = ?" if rid is not None else sql,
+                         (rid,) if rid is not None else ()).fetchall()
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        if np is not None:
+            vectors = _embed_batch([(name, description) for _, name, description in batch])
+        else:
+            vectors = [embed_text(name, description) for _, name, description in batch]
+        conn.executemany("INSERT INTO menu_vectors (item_id, vector) VALUES (?, ?)",
+                         [(item_id, vector.tobytes()) for (item_id, _, _), vector in zip(batch, vectors)])
+    return len(items)
+
+
+def restaurant_id(conn, restaurant):
+    """Return the `restaurants` key for `restaurant`, adding the restaurant if new. The caller commits."""
+    conn.execute("INSERT OR IGNORE INTO restaurants (name) VALUES (?)", (restaurant,))
+    return conn.execute("SELECT id FROM restaurants WHERE name = ?", (restaurant,)).fetchone()[0]
+
+
+@contextlib.contextmanager
+def load_pragmas(conn, pragmas=None):
+    """Apply bulk-load PRAGMAs (default `LOAD_PRAGMAS`) for the block, then restore them.
+
+    `journal_mode` is persistent in the database file and is left as set. Pending
+    changes on `conn` are committed first, since SQLite refuses to change these
+    settings inside a transaction.
+    """
+    pragmas = LOAD_PRAGMAS if pragmas is None else pragmas
     conn.commit()
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas if name != "journal_mode"}
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            conn.execute(f"PRAGMA {name} = {value}")
 
 
 # ---------- File Processing ----------
@@ -74,8 +500,201 @@ def read_file_lines(file_path: str):
     return lines
 
 
+def iter_csv_rows(file_path: str):
+    """Stream `(name, price, description)` rows from a menu CSV with one `csv.reader`.
+
+    Quoted cells may span several lines. Blank rows are skipped; rows without
+    exactly three cells are reported and skipped.
+
+    Parameters
+    ----------
+    file_path : str
+        Reconstructed menu CSV (no header).
+
+    Yields
+    ------
+    tuple[str, str, str]
+        One menu row.
+    """
+    filename = os.path.basename(file_path)
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or all(not cell.strip() for cell in row):
+                continue
+            if len(row) != 3:
+                print(f"⚠️ Skipping malformed line in {filename}: {','.join(row).strip()}")
+                continue
+            yield tuple(row)
+
+
+def unique_rows(rows):
+    """Return `{(name, price): description}`, keeping the first row for each dish and price."""
+    menu = {}
+    for name, price, description in rows:
+        menu.setdefault((name, price), description)
+    return menu
+
+
+def _executemany_batched(cur, sql, params, batch_size=BATCH_SIZE):
+    params = iter(params)
+    while batch := list(islice(params, batch_size)):
+        cur.executemany(sql, batch)
+
+
+def _item(rid, name, price, description):
+    """Parameters for `INSERT_ITEM`."""
+    return (rid, name, price, *parse_price(price), description)
+
+
+def _stale_rows(cur, rid, keep):
+    """Split a restaurant's stored rows into `(stale, kept)`.
+
+    A row is stale when its `(name, price)` is not in `keep` or an older row already
+    has the same one; `stale` lists `(id, name)` and `kept` maps each remaining
+    `(name, price)` to `(id, description)`.
+    """
+    stale, kept = [], {}
+    for row_id, name, price, description in cur.execute(
+            "SELECT id, name, price, description FROM menu_items WHERE restaurant_id = ? ORDER BY id", (rid,)):
+        if (name, price) in kept or (name, price) not in keep:
+            stale.append((row_id, name))
+        else:
+            kept[name, price] = row_id, description
+    return stale, kept
+
+
+def _record_checksum(cur, restaurant, checksum):
+    if checksum is None:
+        cur.execute("DELETE FROM menu_loads WHERE restaurant = ?", (restaurant,))
+    else:
+        cur.execute(
+            "INSERT OR REPLACE INTO menu_loads (restaurant, checksum, loaded_at) VALUES (?, ?, ?)",
+            (restaurant, checksum, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+        )
+
+
+def sync_menu(conn, restaurant, rows, checksum=None, force=False, batch_size=BATCH_SIZE):
+    """Make the restaurant's stored menu match `rows`, writing only the differences.
+
+    Under the hood:
+    - With a `checksum` equal to the one recorded in `menu_loads` (and not `force`),
+      nothing is read or written.
+    - Rows are keyed on `(name, price)` (the first row wins within `rows`), so a
+      dish listed at two prices keeps both rows. Stored rows whose description
+      changed are updated; a new price for a dish reuses (updates) a stored row of
+      that dish that is no longer on the menu. Other new rows are inserted, and
+      rows no longer on the menu, or stored twice, are deleted.
+    - The checksum is recorded, or forgotten when None, so a later CSV load is not
+      skipped against a menu written another way.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection. The caller commits.
+    restaurant : str
+        Restaurant whose menu is replaced.
+    rows : Iterable[Sequence[str]]
+        `(name, price, description)` rows.
+    checksum : str | None, optional
+        Checksum of the source (e.g., the CSV file hash).
+    force : bool, optional
+        Diff even when the checksum is unchanged, by default False.
+    batch_size : int, optional
+        Rows per `executemany` call, by default `BATCH_SIZE`.
+
+    Returns
+    -------
+    MenuDiff | None
+        Counts of written rows, or None when skipped by checksum.
+    """
+    cur = conn.cursor()
+    if checksum is not None and not force:
+        stored = cur.execute("SELECT checksum FROM menu_loads WHERE restaurant = ?", (restaurant,)).fetchone()
+        if stored and stored[0] == checksum:
+            return None
+    menu = unique_rows(rows)
+    rid = restaurant_id(cur, restaurant)
+    stale, kept = _stale_rows(cur, rid, menu)
+    updates = [
+        (price, *parse_price(price), menu[name, price], row_id)
+        for (name, price), (row_id, description) in kept.items() if menu[name, price] != description
+    ]
+    unchanged = len(kept) - len(updates)
+    reusable = {}
+    for row_id, name in stale:
+        reusable.setdefault(name, []).append(row_id)
+    inserts = []
+    for (name, price), description in menu.items():
+        if (name, price) in kept:
+            continue
+        if reusable.get(name):
+            updates.append((price, *parse_price(price), description, reusable[name].pop(0)))
+        else:
+            inserts.append(_item(rid, name, price, description))
+    deletes = [(row_id,) for row_ids in reusable.values() for row_id in row_ids]
+    _executemany_batched(cur, "DELETE FROM menu_items WHERE id = ?", deletes, batch_size)
+    _executemany_batched(cur, UPDATE_ITEM, updates, batch_size)
+    _executemany_batched(cur, INSERT_ITEM, inserts, batch_size)
+    _record_checksum(cur, restaurant, checksum)
+    return MenuDiff(len(inserts), len(updates), len(deletes), unchanged)
+
+
+def upsert_row(conn, name, price, description, restaurant):
+    """Insert the `(restaurant, name, price)` dish, or update its description if stored.
+
+    Used when rows arrive one at a time (see :mod:`menu_stream`); finish with
+    :func:`prune_menu`, which removes rows (e.g., old prices) not streamed again.
+    The caller commits.
+
+    Returns
+    -------
+    str
+        `"inserted"`, `"updated"` or `"unchanged"`.
+    """
+    cur = conn.cursor()
+    rid = restaurant_id(cur, restaurant)
+    stored = cur.execute(
+        "SELECT id, description FROM menu_items WHERE restaurant_id = ? AND name = ? AND price IS ? "
+        "ORDER BY id LIMIT 1",
+        (rid, name, price),
+    ).fetchone()
+    if stored is None:
+        cur.execute(INSERT_ITEM, _item(rid, name, price, description))
+        return "inserted"
+    if stored[1] == description:
+        return "unchanged"
+    cur.execute(UPDATE_ITEM, (price, *parse_price(price), description, stored[0]))
+    return "updated"
+
+
+def prune_menu(conn, restaurant, keys):
+    """Delete the restaurant's rows whose `(name, price)` is not in `keys`, and duplicate rows.
+
+    Also forgets the restaurant's `menu_loads` checksum. The caller commits.
+
+    Returns
+    -------
+    int
+        Number of rows deleted.
+    """
+    cur = conn.cursor()
+    stale, _ = _stale_rows(cur, restaurant_id(cur, restaurant), set(keys))
+    cur.executemany("DELETE FROM menu_items WHERE id = ?", [(row_id,) for row_id, _ in stale])
+    _record_checksum(cur, restaurant, None)
+    return len(stale)
+
+
+def _load_message(filename, restaurant, diff):
+    if diff is None:
+        return f"⏭️ {filename} unchanged since it was loaded (restaurant='{restaurant}')"
+    message = f"✅ {diff.inserted} rows inserted from {filename} (restaurant='{restaurant}')"
+    if diff.updated or diff.deleted:
+        message += f", {diff.updated} updated, {diff.deleted} deleted"
+    return message
+
+
 def insert_data(conn, name: str, price: str, description: str, restaurant: str):
-    """Insert a single menu row into `local_menu`.
+    """Insert a single menu row (shown in `local_menu`) into `menu_items`.
 
     Parameters
     ----------
@@ -91,49 +710,146 @@ def insert_data(conn, name: str, price: str, description: str, restaurant: str):
         Source restaurant name (derived from filename).
     """
     cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO local_menu (name, price, description, restaurant) VALUES (?, ?, ?, ?)",
-        (name, price, description, restaurant)
-    )
+    rid = restaurant_id(cur, restaurant)
+    cur.execute(INSERT_ITEM, _item(rid, name, price, description))
 
 
-def process_all_files(conn, folder_path: str):
-    """Load all CSV-formatted text files from `folder_path` into `local_menu`.
+def insert_rows(conn, rows, restaurant: str):
+    """Insert many `(name, price, description)` rows for one restaurant.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection. The caller commits.
+    rows : Iterable[Sequence[str]]
+        Menu rows with exactly three cells each.
+    restaurant : str
+        Source restaurant name stored with every row.
+
+    Returns
+    -------
+    int
+        Number of rows inserted.
+    """
+    cur = conn.cursor()
+    rid = restaurant_id(cur, restaurant)
+    cur.executemany(INSERT_ITEM, (_item(rid, name, price, description) for name, price, description in rows))
+    return cur.rowcount
+
+
+def process_file(conn, file_path: str):
+    """Load one CSV-formatted text file into `local_menu` and commit.
 
     Under the hood:
-    - Iterates files in `folder_path` (skips subdirectories).
     - Uses the stem (filename without extension) as the `restaurant` field.
-    - Parses each line with `csv.reader` to safely split `name,price,description`.
-    - Commits after each file and prints a short progress message.
+    - Streams the file through :func:`iter_csv_rows` and syncs the restaurant's
+      stored menu to it with :func:`sync_menu` (skipped when the file is unchanged).
+    - Commits once the file is loaded and prints a short progress message.
 
     Parameters
     ----------
     conn : sqlite3.Connection
         Open database connection.
-    folder_path : str
-        Directory containing reconstructed menu CSVs (no header).
+    file_path : str
+        Reconstructed menu CSV (no header).
+
+    Returns
+    -------
+    int
+        Number of rows inserted.
     """
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        if not os.path.isfile(file_path):
-            continue
+    filename = os.path.basename(file_path)
+    restaurant = os.path.splitext(filename)[0]
+    diff = sync_menu(conn, restaurant, iter_csv_rows(file_path), hash_file(file_path))
+    conn.commit()
+    print(_load_message(filename, restaurant, diff))
+    return diff.inserted if diff else 0
 
-        restaurant = os.path.splitext(filename)[0]
-        lines = read_file_lines(file_path)
-        inserted = 0
 
-        for line in lines:
-            try:
-                name, price, description = next(csv.reader([line]))
-            except ValueError:
-                print(f"⚠️ Skipping malformed line in {filename}: {line}")
-                continue
+def bulk_load(conn, file_paths, batch_size=BATCH_SIZE, force=False):
+    """Load many menu CSVs into `local_menu` in a single transaction.
 
-            insert_data(conn, name, price, description, restaurant)
-            inserted += 1
+    Under the hood:
+    - Applies :func:`load_pragmas` for the duration of the load.
+    - Into an empty table: drops the `menu_items` indexes and search triggers,
+      inserts every file with `executemany` in batches of `batch_size`, then
+      rebuilds the indexes and `menu_search` once.
+    - Otherwise: skips files whose checksum is unchanged (unless `force`) and
+      diffs the rest with :func:`sync_menu`.
+    - Commits once at the end; on an error nothing is loaded.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection with the `local_menu` table.
+    file_paths : Iterable[str]
+        Reconstructed menu CSVs (no header); the file stem is the restaurant.
+    batch_size : int, optional
+        Rows per `executemany` call, by default `BATCH_SIZE`.
+    force : bool, optional
+        Reload files even when their checksum is unchanged, by default False.
 
-        conn.commit()
-        print(f"✅ {inserted} rows inserted from {filename} (restaurant='{restaurant}')")
+    Returns
+    -------
+    dict[str, MenuDiff | None]
+        Rows written per file path (None for files skipped by checksum).
+    """
+    diffs = {}
+    with load_pragmas(conn):
+        with conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN")  # explicit, so the index DDL is rolled back with the rows
+            empty = cur.execute("SELECT 1 FROM menu_items LIMIT 1").fetchone() is None
+            if empty:
+                drop_indexes(conn)
+                drop_search_triggers(conn)
+            for file_path in file_paths:
+                filename = os.path.basename(file_path)
+                restaurant = os.path.splitext(filename)[0]
+                checksum = hash_file(file_path)
+                if empty:
+                    menu = unique_rows(iter_csv_rows(file_path))
+                    rid = restaurant_id(cur, restaurant)
+                    _executemany_batched(
+                        cur, INSERT_ITEM,
+                        (_item(rid, name, price, description) for (name, price), description in menu.items()),
+                        batch_size,
+                    )
+                    _record_checksum(cur, restaurant, checksum)
+                    diffs[file_path] = MenuDiff(inserted=len(menu))
+                else:
+                    diffs[file_path] = sync_menu(conn, restaurant, iter_csv_rows(file_path), checksum, force, batch_size)
+                print(_load_message(filename, restaurant, diffs[file_path]))
+            if empty:
+                create_indexes(conn)
+                create_search_index(conn, rebuild=True)
+    return diffs
+
+
+def process_all_files(conn, folder_path: str):
+    """Load all CSV-formatted text files from `folder_path` into `local_menu`.
+
+    Under the hood:
+    - Iterates files in `folder_path` in name order (skips subdirectories).
+    - Loads them all with :func:`bulk_load`, in one transaction.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Open database connection.
+    folder_path : str
+        Directory containing reconstructed menu CSVs (no header).
+
+    Returns
+    -------
+    dict[str, MenuDiff | None]
+        Rows written per file path (None for files skipped by checksum).
+    """
+    file_paths = [
+        os.path.join(folder_path, filename) for filename in sorted(os.listdir(folder_path))
+        if os.path.isfile(os.path.join(folder_path, filename))
+    ]
+    return bulk_load(conn, file_paths)
 
 
 def upload_data(relative_path):
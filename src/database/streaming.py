@@ -0,0 +1,120 @@
+"""Streaming producer/consumer runner for the menu pipeline.
+
+Instead of finishing a stage for every restaurant before starting the next one,
+each restaurant flows through the stages on its own:
+
+    feeder -> [stage 1 workers] -> queue -> [stage 2 workers] -> ... -> sink
+
+Stages are connected by bounded `queue.Queue` objects, so a slow stage applies
+back-pressure upstream and only a handful of items are ever held in memory.
+The sink (typically the database insert) runs in the calling thread, which keeps
+objects such as `sqlite3.Connection` on the thread that created them.
+"""
+import queue
+import threading
+import time
+
+from executor import StageStats
+
+# Marker passed down a queue to tell one worker that its input is exhausted.
+_STOP = object()
+
+
+def _run_worker(index, name, func, inbox, outbox, stats, lock, remaining, next_workers, start):
+    """Consume `inbox` until `_STOP`, forwarding non-None results to `outbox`.
+
+    The last worker of a stage to finish forwards one `_STOP` per worker of the
+    next stage, so shutdown cascades through the pipeline in order.
+    """
+    while True:
+        item = inbox.get()
+        if item is _STOP:
+            break
+        try:
+            result = func(item)
+        except Exception as e:
+            # A crashed worker would stall the pipeline; drop the item instead.
+            print(f"⚠️ {name} stage failed: {e}")
+            result = None
+        with lock:
+            stats.items += 1
+        if result is not None:
+            outbox.put(result)
+
+    with lock:
+        remaining[index] -= 1
+        last = remaining[index] == 0
+        if last:
+            stats.elapsed = time.perf_counter() - start
+    if last:
+        for _ in range(next_workers):
+            outbox.put(_STOP)
+
+
+def run_streaming(items, stages, sink, queue_size=8):
+    """Stream `items` through `stages` and hand every surviving result to `sink`.
+
+    Under the hood:
+    - A feeder thread puts each item on the first queue (blocking when it is full).
+    - Each stage runs `workers` threads that call `func(item)`; returning `None`
+      drops the item (e.g., a page that was too short), anything else is passed on.
+    - Exceptions inside a stage are printed and the item is dropped, so one bad
+      restaurant never stalls the rest of the run.
+    - `sink(result)` is called in the calling thread as soon as each result arrives.
+
+    Parameters
+    ----------
+    items : Iterable
+        Work items fed into the first stage.
+    stages : list[tuple[str, Callable, int]]
+        `(name, func, workers)` for each stage, in pipeline order.
+    sink : Callable
+        Called once per result that made it through every stage.
+    queue_size : int, optional
+        Capacity of each inter-stage queue, by default 8.
+
+    Returns
+    -------
+    list[StageStats]
+        One entry per stage plus a final `"sink"` entry.
+    """
+    lock = threading.Lock()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    stats = [StageStats(name, workers=max(1, workers)) for name, _, workers in stages]
+    remaining = [s.workers for s in stats]
+    start = time.perf_counter()
+
+    def feed():
+        for item in items:
+            queues[0].put(item)
+        for _ in range(stats[0].workers if stats else 1):
+            queues[0].put(_STOP)
+
+    threads = [threading.Thread(target=feed, name="feeder", daemon=True)]
+    for i, (name, func, _) in enumerate(stages):
+        next_workers = stats[i + 1].workers if i + 1 < len(stages) else 1
+        for n in range(stats[i].workers):
+            threads.append(threading.Thread(
+                target=_run_worker,
+                args=(i, name, func, queues[i], queues[i + 1], stats[i], lock, remaining, next_workers, start),
+                name=f"{name}-{n}",
+                daemon=True,
+            ))
+    for t in threads:
+        t.start()
+
+    sink_stats = StageStats("sink")
+    while True:
+        result = queues[-1].get()
+        if result is _STOP:
+            break
+        try:
+            sink(result)
+        except Exception as e:
+            print(f"⚠️ sink failed: {e}")
+        sink_stats.items += 1
+    sink_stats.elapsed = time.perf_counter() - start
+
+    for t in threads:
+        t.join()
+    return stats + [sink_stats]
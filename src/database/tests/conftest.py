@@ -27,10 +27,26 @@ def tmp_workdir(tmp_path):
         yield tmp_path
 
 class _FakeResp:
-    def __init__(self, status_code=200, json_data=None, text=''):
+    def __init__(self, status_code=200, json_data=None, text='', headers=None):
         self.status_code = status_code
         self._json = json_data or {}
         self.text = text
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+        self.url = "http://fake"
+
+    @property
+    def content(self):
+        return self.text.encode(self.encoding)
+
+    def iter_content(self, chunk_size=1):
+        """Mimic a streamed body (requests.Response.iter_content)."""
+        body = self.text.encode(self.encoding)
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    def close(self):
+        pass
 
     def json(self):
         return self._json
@@ -52,3 +68,29 @@ def isolate_env(monkeypatch):
     monkeypatch.setenv("CX_ID", "dummy-cx")
     monkeypatch.setenv("OPENAI_API_KEY", "dummy-openai")
     yield
+
+@pytest.fixture(autouse=True)
+def isolate_response_cache(tmp_path, monkeypatch):
+    """Point the shared response cache at a per-test file."""
+    import response_cache
+    monkeypatch.setenv("HTTP_CACHE_PATH", str(tmp_path / "http_cache.db"))
+    response_cache.reset()
+    yield
+    response_cache.reset()
+
+@pytest.fixture(autouse=True)
+def isolate_llm_usage(tmp_path, monkeypatch):
+    """Point the LLM usage log at a per-test file and start each test with a fresh run."""
+    import llm_usage
+    monkeypatch.setenv("LLM_USAGE_PATH", str(tmp_path / "llm_usage.db"))
+    llm_usage.reset()
+    yield
+    llm_usage.reset()
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Give every test fresh rate-limiter budgets and backoff state."""
+    import rate_limiter
+    rate_limiter.reset()
+    yield
+    rate_limiter.reset()
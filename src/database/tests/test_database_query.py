@@ -1,6 +1,7 @@
 
 import sqlite3, pytest
 import database_query as dq
+import sqlite_connection
 
 def _make_db_at_default_location(tmp_workdir):
     """Create a DB at src\\database\\restaurants_raleigh.db relative to cwd."""
@@ -23,10 +24,11 @@ def test_local_search_calls_google_and_queries(monkeypatch):
     """Test: local_search integrates with Google Places then queries DB (mocked)."""
     sample = {"places": [{"displayName": {"text": "A"}}, {"displayName": {"text": "B"}}]}
     class R:
+        status_code = 200
         def json(self): return sample
     def fake_post(url, headers, data):
         return R()
-    monkeypatch.setattr(dq.requests, "post", fake_post)
+    monkeypatch.setattr(dq.http_client, "post", fake_post)
     dq.local_search("pizza in Raleigh")
 
 def test_query_returns_rows_for_matching_restaurants(tmp_workdir):
@@ -34,3 +36,156 @@ def test_query_returns_rows_for_matching_restaurants(tmp_workdir):
     _make_db_at_default_location(tmp_workdir)
     rows = dq.query(["A", "B"])
     assert rows  # would include tuples like ('A1', '$1', 'D1', 'A')
+
+def test_local_search_repeated_query_skips_network(monkeypatch, tmp_workdir):
+    """Test: a repeated local_search is answered from the response cache."""
+    _make_db_at_default_location(tmp_workdir)
+    calls = []
+    class R:
+        status_code = 200
+        def json(self): return {"places": [{"displayName": {"text": "A"}}]}
+    def fake_post(url, headers, data):
+        calls.append(data)
+        return R()
+    monkeypatch.setattr(dq.http_client, "post", fake_post)
+    first = dq.local_search("pizza in Raleigh")
+    second = dq.local_search("Pizza in  Raleigh")
+    assert first == second and len(first) == 2
+    assert len(calls) == 1
+
+def test_local_search_does_not_cache_http_errors(monkeypatch, tmp_workdir, FakeResp):
+    """Test: an error response raises and the next search calls the API again."""
+    _make_db_at_default_location(tmp_workdir)
+    replies = [FakeResp(500, {"error": {"message": "backend"}}), FakeResp(200, {"places": [{"displayName": {"text": "B"}}]})]
+    monkeypatch.setattr(dq.http_client, "post", lambda url, headers, data: replies.pop(0))
+    with pytest.raises(Exception):
+        dq.local_search("pizza in Raleigh")
+    assert [r[1] for r in dq.local_search("pizza in Raleigh")] == ["B1"]
+
+def test_query_filters_on_parsed_prices(tmp_workdir):
+    """Test: price bounds are applied to the parsed cents, including price ranges."""
+    db_dir = tmp_workdir / "src" / "database"
+    db_dir.mkdir(parents=True)
+    conn = sqlite_connection.connect_db(str(db_dir / "restaurants_raleigh.db"))
+    sqlite_connection.create_table(conn)
+    sqlite_connection.insert_rows(conn, [("A1", "$4.50", "D1"), ("A2", "9.99/14.99", "D2"), ("A3", "MP", "D3")], "A")
+    sqlite_connection.insert_rows(conn, [("B1", "$20", "D4")], "B")
+    conn.commit()
+    conn.close()
+    assert len(dq.query(["A", "B"])) == 4
+    assert [r[1] for r in dq.query(["A", "B"], max_price=10)] == ["A1", "A2"]
+    assert [r[1] for r in dq.query(["A", "B"], min_price=12)] == ["A2", "B1"]
+    assert dq.query(["B"], min_price=5, max_price=10) == []
+
+def test_search_dishes_ranks_matches_with_bm25(tmp_workdir):
+    """Test: search_dishes returns the best dish matches first, honouring limit and restaurants."""
+    db_dir = tmp_workdir / "src" / "database"
+    db_dir.mkdir(parents=True)
+    conn = sqlite_connection.connect_db(str(db_dir / "restaurants_raleigh.db"))
+    sqlite_connection.create_table(conn)
+    sqlite_connection.insert_rows(conn, [("Spicy Noodles", "$9", "Wheat noodles, chili oil"),
+                                         ("Fried Rice", "$8", "With a side of noodles"),
+                                         ("Burger", "$10", "Beef patty")], "A")
+    sqlite_connection.insert_rows(conn, [("Noodle Soup", "$7", "Spicy broth")], "B")
+    conn.commit()
+    conn.close()
+    rows = dq.search_dishes("spicy noodles")
+    assert [r[1] for r in rows][:2] == ["Spicy Noodles", "Noodle Soup"] and len(rows) == 3
+    assert [r[1] for r in dq.search_dishes("noodle")][-1] == "Fried Rice"  # description-only hit ranks last
+    assert len(dq.search_dishes("noodle", limit=2)) == 2
+    assert dq.search_dishes("noodles", restaurants=["B"]) == [(4, "Noodle Soup", "$7", "Spicy broth", "B")]
+    assert dq.search_dishes('"burger" OR (*') == [(3, "Burger", "$10", "Beef patty", "A")]
+    assert dq.search_dishes("?!") == [] and dq.search_dishes("sushi") == []
+    assert dq.search_dishes("I want something with a burger") == [(3, "Burger", "$10", "Beef patty", "A")]
+
+def test_match_expression_drops_filler_words():
+    """Test: stopwords are left out of the OR query; a query of only filler words matches nothing."""
+    assert dq.match_expression("Can I get something with noodles and tofu?") == '"noodles" OR "tofu"'
+    assert dq.match_expression("Noodles, NOODLES") == '"noodles"'
+    assert dq.match_expression("something with a") is None
+
+def test_search_dishes_does_not_migrate_an_old_flat_database(tmp_workdir):
+    """Test: searches never run DDL; the flat table is migrated and indexed at load time."""
+    db_path = _make_db_at_default_location(tmp_workdir)
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        dq.search_dishes("B1")
+    conn = sqlite_connection.connect_db(str(db_path))
+    sqlite_connection.create_table(conn)
+    conn.close()
+    assert [r[1] for r in dq.search_dishes("B1")] == ["B1"]
+
+def _make_semantic_db(tmp_workdir):
+    db_dir = tmp_workdir / "src" / "database"
+    db_dir.mkdir(parents=True)
+    conn = sqlite_connection.connect_db(str(db_dir / "restaurants_raleigh.db"))
+    sqlite_connection.create_table(conn)
+    sqlite_connection.insert_rows(conn, [("Spicy Dan Dan Noodles", "$12", "Chili oil, pork"),
+                                         ("Vanilla Ice Cream", "$4", "Two scoops"),
+                                         ("Garden Salad", "$7", "Greens and tomato")], "A")
+    sqlite_connection.insert_rows(conn, [("Beef Noodle Soup", "$11", "Rich broth")], "B")
+    sqlite_connection.embed_missing(conn)
+    return conn
+
+def test_semantic_search_finds_near_matches_keyword_search_misses(tmp_workdir):
+    """Test: semantic_search ranks by embedding similarity and tolerates misspellings."""
+    _make_semantic_db(tmp_workdir).commit()
+    assert dq.search_dishes("noodels") == []
+    assert dq.semantic_search("something spicy with noodels")[0][1] == "Spicy Dan Dan Noodles"
+    rows = dq.semantic_search("beef noodels")
+    assert [r[1] for r in rows] == ["Beef Noodle Soup"]
+    assert dq.semantic_search("noodles", restaurants=["B"]) == [(4, "Beef Noodle Soup", "$11", "Rich broth", "B")]
+    assert len(dq.semantic_search("noodles", limit=1)) == 1
+    assert dq.semantic_search("with some") == [] and dq.semantic_search("noodles", restaurants=[]) == []
+
+def test_semantic_search_reloads_the_cached_index_after_writes(tmp_workdir, monkeypatch):
+    """Test: the in-memory vector index is reused until menu_vectors changes."""
+    monkeypatch.setattr(dq, "_vector_indexes", {})
+    conn = _make_semantic_db(tmp_workdir)
+    conn.commit()
+    dq.semantic_search("salad")
+    index = next(iter(dq._vector_indexes.values()))
+    dq.semantic_search("ice cream")
+    assert next(iter(dq._vector_indexes.values())) is index
+    sqlite_connection.upsert_row(conn, "Garden Salad", "$7", "Greens, tomato and cucumber", "A")
+    sqlite_connection.insert_rows(conn, [("Cucumber Salad", "$6", "Sesame dressing")], "B")
+    conn.commit()
+    assert dq.semantic_search("cucumber") == []  # both rows await embed_missing
+    sqlite_connection.embed_missing(conn)
+    conn.commit()
+    conn.close()
+    assert [r[1] for r in dq.semantic_search("cucumber")][:2] == ["Cucumber Salad", "Garden Salad"]
+    assert next(iter(dq._vector_indexes.values())) is not index
+
+def test_semantic_search_without_numpy_gives_the_same_rows(tmp_workdir, monkeypatch):
+    """Test: the pure-Python scan ranks like the NumPy backend."""
+    _make_semantic_db(tmp_workdir).commit()
+    expected = dq.semantic_search("spicy noodels", restaurants=["A", "B"])
+    monkeypatch.setattr(dq, "np", None)
+    monkeypatch.setattr(dq, "_vector_indexes", {})
+    assert dq.semantic_search("spicy noodels", restaurants=["A", "B"]) == expected
+    assert dq.semantic_search("noodles", restaurants=["B"], approximate=True) == [
+        (4, "Beef Noodle Soup", "$11", "Rich broth", "B")]
+
+def test_ivf_index_matches_exact_search_when_probing_every_list():
+    """Test: the approximate index covers every row once and equals the exact top-k at full nprobe."""
+    pytest.importorskip("numpy")
+    import random
+    random.seed(0)
+    words = "spicy noodle soup beef chicken tofu rice curry salad cake garlic basil shrimp pork".split()
+    vectors = [sqlite_connection.embed_text(" ".join(random.sample(words, 3))) for _ in range(400)]
+    matrix = dq.np.frombuffer(b"".join(v.tobytes() for v in vectors), dtype=dq.np.float32).reshape(400, -1)
+    ivf = dq.IVFIndex(matrix)
+    assert len(ivf.centroids) == 20 and sorted(ivf.order.tolist()) == list(range(400))
+    query = dq.np.frombuffer(sqlite_connection.embed_text("spicy noodle soup"), dtype=dq.np.float32)
+    assert sorted(ivf.candidates(query, nprobe=20).tolist()) == list(range(400))
+    assert len(ivf.candidates(query, nprobe=2)) < 400
+
+def test_semantic_search_never_writes_to_the_database(tmp_workdir):
+    """Test: queries run on a read-only connection, even while a loader holds the write lock."""
+    conn = _make_semantic_db(tmp_workdir)
+    conn.commit()
+    sqlite_connection.insert_rows(conn, [("Dan Dan Mian", "$9", "Sesame noodles")], "C")  # write lock held
+    assert [r[1] for r in dq.semantic_search("spicy noodles")][0] == "Spicy Dan Dan Noodles"
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM menu_vectors").fetchone()[0] == 4
+    conn.close()
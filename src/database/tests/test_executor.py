@@ -0,0 +1,57 @@
+
+import threading
+import time
+import pytest
+import executor as ex
+
+def test_run_stage_sequential_preserves_order():
+    """Test: workers=1 processes items inline and in order."""
+    seen = []
+    def f(x):
+        seen.append(threading.current_thread().name)
+        return x * 2
+    results, stats = ex.run_stage("s", f, [1, 2, 3], workers=1)
+    assert results == [2, 4, 6]
+    assert set(seen) == {threading.current_thread().name}
+    assert stats.items == 3 and stats.workers == 1
+
+def test_run_stage_concurrent_matches_sequential_order():
+    """Test: concurrent results come back in input order even when finishing out of order."""
+    def f(x):
+        time.sleep(0.01 * (5 - x))
+        return x
+    results, _ = ex.run_stage("s", f, range(5), workers=5)
+    assert results == [0, 1, 2, 3, 4]
+
+def test_run_stage_respects_worker_limit():
+    """Test: no more than `workers` calls are in flight at once."""
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+    def f(x):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.02)
+        with lock:
+            state["now"] -= 1
+    ex.run_stage("s", f, range(12), workers=3)
+    assert state["peak"] <= 3
+
+def test_run_stage_propagates_errors():
+    """Test: an exception from func aborts the stage like a plain loop."""
+    def f(x):
+        if x == 2:
+            raise ValueError("boom")
+        return x
+    with pytest.raises(ValueError):
+        ex.run_stage("s", f, [1, 2, 3], workers=2)
+
+def test_print_stage_report_shows_throughput(capsys):
+    """Test: report lists each stage with its items/second."""
+    ex.print_stage_report([ex.StageStats("fetch", items=10, workers=4, elapsed=2.0)])
+    out = capsys.readouterr().out
+    assert "fetch" in out and "5.00/s" in out and "4 workers" in out
+
+def test_stage_stats_zero_elapsed_has_zero_throughput():
+    """Test: throughput does not divide by zero."""
+    assert ex.StageStats("x", items=3).throughput == 0.0
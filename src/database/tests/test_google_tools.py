@@ -18,14 +18,14 @@ def test_send_payload_success_returns_first_link(monkeypatch, FakeResp):
     def fake_get(url, params):
         assert "customsearch/v1" in url
         return FakeResp(200, {"items": [{"link": "http://first"}, {"link": "http://second"}]})
-    monkeypatch.setattr(gt.requests, "get", fake_get)
+    monkeypatch.setattr(gt.http_client, "get", fake_get)
     assert gt.send_payload({"any": "thing"}) == "http://first"
 
 def test_send_payload_non200_raises_and_prints_code(monkeypatch, capsys, FakeResp):
     """Test: non-200 response triggers exception and prints status code."""
     def fake_get(url, params):
         return FakeResp(500, {"error": "nope"})
-    monkeypatch.setattr(gt.requests, "get", fake_get)
+    monkeypatch.setattr(gt.http_client, "get", fake_get)
     with pytest.raises(Exception):
         gt.send_payload({"x": 1})
     out = capsys.readouterr().out
@@ -46,7 +46,7 @@ def test_restaurant_search_writes_unique_names(tmp_workdir, monkeypatch, FakeRes
         assert headers["X-Goog-Api-Key"]
         return FakeResp(200, results)
 
-    monkeypatch.setattr(gt.requests, "post", fake_post)
+    monkeypatch.setattr(gt.http_client, "post", fake_post)
 
     gt.restaurant_search(["Italian", "Mexican"], "Raleigh")
 
@@ -63,3 +63,68 @@ def test_build_payload_leaves_unknown_params(monkeypatch):
     payload = gt.build_payload("sushi", start=1, num=9, safe="off")
     assert payload["num"] == 9 and payload["safe"] == "off"
     assert payload["key"] == "K2" and payload["cx"] == "CX2"
+
+def test_send_payload_reuses_cached_link(monkeypatch, FakeResp):
+    """Test: the same query is only sent once; the API key is not part of the cache key."""
+    calls = []
+    def fake_get(url, params):
+        calls.append(params)
+        return FakeResp(200, {"items": [{"link": "http://cached"}]})
+    monkeypatch.setattr(gt.http_client, "get", fake_get)
+    assert gt.send_payload({"q": "pizza", "key": "A"}) == "http://cached"
+    assert gt.send_payload({"q": "pizza", "key": "B"}) == "http://cached"
+    assert len(calls) == 1
+
+def test_send_payload_no_items_raises_and_is_negatively_cached(monkeypatch, FakeResp):
+    """Test: a query without results raises, and is not re-sent on retry."""
+    calls = []
+    def fake_get(url, params):
+        calls.append(1)
+        return FakeResp(200, {})
+    monkeypatch.setattr(gt.http_client, "get", fake_get)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            gt.send_payload({"q": "nowhere"})
+    assert len(calls) == 1
+
+def test_restaurant_search_follows_pages_and_registers_places(tmp_workdir, monkeypatch, FakeResp):
+    """Test: restaurant_search pages through results and stores places keyed by ID with cuisine tags."""
+    import json, sqlite3, restaurant_registry
+    (tmp_workdir / "src" / "database").mkdir(parents=True)
+    pages = {
+        ("Thai Restaurants in Raleigh", None): {"places": [
+            {"id": "p1", "displayName": {"text": "Bangkok"}, "formattedAddress": "1 Main St"},
+        ], "nextPageToken": "t2"},
+        ("Thai Restaurants in Raleigh", "t2"): {"places": [
+            {"id": "p2", "displayName": {"text": "Chain"}, "formattedAddress": "2 Oak St"},
+        ]},
+        ("Asian Restaurants in Raleigh", None): {"places": [
+            {"id": "p1", "displayName": {"text": "Bangkok"}, "formattedAddress": "1 Main St"},
+            {"id": "p3", "displayName": {"text": "Chain"}, "formattedAddress": "3 Elm St"},
+        ]},
+    }
+
+    def fake_post(url, headers, data):
+        assert "places.formattedAddress" in headers["X-Goog-FieldMask"]
+        body = json.loads(data)
+        return FakeResp(200, pages[(body["textQuery"], body.get("pageToken"))])
+
+    monkeypatch.setattr(gt.http_client, "post", fake_post)
+    db = tmp_workdir / "r.db"
+    names = gt.restaurant_search(["Thai", "Asian"], "Raleigh", db_path=str(db))
+
+    assert names == ["Bangkok", "Chain"]
+    conn = sqlite3.connect(str(db))
+    assert conn.execute("SELECT COUNT(*) FROM restaurant_registry").fetchone()[0] == 3
+    assert [r[0] for r in restaurant_registry.places_for_cuisine(conn, "Asian")] == ["p1", "p3"]
+    assert (tmp_workdir / "Restaurant_List.txt").read_text(encoding="utf-8") == "Bangkok,Chain"
+    assert not (tmp_workdir / "src" / "database" / "Restaurant_List.txt").exists()
+
+def test_search_places_does_not_cache_http_errors(tmp_workdir, monkeypatch, FakeResp):
+    """Test: a failed Places page raises instead of being cached as an empty result."""
+    replies = [FakeResp(403, {"error": {"message": "quota"}}), FakeResp(200, {"places": [{"displayName": {"text": "A"}}]})]
+    monkeypatch.setattr(gt.http_client, "post", lambda url, headers, data: replies.pop(0))
+    headers = {"X-Goog-FieldMask": gt.PLACES_FIELDS}
+    with pytest.raises(Exception):
+        gt.search_places("Thai Restaurants in Raleigh", headers)
+    assert gt.search_places("Thai Restaurants in Raleigh", headers) == [{"displayName": {"text": "A"}}]
@@ -4,9 +4,9 @@ import html_tools as ht
 def test_extract_content_writes_when_over_min_lines(tmp_workdir, monkeypatch, FakeResp):
     """Test: content is written when page meets min_lines threshold."""
     html = "<html><body>" + "\n".join([f"line{i}" for i in range(10)]) + "</body></html>"
-    def fake_get(url):
+    def fake_get(url, **kwargs):
         return FakeResp(200, text=html)
-    monkeypatch.setattr(ht.requests, "get", fake_get)
+    monkeypatch.setattr(ht.http_client, "get", fake_get)
 
     out = tmp_workdir / "out.txt"
     ht.extract_content("http://x", str(out), min_lines=5, max_lines=100)
@@ -17,9 +17,9 @@ def test_extract_content_writes_when_over_min_lines(tmp_workdir, monkeypatch, Fa
 def test_extract_content_skips_when_under_min_lines(tmp_workdir, monkeypatch, FakeResp):
     """Test: file is not written when below min_lines."""
     html = "<html><body>only1\nonly2</body></html>"
-    def fake_get(url):
+    def fake_get(url, **kwargs):
         return FakeResp(200, text=html)
-    monkeypatch.setattr(ht.requests, "get", fake_get)
+    monkeypatch.setattr(ht.http_client, "get", fake_get)
 
     out = tmp_workdir / "skip.txt"
     ht.extract_content("http://y", str(out), min_lines=5, max_lines=100)
@@ -34,9 +34,9 @@ def test_extract_content_strips_unwanted_tags(tmp_workdir, monkeypatch, FakeResp
         "<noscript>BAD3</noscript>"
         "keep2</body></html>"
     )
-    def fake_get(url):
+    def fake_get(url, **kwargs):
         return FakeResp(200, text=html)
-    monkeypatch.setattr(ht.requests, "get", fake_get)
+    monkeypatch.setattr(ht.http_client, "get", fake_get)
 
     out = tmp_workdir / "no_tags.txt"
     ht.extract_content("http://z", str(out), min_lines=1, max_lines=100)
@@ -47,10 +47,97 @@ def test_extract_content_strips_unwanted_tags(tmp_workdir, monkeypatch, FakeResp
 def test_extract_content_respects_max_lines_and_skips(tmp_workdir, monkeypatch, FakeResp):
     """Test: pages exceeding max_lines are skipped to avoid huge outputs."""
     html = "<html><body>" + "\n".join([f"line{i}" for i in range(200)]) + "</body></html>"
-    def fake_get(url):
+    def fake_get(url, **kwargs):
         return FakeResp(200, text=html)
-    monkeypatch.setattr(ht.requests, "get", fake_get)
+    monkeypatch.setattr(ht.http_client, "get", fake_get)
 
     out = tmp_workdir / "too_big.txt"
     ht.extract_content("http://big", str(out), min_lines=10, max_lines=50)
     assert not out.exists()
+
+def test_html_to_lines_and_line_limits():
+    """Test: html_to_lines returns stripped visible lines; limits are exclusive."""
+    lines = ht.html_to_lines("<p> a </p><script>x</script><p>b</p>")
+    assert lines == ["a", "b"]
+    assert ht.within_line_limits(5, min_lines=4, max_lines=6)
+    assert not ht.within_line_limits(4, min_lines=4, max_lines=6)
+
+def test_refresh_content_sends_validators_and_skips_on_304(tmp_workdir, monkeypatch, FakeResp):
+    """Test: stored ETag/Last-Modified are sent and a 304 leaves the snapshot untouched."""
+    seen = {}
+    def fake_get(url, headers, **kwargs):
+        seen.update(headers)
+        return FakeResp(304, headers={"ETag": '"v2"'})
+    monkeypatch.setattr(ht.http_client, "get", fake_get)
+    out = tmp_workdir / "snap.txt"
+    out.write_text("old", encoding="utf-8")
+    status, fresh = ht.refresh_content("http://x", str(out),
+                                       {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "body_hash": "b1"})
+    assert status == "unchanged" and out.read_text(encoding="utf-8") == "old"
+    assert seen == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert fresh == {"etag": '"v2"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "body_hash": "b1"}
+
+def test_refresh_content_detects_identical_body_without_validators(tmp_workdir, monkeypatch, FakeResp):
+    """Test: a server ignoring conditional headers is caught by the body hash; a changed body is saved."""
+    html = "".join(f"<p>line {i}</p>" for i in range(200))
+    body = {"html": html}
+    def fake_get(url, **kwargs):
+        return FakeResp(200, text=body["html"], headers={"Last-Modified": "Tue, 02 Jan 2024 00:00:00 GMT"})
+    monkeypatch.setattr(ht.http_client, "get", fake_get)
+    out = tmp_workdir / "snap.txt"
+    status, fresh = ht.refresh_content("http://x", str(out))
+    assert status == "saved" and fresh["last_modified"] == "Tue, 02 Jan 2024 00:00:00 GMT"
+
+    out.write_text("kept", encoding="utf-8")
+    status, _ = ht.refresh_content("http://x", str(out), {"body_hash": fresh["body_hash"]})
+    assert status == "unchanged" and out.read_text(encoding="utf-8") == "kept"
+
+    body["html"] = html + "<p>new dish</p>"
+    status, newer = ht.refresh_content("http://x", str(out), {"body_hash": fresh["body_hash"]})
+    assert status == "saved" and newer["body_hash"] != fresh["body_hash"]
+
+_TRICKY_HTML = [
+    "<p>a &amp; b</p>x<b>y</b>z<script>var a='<p>';</script><noscript><p>ns</p></noscript><!-- c --><p>one\ntwo</p>",
+    "<html><head><title>T</title><style>p{}</style></head><body><div>Menu<br>Item 1 $5</div></body></html>",
+    "a<!--c-->b", "<p>caf&eacute; &nbsp; x</p>", "<p>unclosed <noscript>hidden", "",
+    "<li><noscript>hidden</li>shown", "<p>a</p></noscript><p>b</p>", "$9.99</b>&amp;word", "<![CDATA[cd]]><p>x</p>",
+]
+
+def test_stream_engine_matches_bs4_even_when_chunked():
+    """Test: the streaming engine reproduces the BeautifulSoup lines, however the markup is split."""
+    for html in _TRICKY_HTML:
+        expected = ht.html_to_lines(html, engine="bs4")
+        assert ht.html_to_lines(html, engine="stream") == expected
+        assert ht.get_engine("stream")([html[i:i + 3] for i in range(0, len(html), 3)]) == expected
+
+def test_lxml_engine_matches_bs4_on_well_formed_markup():
+    """Test: the lxml engine gives the same lines for properly nested pages."""
+    import pytest
+    pytest.importorskip("lxml")
+    html = "<html><body>" + _TRICKY_HTML[1] + "<ul><li>Pad Thai $12.99</li><li>Caf&eacute;<br>x</li></ul>" + "</body></html>"
+    assert ht.html_to_lines(html, engine="lxml") == ht.html_to_lines(html, engine="bs4")
+
+def test_engine_selection(monkeypatch):
+    """Test: HTML_ENGINE picks the engine; unknown names are rejected."""
+    import pytest
+    assert ht.get_engine() is ht.ENGINES["stream"]
+    monkeypatch.setenv("HTML_ENGINE", "bs4")
+    assert ht.get_engine() is ht.ENGINES["bs4"]
+    with pytest.raises(ValueError):
+        ht.get_engine("nope")
+
+def test_fetch_lines_stops_downloading_at_line_budget(monkeypatch, FakeResp):
+    """Test: the body is streamed into the engine and reading stops once max_lines is reached."""
+    html = "".join(f"<p>line {i}</p>" for i in range(5000))
+    resp = FakeResp(200, text=html)
+    consumed = []
+    chunks = resp.iter_content
+    resp.iter_content = lambda size: (consumed.append(c) or c for c in chunks(256))
+    def fake_get(url, stream=False, **kwargs):
+        assert stream
+        return resp
+    monkeypatch.setattr(ht.http_client, "get", fake_get)
+    lines, fresh = ht.fetch_lines_if_changed("http://x", max_lines=50)
+    assert lines == [f"line {i}" for i in range(50)]
+    assert sum(map(len, consumed)) < len(html) // 10
+    assert fresh["body_hash"] is None
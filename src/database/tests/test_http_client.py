@@ -0,0 +1,95 @@
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import http_client as hc
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+    failures_left = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        _Handler.connections.add(self.client_address)
+        if self.path == "/flaky" and _Handler.failures_left > 0:
+            _Handler.failures_left -= 1
+            self._send(503, b"busy")
+            return
+        if self.path == "/big":
+            self._send(200, b"x" * 5000)
+            return
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for _ in range(10):
+                    self.wfile.write(b"3e8\r\n" + b"y" * 1000 + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client aborted the oversized body
+            return
+        self._send(200, b'{"ok": true}')
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    _Handler.connections = set()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    t = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    t.start()
+    hc.reset()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    hc.reset()
+    srv.shutdown()
+
+def test_get_returns_readable_response(server):
+    """Test: the body is available through .json()/.text after streaming."""
+    r = hc.get(server + "/")
+    assert r.status_code == 200 and r.json() == {"ok": True}
+
+def test_connections_are_reused(server):
+    """Test: sequential requests to one host share a keep-alive connection."""
+    for _ in range(5):
+        hc.get(server + "/")
+    assert len(_Handler.connections) == 1
+
+def test_declared_oversize_body_is_rejected(server):
+    """Test: Content-Length above max_bytes raises ResponseTooLarge."""
+    with pytest.raises(hc.ResponseTooLarge):
+        hc.get(server + "/big", max_bytes=1000)
+
+def test_streamed_oversize_body_is_aborted(server):
+    """Test: bodies without Content-Length are cut off once they pass max_bytes."""
+    with pytest.raises(hc.ResponseTooLarge):
+        hc.get(server + "/chunked", max_bytes=2500)
+    assert len(hc.get(server + "/chunked").content) == 10000
+
+def test_transient_5xx_is_retried(server):
+    """Test: a 503 is retried transparently."""
+    _Handler.failures_left = 1
+    assert hc.get(server + "/flaky").status_code == 200
+
+def test_too_large_is_a_request_exception():
+    """Test: callers catching RequestException also catch oversize bodies."""
+    assert issubclass(hc.ResponseTooLarge, hc.requests.exceptions.RequestException)
+
+def test_requests_use_default_timeouts(monkeypatch):
+    """Test: every call carries connect and read timeouts."""
+    seen = {}
+    class S:
+        def request(self, method, url, **kwargs):
+            seen.update(kwargs)
+            raise hc.requests.exceptions.ConnectTimeout("slow")
+    monkeypatch.setattr(hc, "get_session", lambda: S())
+    with pytest.raises(hc.requests.exceptions.ConnectTimeout):
+        hc.get("http://example.invalid")
+    assert seen["timeout"] == (hc.CONNECT_TIMEOUT, hc.READ_TIMEOUT)
@@ -0,0 +1,49 @@
+
+from types import SimpleNamespace
+
+import executor
+import llm_usage as lu  # module under test
+
+def test_record_call_persists_and_summarizes_the_run(capsys):
+    """Test: calls are logged with label and size, totalled per run and priced per model."""
+    with lu.labelled("Thai Place"):
+        lu.record_call(SimpleNamespace(prompt_tokens=1000, completion_tokens=200), "gpt-5-mini", "x" * 40, 1.5)
+    lu.record_call({"prompt_tokens": 300, "completion_tokens": 100}, "gpt-5-mini", "y" * 10, 0.5, label="Taco Stop")
+    lu.record_call(None, "gpt-5-mini", "z", mode="batch", label="Taco Stop")
+    summary = lu.get_log().summary(lu.run_id())
+    assert summary["calls"] == 3 and summary["prompt_tokens"] == 1300 and summary["completion_tokens"] == 300
+    assert summary["cost"] == lu.cost("gpt-5-mini", 1300, 300) == (1300 * 0.25 + 300 * 2.00) / 1_000_000
+    assert summary["top"] == [("Thai Place", 1, 1200, 1.5, 40), ("Taco Stop", 2, 400, 0.5, 11)]
+    assert lu.run_tokens() == 1600
+    lu.print_report()
+    assert "3 calls, 1300 prompt + 300 completion tokens" in capsys.readouterr().out
+
+    previous = lu.run_id()
+    lu.reset()
+    assert lu.run_tokens() == 0 and lu.get_log().summary(lu.run_id())["calls"] == 0
+    assert lu.get_log().summary(previous)["calls"] == 3
+
+def test_budget_is_exhausted_once_the_run_spends_it():
+    """Test: no budget never blocks; a budget blocks once calls reach it."""
+    assert lu.budget_remaining() is None and not lu.budget_exhausted()
+    lu.set_budget(100)
+    lu.record_call({"prompt_tokens": 60, "completion_tokens": 30}, "gpt-5-mini", "")
+    assert lu.budget_remaining() == 10 and not lu.budget_exhausted()
+    lu.record_call({"prompt_tokens": 20, "completion_tokens": 0}, "gpt-5-mini", "")
+    assert lu.budget_remaining() == 0 and lu.budget_exhausted()
+
+def test_label_follows_calls_into_run_stage_workers():
+    """Test: worker threads of executor.run_stage record under the caller's label."""
+    def call(i):
+        return lu.record_call({"prompt_tokens": i, "completion_tokens": 0}, "gpt-5-mini", "chunk")
+
+    with lu.labelled("Chain Diner"):
+        executor.run_stage("chunks", call, [1, 2, 3, 4], workers=4)
+    assert lu.get_log().summary(lu.run_id())["top"] == [("Chain Diner", 4, 10, 0, 20)]
+
+def test_usage_log_can_be_disabled(monkeypatch):
+    """Test: LLM_USAGE_PATH=off keeps run totals without a database."""
+    monkeypatch.setenv("LLM_USAGE_PATH", "off")
+    lu.reset()
+    lu.record_call({"prompt_tokens": 5, "completion_tokens": 5}, "gpt-5-mini", "")
+    assert lu.get_log() is None and lu.run_tokens() == 10
@@ -0,0 +1,98 @@
+
+from datetime import datetime, timedelta, timezone
+import manifest as mf
+
+def test_record_and_get_roundtrip(tmp_path):
+    """Test: each stage's record_* call is persisted on the restaurant's row."""
+    m = mf.Manifest(str(tmp_path / "m.db"))
+    m.record_url("R", "http://r")
+    m.record_snapshot("R", "s1")
+    m.record_menu("R", "s1", "c1")
+    m.record_load("R", "c1")
+    row = m.get("R")
+    assert row["url"] == "http://r" and row["snapshot_hash"] == "s1"
+    assert row["menu_snapshot_hash"] == "s1" and row["csv_hash"] == "c1"
+    assert row["loaded_csv_hash"] == "c1"
+    assert all(row[k] for k in ("url_at", "snapshot_at", "menu_at", "load_at"))
+
+def test_get_unknown_restaurant_is_empty(tmp_path):
+    """Test: unknown restaurants return an empty dict."""
+    assert mf.Manifest(str(tmp_path / "m.db")).get("nope") == {}
+
+def test_manifest_persists_across_reopen(tmp_path):
+    """Test: a rerun sees what the previous (possibly crashed) run recorded."""
+    path = str(tmp_path / "m.db")
+    m = mf.Manifest(path)
+    m.record_menu("R", "s1", "c1")
+    m.close()
+    assert mf.Manifest(path).menu_is_current("R", "s1")
+
+def test_menu_and_load_currency_checks(tmp_path):
+    """Test: menu/load are current only for the exact recorded hashes."""
+    m = mf.Manifest(str(tmp_path / "m.db"))
+    m.record_menu("R", "s1", "c1")
+    assert m.menu_is_current("R", "s1")
+    assert not m.menu_is_current("R", "s2")
+    assert not m.load_is_current("R", "c1")
+    m.record_load("R", "c1")
+    assert m.load_is_current("R", "c1")
+    assert not m.load_is_current("R", None)
+
+def test_snapshot_freshness_uses_age(tmp_path):
+    """Test: snapshots older than max_age_hours are stale."""
+    m = mf.Manifest(str(tmp_path / "m.db"))
+    assert not m.snapshot_is_fresh("R", 20)
+    m.record_snapshot("R", "s1")
+    assert m.snapshot_is_fresh("R", 20)
+    old = (datetime.now(timezone.utc) - timedelta(hours=30)).isoformat()
+    m._update("R", snapshot_at=old)
+    assert not m.snapshot_is_fresh("R", 20)
+
+def test_changed_url_invalidates_snapshot(tmp_path):
+    """Test: resolving a different URL forces the page to be fetched again."""
+    m = mf.Manifest(str(tmp_path / "m.db"))
+    m.record_url("R", "http://old")
+    m.record_snapshot("R", "s1")
+    m.record_url("R", "http://new")
+    assert not m.snapshot_is_fresh("R", 20)
+
+def test_hash_helpers(tmp_path):
+    """Test: hash_file matches hash_text for the same UTF-8 content; missing files hash to None."""
+    p = tmp_path / "a.txt"
+    p.write_bytes("héllo".encode("utf-8"))
+    assert mf.hash_file(str(p)) == mf.hash_text("héllo")
+    assert mf.hash_file(str(tmp_path / "missing")) is None
+
+def test_url_failure_is_recorded_and_cleared_on_success(tmp_path):
+    """Test: a failed lookup keeps its error until a URL is recorded."""
+    m = mf.Manifest(str(tmp_path / "m.db"))
+    m.record_url_failure("R", "No Results")
+    assert m.get("R")["url_error"] == "No Results" and m.get("R")["url"] is None
+    m.record_url("R", "http://r")
+    assert m.get("R")["url_error"] is None
+
+def test_manifest_adds_new_columns_to_old_files(tmp_path):
+    """Test: manifests created before url_error existed are migrated in place."""
+    import sqlite3
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE build_manifest (restaurant TEXT PRIMARY KEY, url TEXT, url_at TEXT, "
+                 "snapshot_hash TEXT, snapshot_at TEXT, menu_snapshot_hash TEXT, csv_hash TEXT, "
+                 "menu_at TEXT, loaded_csv_hash TEXT, load_at TEXT)")
+    conn.execute("INSERT INTO build_manifest (restaurant, url) VALUES ('R', 'http://r')")
+    conn.commit()
+    conn.close()
+    m = mf.Manifest(path)
+    m.record_url_failure("S", "boom")
+    assert m.get("R")["url"] == "http://r" and m.get("S")["url_error"] == "boom"
+    m.record_menu("R", "s1", "c1", "rules")
+    assert m.get("R")["menu_path"] == "rules"
+
+def test_validators_roundtrip_and_reset_on_url_change(tmp_path):
+    """Test: HTTP validators are stored per restaurant and dropped when the URL changes."""
+    m = mf.Manifest(str(tmp_path / "m.db"))
+    m.record_url("R", "http://old")
+    m.record_validators("R", {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "body_hash": "b1"})
+    assert m.validators("R") == {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "body_hash": "b1"}
+    m.record_url("R", "http://new")
+    assert m.validators("R") == {"etag": None, "last_modified": None, "body_hash": None}
@@ -0,0 +1,108 @@
+
+import json
+from types import SimpleNamespace
+import menu_batch as mb  # module under test
+import menu_recreator as mr
+import llm_usage
+import rate_limiter
+
+def _dish(body):
+    """Reply with a row named after the first word of the snapshot in the prompt."""
+    word = body["messages"][-1]["content"].split("INPUT TEXT:")[1].split()[0]
+    if word == "Broken":
+        raise RuntimeError("bad request")
+    return f"{word},$7,Good"
+
+def test_run_batch_writes_csvs_and_records_failures(tmp_path, monkeypatch):
+    """Test: one batch is submitted, polled to completion and fanned out into cleaned CSVs."""
+    sleeps = []
+    monkeypatch.setattr(mb.time, "sleep", sleeps.append)
+    backend = mb.LocalBatchBackend(_dish, polls_until_done=2)
+    jobs = [("Taco", str(tmp_path / "a")), ("Soup", str(tmp_path / "b")), ("Broken", str(tmp_path / "c"))]
+    results = []
+    failures, stats = mb.run_batch(jobs, backend, prune=False, poll_interval=5,
+                                   on_result=lambda out, err: results.append(out))
+    assert len(backend.batches) == 1 and sleeps == [5, 5]
+    assert (tmp_path / "a").read_text(encoding="utf-8").strip() == "Taco,$7,Good"
+    assert (tmp_path / "b").read_text(encoding="utf-8").strip() == "Soup,$7,Good"
+    assert failures == {str(tmp_path / "c"): "bad request"}
+    assert sorted(results) == sorted(out for _, out in jobs) and stats.items == 3
+
+def test_run_batch_skips_cached_replies(tmp_path, monkeypatch):
+    """Test: snapshots answered before (by a batch or a live call) are not resubmitted."""
+    monkeypatch.setattr(mb.time, "sleep", lambda _: None)
+    backend = mb.LocalBatchBackend(_dish)
+    mb.run_batch([("Taco", str(tmp_path / "a"))], backend, prune=False)
+    monkeypatch.setattr(mr.client.chat.completions, "create", lambda **_: 1 / 0)
+    assert mr.request_menu_csv("Taco") == "Taco,$7,Good"
+    failures, _ = mb.run_batch([("Taco", str(tmp_path / "b"))], backend, prune=False)
+    assert failures == {} and len(backend.batches) == 1
+    assert (tmp_path / "b").read_text(encoding="utf-8").strip() == "Taco,$7,Good"
+
+def test_run_batch_fails_and_does_not_cache_empty_replies(tmp_path, monkeypatch):
+    """Test: an empty reply marks the job failed and is submitted again next run."""
+    monkeypatch.setattr(mb.time, "sleep", lambda _: None)
+    backend = mb.LocalBatchBackend(lambda body: "")
+    failures, _ = mb.run_batch([("Taco", str(tmp_path / "a"))], backend, prune=False)
+    assert failures == {str(tmp_path / "a"): "empty reply"} and not (tmp_path / "a").exists()
+    mb.run_batch([("Taco", str(tmp_path / "a"))], backend, prune=False)
+    assert len(backend.batches) == 2
+
+def test_openai_backend_uploads_jsonl_and_parses_output_and_error_files():
+    """Test: requests are uploaded as Batch API JSONL and both result files are read back."""
+    uploads, files = [], {
+        "out": json.dumps({"custom_id": "menu-0", "response": {"status_code": 200, "body": {
+            "choices": [{"message": {"content": "Taco,$7,Good"}}],
+            "usage": {"prompt_tokens": 9, "completion_tokens": 3}}}}),
+        "err": json.dumps({"custom_id": "menu-1", "response": {"status_code": 400, "body": {
+            "error": {"message": "too long"}}}}),
+    }
+    files["out"] += "\n" + json.dumps({"custom_id": "menu-2", "response": {"status_code": 200, "body": {
+        "choices": [{"message": {"content": "Soup,$4"}, "finish_reason": "length"}]}}})
+    client = SimpleNamespace(
+        files=SimpleNamespace(
+            create=lambda file, purpose: uploads.append((file, purpose)) or SimpleNamespace(id="file-1"),
+            content=lambda file_id: SimpleNamespace(text=files[file_id] + "\n"),
+        ),
+        batches=SimpleNamespace(
+            create=lambda **kw: SimpleNamespace(id="batch-1", **kw),
+            retrieve=lambda batch_id: SimpleNamespace(
+                status="completed", output_file_id="out", error_file_id="err",
+                request_counts=SimpleNamespace(completed=1, failed=1, total=2)),
+        ),
+    )
+    backend = mb.OpenAIBatchBackend(client)
+    batch_id = backend.submit([{"custom_id": "menu-0", "body": mr.chat_request("Taco")},
+                               {"custom_id": "menu-1", "body": mr.chat_request("Soup")}])
+    (name, payload), purpose = uploads[0]
+    lines = [json.loads(line) for line in payload.decode("utf-8").splitlines()]
+    assert purpose == "batch" and [line["custom_id"] for line in lines] == ["menu-0", "menu-1"]
+    assert lines[0]["url"] == "/v1/chat/completions" and lines[0]["body"]["model"] == mr.MODEL
+    assert backend.poll(batch_id) == ("completed", {"completed": 1, "failed": 1, "total": 2})
+    assert backend.results(batch_id) == {"menu-0": ("Taco,$7,Good", None), "menu-1": (None, "too long"),
+                                         "menu-2": (None, "reply cut short (finish_reason='length')")}
+    assert backend.usage["menu-0"] == {"prompt_tokens": 9, "completion_tokens": 3}
+
+def test_run_batch_sends_one_request_per_chunk_and_merges(tmp_path, monkeypatch):
+    """Test: a large snapshot becomes several batch requests whose rows are merged into one CSV."""
+    monkeypatch.setattr(mb.time, "sleep", lambda _: None)
+    monkeypatch.setattr(mr, "CHUNK_LINES", 3)
+    monkeypatch.setattr(mr, "CHUNK_OVERLAP", 0)
+    backend = mb.LocalBatchBackend(_dish)
+    mb.run_batch([("Taco\nsoft\nshell\nRamen\nbroth", str(tmp_path / "a"))], backend, prune=False)
+    (batch,) = backend.batches.values()
+    assert [r["custom_id"] for r in batch["requests"]] == ["menu-0-0", "menu-0-1"]
+    assert (tmp_path / "a").read_text(encoding="utf-8").splitlines() == ["Taco,$7,Good", "Ramen,$7,Good"]
+
+def test_run_batch_leaves_out_jobs_beyond_the_token_budget(tmp_path, monkeypatch):
+    """Test: only snapshots whose estimated prompt tokens fit the budget are submitted; answers are logged."""
+    monkeypatch.setattr(mb.time, "sleep", lambda _: None)
+    one = rate_limiter.estimate_tokens(mr.build_prompt("Taco"))
+    llm_usage.set_budget(one + 10)
+    backend = mb.LocalBatchBackend(_dish)
+    jobs = [("Taco", str(tmp_path / "a")), ("Soup", str(tmp_path / "b"))]
+    failures, _ = mb.run_batch(jobs, backend, prune=False)
+    assert failures == {str(tmp_path / "b"): "token budget reached"}
+    assert len(backend.batches["batch_local_1"]["requests"]) == 1
+    top = llm_usage.get_log().summary(llm_usage.run_id())["top"]
+    assert [(label, calls) for label, calls, *_ in top] == [("a", 1)]
@@ -0,0 +1,57 @@
+
+import menu_parser as mp  # module under test
+
+PAGE = """Home
+Order Online
+Appetizers
+Spring Rolls ........ $5.99
+Crispy vegetable rolls served with sweet chili sauce
+Chicken Satay $8.50
+Edamame 4.99
+Entrees
+Pad Thai
+$12.99
+Rice noodles with egg, peanuts and bean sprouts
+Green Curry 13.50
+Drinks
+Thai Iced Tea $3.99
+Coke $1.99
+Desserts
+Mango Sticky Rice $6.99
+© 2024 Thai Place. All rights reserved."""
+
+def test_parse_menu_reads_inline_and_split_items_with_descriptions():
+    """Test: both layouts are parsed, descriptions attached and drinks dropped."""
+    result = mp.parse_menu(PAGE)
+    assert result.rows == [
+        ["Spring Rolls", "$5.99", "Crispy vegetable rolls served with sweet chili sauce"],
+        ["Chicken Satay", "$8.50", ""],
+        ["Edamame", "4.99", ""],
+        ["Pad Thai", "$12.99", "Rice noodles with egg, peanuts and bean sprouts"],
+        ["Green Curry", "13.50", ""],
+        ["Mango Sticky Rice", "$6.99", ""],
+    ]
+    assert result.priced_lines == 8 and result.confidence == 1.0
+    assert mp.confident_rows(PAGE) == result.rows
+
+def test_confidence_drops_for_prices_the_rules_cannot_read():
+    """Test: multi-price and prose lines lower the confidence below the threshold."""
+    messy = PAGE + "\n" + "\n".join(
+        f"Combo {i}: Small $7.99 / Large $9.99 served with rice." for i in range(4))
+    result = mp.parse_menu(messy)
+    assert result.confidence == 8 / 12
+    assert mp.confident_rows(messy) is None
+    assert mp.confident_rows(messy, threshold=0.5) == result.rows
+
+def test_too_few_items_is_never_confident():
+    """Test: a page with fewer than MIN_ITEMS items goes to the LLM."""
+    result = mp.parse_menu("Burger $9.99\nFries $3.99")
+    assert result.confidence == 0.0 and len(result.rows) == 2
+    assert mp.confident_rows("Burger $9.99\nFries $3.99") is None
+
+def test_dishes_named_after_drinks_are_kept():
+    """Test: only items named as nothing but a drink are dropped outside a drinks section."""
+    page = "\n".join(["Beer-Battered Fish $14.99", "Red Wine Braised Short Rib $24.00", "Coffee-Rubbed Steak $26.50",
+                      "Sake Salmon $18.00", "Large Coke $2.50", "Fresh Lemonade $3.50", "Fries $3.99"])
+    assert [row[0] for row in mp.confident_rows(page)] == [
+        "Beer-Battered Fish", "Red Wine Braised Short Rib", "Coffee-Rubbed Steak", "Sake Salmon", "Fries"]
@@ -0,0 +1,38 @@
+
+import menu_pruner as mp  # module under test
+
+NAV = ["Home", "About Us", "Order Online", "Sign In", "Gift Cards",
+       "Welcome! We have been serving the Triangle since 1998 with recipes passed down through "
+       "generations of our family, and we look forward to seeing you and your friends very soon."]
+FOOTER = ["Reviews", "Follow us", "Subscribe to our newsletter", "Privacy Policy",
+          "© 2024 All rights reserved", "This site uses cookies to improve your experience."]
+MENU = ["Appetizers", "Spring Rolls", "$5.99", "Crispy vegetable rolls",
+        "Pad Thai", "$12.99", "Rice noodles, egg, peanuts", "Green Curry 13.50",
+        "Coconut curry with basil", "Mango Sticky Rice", "$6", "Sweet rice with mango"]
+
+def test_prune_keeps_menu_and_drops_boilerplate():
+    """Test: every menu line survives while navigation and footer lines are dropped."""
+    result = mp.prune_menu_text("\n".join(NAV + MENU + FOOTER))
+    kept = result.text.splitlines()
+    assert all(line in kept for line in MENU)
+    assert not any(line in kept for line in NAV[:2] + FOOTER[2:])
+    assert result.original_lines == len(NAV + MENU + FOOTER)
+    assert result.kept_lines == len(kept) and result.ratio < 1.0
+
+def test_pages_without_enough_prices_are_unchanged():
+    """Test: with too few priced lines there is no reliable signal, so nothing is pruned."""
+    text = "\n".join(NAV + ["Pad Thai", "Rice noodles"] + FOOTER)
+    result = mp.prune_menu_text(text)
+    assert result.text == text and result.ratio == 1.0
+
+def test_line_shape_groups_similar_entries():
+    """Test: entries built the same way share a shape regardless of word count."""
+    assert mp.line_shape("Pad Thai $9.99") == mp.line_shape("Green Curry Chicken $12.99")
+    assert mp.line_shape("Pad Thai $9.99") != mp.line_shape("Open 11:00 - 22:00")
+
+def test_prune_for_llm_reports_ratio(capsys):
+    """Test: the helper prints kept/total lines for the page."""
+    text = mp.prune_for_llm("\n".join(NAV + MENU + FOOTER), "Thai Place")
+    out = capsys.readouterr().out
+    assert "Thai Place" in out and f"/{len(NAV + MENU + FOOTER)} lines" in out
+    assert "Pad Thai" in text
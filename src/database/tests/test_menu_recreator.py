@@ -1,6 +1,15 @@
 
+import asyncio
 import csv
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import openai
+import pytest
 import menu_recreator as mr
+import response_cache
+import llm_usage
 
 class _ChoiceMsg:
     def __init__(self, content):
@@ -48,3 +57,187 @@ def test_recreate_menu_skips_section_rows_case_insensitive(tmp_path, monkeypatch
     mr.recreate_menu("ignored", str(out))
     rows = list(csv.reader(out.read_text(encoding="utf-8").splitlines()))
     assert rows == [["Soup", "$4", "Hot"]]
+
+def test_clean_menu_rows_drops_headers_and_pads_cells():
+    """Test: header rows are dropped and short rows padded to three cells."""
+    rows = mr.clean_menu_rows("Dish,Price,Description\r\nTaco,$3\r\n")
+    assert rows == [["Taco", "$3", ""]]
+
+def test_recreate_menu_prunes_before_prompting(tmp_path, monkeypatch):
+    """Test: only the detected menu region reaches the prompt unless pruning is disabled."""
+    boilerplate = ["Privacy Policy", "Sign In", "Follow us", "Subscribe", "Reviews", "Log in"] * 2
+    page = "\n".join(boilerplate + [f"Dish {i}\n${i}.99" for i in range(5)] + boilerplate)
+    prompts = []
+    monkeypatch.setattr(mr, "request_menu_csv", lambda text: prompts.append(text) or "A,$1,B")
+    mr.recreate_menu(page, str(tmp_path / "menu.csv"), fast_path=False)
+    mr.recreate_menu(page, str(tmp_path / "menu2.csv"), prune=False, fast_path=False)
+    assert "Privacy Policy" not in prompts[0] and "Dish 4" in prompts[0]
+    assert prompts[1] == page
+
+def test_request_menu_csv_is_cached_by_text_prompt_version_and_model(monkeypatch):
+    """Test: the same text is sent once; a new prompt version or model misses the cache."""
+    calls = []
+    monkeypatch.setattr(mr.client.chat.completions, "create", lambda **kw: calls.append(kw["model"]) or _Resp("A,$1,B"))
+    assert mr.request_menu_csv("Pad Thai $9") == "A,$1,B"
+    assert mr.request_menu_csv("Pad Thai $9") == "A,$1,B"
+    assert len(calls) == 1
+    mr.request_menu_csv("pad thai $9")
+    monkeypatch.setattr(mr, "PROMPT_VERSION", mr.PROMPT_VERSION + 1)
+    mr.request_menu_csv("Pad Thai $9")
+    monkeypatch.setattr(mr, "MODEL", "other-model")
+    mr.request_menu_csv("Pad Thai $9")
+    assert calls == ["gpt-5-mini"] * 3 + ["other-model"]
+    stats = response_cache.get_cache().stats()["llm"]
+    assert stats["hits"] == 1 and stats["misses"] == 4
+
+def test_request_menu_csv_does_not_cache_empty_or_truncated_replies(monkeypatch):
+    """Test: an empty reply or one stopped at the token limit raises and is asked for again."""
+    truncated = _Resp("A,$1,B\nC,$2")
+    truncated.choices[0].finish_reason = "length"
+    replies = [_Resp(""), truncated, _Resp("A,$1,B\nC,$2,D")]
+    monkeypatch.setattr(mr.client.chat.completions, "create", lambda **_: replies.pop(0))
+    with pytest.raises(mr.IncompleteReply, match="empty"):
+        mr.request_menu_csv("Pad Thai $9")
+    with pytest.raises(mr.IncompleteReply, match="length"):
+        mr.request_menu_csv("Pad Thai $9")
+    assert mr.request_menu_csv("Pad Thai $9") == "A,$1,B\nC,$2,D"
+    assert mr.request_menu_csv("Pad Thai $9") == "A,$1,B\nC,$2,D" and replies == []
+    assert llm_usage.get_log().summary(llm_usage.run_id())["calls"] == 3
+
+@pytest.fixture
+def fake_chat_server():
+    """Local stand-in for the chat-completions endpoint; prompts containing SLOW stall for 1s."""
+    state = {"active": 0, "peak": 0, "lock": threading.Lock()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["messages"][-1]["content"]
+            with state["lock"]:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(1 if "SLOW" in prompt else 0.2)
+            with state["lock"]:
+                state["active"] -= 1
+            dish = prompt.split("INPUT TEXT:")[1].split()[0]
+            payload = json.dumps({
+                "id": "c", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"{dish},$5,Tasty"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except OSError:
+                pass  # the client cancelled the request
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = False  # server_close() waits for stalled handlers
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}/v1"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+def test_recreate_menus_runs_concurrently_against_local_server(tmp_path, fake_chat_server):
+    """Test: jobs share one async client, stay within the concurrency limit and all write CSVs."""
+    api = openai.AsyncOpenAI(api_key="test", base_url=fake_chat_server["url"], max_retries=0)
+    jobs = [(f"Taco{i}", str(tmp_path / f"m{i}.csv")) for i in range(6)]
+    results = []
+    start = time.perf_counter()
+    failures, stats = mr.recreate_menus(jobs, concurrency=3, prune=False, async_client=api,
+                                        on_result=lambda out, err: results.append((out, err)))
+    elapsed = time.perf_counter() - start
+    assert failures == {} and stats.items == 6 and len(results) == 6
+    assert fake_chat_server["peak"] == 3
+    assert elapsed < 6 * 0.2
+    for i in range(6):
+        assert (tmp_path / f"m{i}.csv").read_text(encoding="utf-8").strip() == f"Taco{i},$5,Tasty"
+
+def test_recreate_menus_cancels_requests_past_the_timeout(tmp_path, fake_chat_server):
+    """Test: a stalled request is cancelled and recorded; the other job still completes."""
+    api = openai.AsyncOpenAI(api_key="test", base_url=fake_chat_server["url"], max_retries=0)
+    jobs = [("SLOW", str(tmp_path / "slow.csv")), ("Quick", str(tmp_path / "quick.csv"))]
+    start = time.perf_counter()
+    failures, _ = mr.recreate_menus(jobs, concurrency=2, prune=False, timeout=0.3, async_client=api)
+    assert time.perf_counter() - start < 0.9
+    assert failures == {str(tmp_path / "slow.csv"): "timed out after 0.3s"}
+    assert not (tmp_path / "slow.csv").exists()
+    assert (tmp_path / "quick.csv").exists()
+
+def test_chunk_text_splits_on_lines_with_overlap():
+    """Test: chunks respect the line and character limits and share `overlap` lines."""
+    text = "\n".join(f"Item {i} ${i}.99" for i in range(25))
+    assert mr.chunk_text(text) == [text]
+    chunks = mr.chunk_text(text, max_lines=10, overlap=2)
+    assert [c.splitlines()[0] for c in chunks] == ["Item 0 $0.99", "Item 8 $8.99", "Item 16 $16.99"]
+    assert all(len(c.splitlines()) <= 10 for c in chunks) and chunks[-1].endswith("Item 24 $24.99")
+    assert all(len(c) < 40 for c in mr.chunk_text(text, max_chars=40, overlap=0))
+
+def test_request_menu_rows_extracts_chunks_in_parallel_and_dedupes(monkeypatch):
+    """Test: large snapshots are map-reduced; overlapping dishes appear once, described rows win."""
+    monkeypatch.setattr(mr, "CHUNK_LINES", 4)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    def fake_csv(chunk):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return "\n".join(f"{line.split(' $')[0]}, ${line.split(' $')[1]}," for line in chunk.splitlines())
+    monkeypatch.setattr(mr, "request_menu_csv", fake_csv)
+    text = "\n".join(f"Noodle {i} ${i}.50" for i in range(12))
+    rows = mr.request_menu_rows(text)
+    assert [r[0] for r in rows] == [f"Noodle {i}" for i in range(12)]
+    assert peak[0] > 1
+    merged = mr.merge_rows([[["Pad Thai", "$9.99", ""]], [["pad  thai", "9.99", "Rice noodles"], ["Pad Thai", "$11.99", ""]]])
+    assert merged == [["pad  thai", "9.99", "Rice noodles"], ["Pad Thai", "$11.99", ""]]
+
+def test_request_menu_rows_async_bounds_chunks_in_flight(monkeypatch):
+    """Test: an async map-reduce over many chunks keeps at most `workers` requests in flight."""
+    monkeypatch.setattr(mr, "CHUNK_LINES", 2)
+    active, peak = [0], [0]
+    async def fake_csv(chunk, client, timeout):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return "\n".join(f"{line.split(' $')[0]}, ${line.split(' $')[1]}," for line in chunk.splitlines())
+    monkeypatch.setattr(mr, "request_menu_csv_async", fake_csv)
+    text = "\n".join(f"Noodle {i} ${i}.50" for i in range(40))
+    rows = asyncio.run(mr.request_menu_rows_async(text, None, workers=3))
+    assert [r[0] for r in rows] == [f"Noodle {i}" for i in range(40)]
+    assert peak[0] == 3
+
+def test_recreate_menu_takes_the_rule_based_fast_path_when_confident(tmp_path, monkeypatch):
+    """Test: a cleanly laid-out menu is written without an LLM call; a messy one falls back."""
+    prompts = []
+    monkeypatch.setattr(mr, "request_menu_csv", lambda text: prompts.append(text) or "Soup,$4,Hot")
+    clean = "\n".join(f"Curry {i} ........ ${i}.99" for i in range(1, 7))
+    assert mr.recreate_menu(clean, str(tmp_path / "a.csv")) == "rules"
+    assert prompts == []
+    rows = list(csv.reader((tmp_path / "a.csv").read_text(encoding="utf-8").splitlines()))
+    assert rows[0] == ["Curry 1", "$1.99", ""] and len(rows) == 6
+    messy = "Lunch specials $8.99 or $10.99 with soup, weekdays only until 3pm."
+    assert mr.recreate_menu(messy, str(tmp_path / "b.csv")) == "llm"
+    assert len(prompts) == 1
+
+def test_recreate_menus_records_usage_and_stops_at_the_token_budget(tmp_path, fake_chat_server):
+    """Test: each call's usage is logged under its CSV name; jobs after the budget is spent make no call."""
+    api = openai.AsyncOpenAI(api_key="test", base_url=fake_chat_server["url"], max_retries=0)
+    llm_usage.set_budget(30)
+    jobs = [(f"Taco{i}", str(tmp_path / f"m{i}.csv")) for i in range(4)]
+    failures, _ = mr.recreate_menus(jobs, concurrency=1, prune=False, async_client=api)
+    assert failures == {str(tmp_path / f"m{i}.csv"): "token budget reached (30 tokens used)" for i in (2, 3)}
+    summary = llm_usage.get_log().summary(llm_usage.run_id())
+    assert summary["calls"] == 2 and summary["prompt_tokens"] == 20 and summary["completion_tokens"] == 10
+    assert sorted(label for label, *_ in summary["top"]) == ["m0.csv", "m1.csv"]
@@ -0,0 +1,168 @@
+
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import menu_stream as ms  # module under test
+import response_cache
+import sqlite_connection
+
+ITEMS = [
+    {"dish": "Pad Thai", "price": "$12.99", "description": "Rice noodles {with} \"peanuts\""},
+    {"dish": "Green Curry", "price": "13.50", "description": "Coconut curry, basil"},
+    {"dish": "  ", "price": "1.00", "description": "no name"},
+    {"dish": "Mango Sticky Rice", "price": "$6.99", "description": "Sweet rice"},
+]
+REPLY = json.dumps({"items": ITEMS})
+
+
+class FakeStreamClient:
+    """Chat client whose `create` streams REPLY in small deltas and records each delta served."""
+
+    def __init__(self, reply=REPLY, step=7, finish_reason="stop"):
+        self.reply, self.step, self.finish_reason = reply, step, finish_reason
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        self.served = 0
+        def chunks():
+            for i in range(0, len(self.reply), self.step):
+                self.served += 1
+                delta = SimpleNamespace(content=self.reply[i:i + self.step])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+            if self.finish_reason is not None:
+                end = SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=self.finish_reason)
+                yield SimpleNamespace(choices=[end], usage=None)
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=50))
+        return chunks()
+
+def test_row_stream_parser_emits_items_across_any_chunking():
+    """Test: items come out whole regardless of how deltas split braces and escapes."""
+    for step in (1, 3, 16, len(REPLY)):
+        parser = ms.RowStreamParser()
+        items = []
+        for i in range(0, len(REPLY), step):
+            items.extend(parser.feed(REPLY[i:i + step]))
+        assert items == ITEMS
+
+def test_validate_row_rejects_malformed_items():
+    """Test: non-objects, missing dish names and non-string cells are dropped."""
+    assert ms.validate_row({"dish": " Taco ", "price": None, "description": "x"}) == ["Taco", "", "x"]
+    assert ms.validate_row({"dish": "", "price": "1", "description": ""}) is None
+    assert ms.validate_row({"dish": 3, "price": "1", "description": ""}) is None
+    assert ms.validate_row(["Taco", "1", ""]) is None
+
+def test_stream_menu_to_db_commits_first_row_before_stream_ends(tmp_path, monkeypatch):
+    """Test: the first row is visible to another connection mid-stream, and replies are cached."""
+    db = str(tmp_path / "menu.db")
+    conn = sqlite_connection.connect_db(db)
+    sqlite_connection.create_table(conn)
+    client = FakeStreamClient()
+    monkeypatch.setattr(ms.menu_recreator, "client", client)
+
+    reader = sqlite3.connect(db)
+    seen_mid_stream = []
+
+    def watched(rows):
+        for row in rows:
+            yield row
+            count = reader.execute("SELECT COUNT(*) FROM local_menu").fetchone()[0]
+            seen_mid_stream.append((count, client.served))
+
+    inserted = ms.stream_menu_to_db(conn, "Thai menu", "Thai Place", watched(ms.stream_menu_rows("Thai menu")))
+    assert [r[0] for r in inserted] == ["Pad Thai", "Green Curry", "Mango Sticky Rice"]
+    assert seen_mid_stream[0][0] == 1 and seen_mid_stream[0][1] < client.served
+    assert reader.execute("SELECT COUNT(*) FROM local_menu WHERE restaurant = 'Thai Place'").fetchone()[0] == 3
+    assert client.calls[-1]["response_format"]["json_schema"]["strict"] is True
+
+    calls = len(client.calls)
+    assert list(ms.stream_menu_rows("Thai menu")) == inserted
+    assert len(client.calls) == calls
+    reader.close()
+    conn.close()
+
+def test_stream_menu_to_db_skips_duplicates_from_overlapping_chunks(tmp_path, monkeypatch):
+    """Test: dishes repeated in the chunk overlap are inserted once; a rerun replaces the menu."""
+    conn = sqlite_connection.connect_db(str(tmp_path / "menu.db"))
+    sqlite_connection.create_table(conn)
+    monkeypatch.setattr(ms.menu_recreator, "chunk_text", lambda text: ["part one", "part two"])
+    monkeypatch.setattr(ms.menu_recreator, "client", FakeStreamClient())
+    inserted = ms.stream_menu_to_db(conn, "long menu", "Thai Place")
+    assert len(inserted) == 3
+    assert conn.execute("SELECT COUNT(*) FROM local_menu").fetchone()[0] == 3
+    ms.stream_menu_to_db(conn, "long menu", "Thai Place", rows=[["Pad Thai", "$13.99", "New price"]])
+    assert conn.execute("SELECT name, price FROM local_menu").fetchall() == [("Pad Thai", "$13.99")]
+    conn.close()
+
+def test_concurrent_streams_do_not_lock_each_other_out(tmp_path):
+    """Test: workers streaming slow replies on their own connections never hold the write lock while waiting."""
+    import threading, time
+    db = str(tmp_path / "menu.db")
+    setup = sqlite_connection.connect_db(db)
+    sqlite_connection.create_table(setup)
+    setup.close()
+    errors = []
+
+    def slow_rows(prefix):
+        for i in range(3):
+            time.sleep(0.3)  # waiting on the model
+            yield [f"{prefix} {i}", "$1", "Dish"]
+
+    def worker(restaurant):
+        conn = sqlite3.connect(db, timeout=0.1)
+        try:
+            ms.stream_menu_to_db(conn, "", restaurant, slow_rows(restaurant))
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("A", "B")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    reader = sqlite3.connect(db)
+    assert reader.execute("SELECT COUNT(*) FROM local_menu").fetchone()[0] == 6
+    reader.close()
+
+@pytest.mark.parametrize("client", [
+    FakeStreamClient(reply=REPLY[:REPLY.index("Green Curry") + 60], finish_reason="length"),
+    FakeStreamClient(reply=REPLY[:REPLY.index("Mango")], finish_reason=None),
+    FakeStreamClient(reply=REPLY, finish_reason="content_filter"),
+], ids=["length", "dropped", "content_filter"])
+def test_truncated_stream_is_not_cached_and_does_not_prune(tmp_path, monkeypatch, client):
+    """Test: a stream cut short raises, keeps the stored menu and is requested again next time."""
+    conn = sqlite_connection.connect_db(str(tmp_path / "menu.db"))
+    sqlite_connection.create_table(conn)
+    sqlite_connection.insert_rows(conn, [("Tom Yum", "$8", "Soup"), ("Larb", "$10", "Salad")], "Thai Place")
+    conn.commit()
+    monkeypatch.setattr(ms.menu_recreator, "client", client)
+    with pytest.raises(ms.menu_recreator.IncompleteReply):
+        ms.stream_menu_to_db(conn, "Thai menu", "Thai Place")
+    names = {name for (name,) in conn.execute("SELECT name FROM local_menu WHERE restaurant = 'Thai Place'")}
+    assert {"Tom Yum", "Larb", "Pad Thai"} <= names
+    assert response_cache.get_cache().get("llm", response_cache.request_key(
+        "llm", ms._json_cache_request("Thai menu"))) == (False, None)
+    with pytest.raises(ms.menu_recreator.IncompleteReply):
+        list(ms.stream_menu_rows("Thai menu"))
+    assert len(client.calls) == 2
+    conn.close()
+
+def test_empty_stream_or_rows_leave_the_stored_menu(tmp_path, monkeypatch):
+    """Test: a finished reply with no items raises, and an empty row list prunes nothing."""
+    conn = sqlite_connection.connect_db(str(tmp_path / "menu.db"))
+    sqlite_connection.create_table(conn)
+    sqlite_connection.insert_rows(conn, [("Tom Yum", "$8", "Soup")], "Thai Place")
+    conn.commit()
+    monkeypatch.setattr(ms.menu_recreator, "client", FakeStreamClient(reply='{"items": []}'))
+    with pytest.raises(ms.menu_recreator.IncompleteReply, match="no menu rows"):
+        ms.stream_menu_to_db(conn, "Thai menu", "Thai Place")
+    assert ms.stream_menu_to_db(conn, "Thai menu", "Thai Place", rows=[]) == []
+    assert conn.execute("SELECT name FROM local_menu").fetchall() == [("Tom Yum",)]
+    conn.close()
@@ -0,0 +1,45 @@
+
+from multiprocessing import shared_memory
+import pytest
+import html_tools as ht
+import parse_pool as pp  # module under test
+import snapshot_store
+
+def _page(n, extra=""):
+    return ("<html><body>" + extra + "".join(f"<p>Dish {i} $9.99</p>" for i in range(n)) + "</body></html>")
+
+def test_pool_writes_snapshots_matching_inline_extraction(tmp_path):
+    """Test: workers decode shared-memory bodies and write the same snapshot as html_to_lines."""
+    pages = {f"r{i}": _page(150 + i, "<script>x()</script>caf&eacute;") for i in range(4)}
+    with pp.ParsePool(2) as pool:
+        futures = {name: pool.submit(html.encode("utf-8"), "utf-8", tmp_path / f"{name}.txt")
+                   for name, html in pages.items()}
+        results = {name: f.result(timeout=60) for name, f in futures.items()}
+    for name, html in pages.items():
+        assert results[name] == ("saved", str(tmp_path / f"{name}.txt"))
+        assert (tmp_path / f"{name}.txt").read_text(encoding="utf-8") == "\n".join(ht.html_to_lines(html))
+
+def test_pool_skips_short_pages_and_releases_shared_memory(tmp_path, monkeypatch):
+    """Test: pages outside the line limits are not written and their shared block is unlinked."""
+    names = []
+    real_shm = shared_memory.SharedMemory
+    def tracking(*args, **kwargs):
+        shm = real_shm(*args, **kwargs)
+        names.append(shm.name)
+        return shm
+    monkeypatch.setattr(pp.shared_memory, "SharedMemory", tracking)
+    with pp.ParsePool(1) as pool:
+        future = pool.submit(_page(3).encode("latin-1"), "no-such-codec", tmp_path / "short.txt")
+        assert future.result(timeout=60)[0] == "skipped"
+    assert not (tmp_path / "short.txt").exists()
+    with pytest.raises(FileNotFoundError):
+        real_shm(name=names[0])
+
+def test_pool_stores_snapshots_through_a_store_sink(tmp_path):
+    """Test: a StoreSink output sends each worker's snapshot to the snapshot store."""
+    db = str(tmp_path / "s.db")
+    html = _page(150)
+    with pp.ParsePool(1) as pool:
+        status, _ = pool.submit(html.encode("utf-8"), "utf-8", snapshot_store.StoreSink(db, "R")).result(timeout=60)
+    assert status == "saved"
+    assert snapshot_store.SnapshotStore(db).latest("R") == "\n".join(ht.html_to_lines(html))
@@ -0,0 +1,101 @@
+
+import asyncio
+import pytest
+import rate_limiter as rl
+
+class _Resp:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record requested sleeps instead of actually sleeping."""
+    calls = []
+    monkeypatch.setattr(rl.time, "sleep", calls.append)
+    return calls
+
+def test_token_bucket_reserve_waits_for_deficit():
+    """Test: reserving beyond the level returns the time needed to refill."""
+    bucket = rl.TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve(2) == 0.0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.02)
+
+def test_send_retries_on_429_and_honors_retry_after(sleeps):
+    """Test: a 429 response is retried after the server's Retry-After delay."""
+    responses = [_Resp(429, {"Retry-After": "7"}), _Resp(200)]
+    result = rl.send("customsearch", lambda: responses.pop(0))
+    assert result.status_code == 200
+    assert any(s == pytest.approx(7, abs=0.1) for s in sleeps)
+    assert rl.get_limiter("customsearch").throttled_count == 1
+
+def test_send_retries_on_429_exception(sleeps):
+    """Test: exceptions carrying a 429 response (e.g., openai.RateLimitError) are retried."""
+    class RateLimited(Exception):
+        response = _Resp(429, {"retry-after": "1"})
+    calls = []
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RateLimited()
+        return "ok"
+    assert rl.send("openai", func, tokens=10) == "ok"
+    assert len(calls) == 2
+
+def test_send_async_retries_on_429_exception(sleeps):
+    """Test: the async variant shares the limiter and retries a throttled coroutine."""
+    class RateLimited(Exception):
+        response = _Resp(429, {"retry-after": "3"})
+    calls = []
+    async def func(value):
+        calls.append(value)
+        if len(calls) == 1:
+            raise RateLimited()
+        return value
+    assert asyncio.run(rl.send_async("openai", func, "ok", tokens=10)) == "ok"
+    assert calls == ["ok", "ok"]
+    assert rl.get_limiter("openai").throttled_count == 1
+    assert any(s == pytest.approx(3, abs=0.1) for s in sleeps)
+
+def test_send_gives_up_after_max_retries(sleeps):
+    """Test: persistent throttling returns the last 429 so callers can handle it."""
+    result = rl.send("places", lambda: _Resp(429), max_retries=2)
+    assert result.status_code == 429
+    assert rl.get_limiter("places").throttled_count == 2
+
+def test_send_does_not_retry_other_errors(sleeps):
+    """Test: non-429 exceptions propagate immediately."""
+    with pytest.raises(ValueError):
+        rl.send("places", lambda: (_ for _ in ()).throw(ValueError("x")))
+
+def test_throttle_halves_rate_and_success_recovers():
+    """Test: AIMD — 429 halves the effective rate, successes step it back up."""
+    limiter = rl.EndpointLimiter("x", requests_per_minute=60)
+    limiter.throttled(retry_after=0)
+    assert limiter.scale == 0.5 and limiter.requests.rate == pytest.approx(0.5)
+    limiter.succeeded()
+    assert limiter.scale == pytest.approx(0.6)
+
+def test_env_override_sets_request_and_token_budget(monkeypatch):
+    """Test: RATE_LIMIT_<ENDPOINT> overrides the default budgets."""
+    monkeypatch.setenv("RATE_LIMIT_OPENAI", "120/6000")
+    limiter = rl.get_limiter("openai")
+    assert limiter.requests_per_minute == 120 and limiter.tokens_per_minute == 6000
+    assert rl.get_limiter("openai") is limiter
+
+@pytest.mark.parametrize("value", ["0", "-5", "60/0", "60/-1", "fast", "60/100/5", "nan"])
+def test_env_override_rejects_non_positive_or_malformed_budgets(monkeypatch, value):
+    """Test: a bad RATE_LIMIT_<ENDPOINT> fails with a clear error instead of dividing by zero."""
+    monkeypatch.setenv("RATE_LIMIT_OPENAI", value)
+    with pytest.raises(ValueError, match="RATE_LIMIT_OPENAI"):
+        rl.get_limiter("openai")
+    assert "openai" not in rl._registry
+
+def test_retry_after_parses_http_date():
+    """Test: HTTP-date Retry-After values are converted to seconds."""
+    assert rl.retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert rl.retry_after_seconds({}) is None
+
+def test_host_endpoint_groups_by_host():
+    """Test: fetches to the same site share one limiter."""
+    assert rl.host_endpoint("https://Example.com/menu") == rl.host_endpoint("https://example.com/x")
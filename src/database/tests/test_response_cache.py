@@ -0,0 +1,86 @@
+
+import time
+import response_cache as rc
+
+def test_request_key_ignores_api_keys_case_and_whitespace():
+    """Test: the key is built from the normalized request without secrets."""
+    a = rc.request_key("places", {"params": {"q": "Pad  Thai", "key": "K1"}})
+    b = rc.request_key("places", {"params": {"key": "K2", "q": " pad thai"}})
+    c = rc.request_key("customsearch", {"params": {"q": "pad thai"}})
+    assert a == b and a != c
+
+def test_request_key_keeps_opaque_values_and_nested_key_fields():
+    """Test: only query text is folded, and only top-level or header/param secrets are dropped."""
+    def key(token):
+        return rc.request_key("places", {"body": {"textQuery": "Thai", "pageToken": token}})
+    assert key("AbC 1") != key("abc 1") and key("AbC 1") != key("AbC  1")
+    assert key("t") == rc.request_key("places", {"body": {"textQuery": " THAI ", "pageToken": "t"}})
+    assert rc.request_key("places", {"key": "K1", "headers": {"X-Goog-Api-Key": "K1"}, "q": "a"}) \
+        == rc.request_key("places", {"key": "K2", "headers": {"X-Goog-Api-Key": "K2"}, "q": "a"})
+    assert rc.request_key("llm", {"body": {"key": "dish"}}) != rc.request_key("llm", {"body": {"key": "price"}})
+
+def test_cached_calls_fetch_once_and_counts_hits(tmp_path):
+    """Test: a repeated request is served from disk and counted as a hit."""
+    calls = []
+    def fetch():
+        calls.append(1)
+        return {"link": "http://x"}
+    assert rc.cached("customsearch", {"q": "a"}, fetch) == {"link": "http://x"}
+    assert rc.cached("customsearch", {"q": "a"}, fetch) == {"link": "http://x"}
+    assert len(calls) == 1
+    stats = rc.get_cache().stats()["customsearch"]
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+
+def test_negative_results_are_cached():
+    """Test: a lookup that found nothing (None) is not repeated."""
+    calls = []
+    def fetch():
+        calls.append(1)
+        return None
+    assert rc.cached("places", {"q": "nothing"}, fetch) is None
+    assert rc.cached("places", {"q": "nothing"}, fetch) is None
+    assert len(calls) == 1
+
+def test_exceptions_are_not_cached():
+    """Test: transient failures are retried on the next call."""
+    calls = []
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("500")
+        return "ok"
+    try:
+        rc.cached("places", {"q": "x"}, fetch)
+    except RuntimeError:
+        pass
+    assert rc.cached("places", {"q": "x"}, fetch) == "ok"
+
+def test_expired_entries_are_refetched(tmp_path):
+    """Test: entries past their TTL count as misses."""
+    cache = rc.ResponseCache(str(tmp_path / "c.db"), ttls={"places": 0.05})
+    key = rc.request_key("places", {"q": "x"})
+    cache.set("places", key, [1])
+    assert cache.get("places", key) == (True, [1])
+    time.sleep(0.1)
+    assert cache.get("places", key) == (False, None)
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    """Test: beyond max_bytes the least-recently-used entries are dropped first."""
+    cache = rc.ResponseCache(str(tmp_path / "c.db"), max_bytes=400)
+    keys = [rc.request_key("places", {"n": i}) for i in range(3)]
+    cache.set("places", keys[0], "a" * 100)
+    cache.set("places", keys[1], "b" * 100)
+    cache.get("places", keys[0])  # touch 0 so 1 is the LRU entry
+    cache.set("places", keys[2], "c" * 100)
+    assert cache.get("places", keys[0])[0]
+    assert not cache.get("places", keys[1])[0]
+    assert cache.get("places", keys[2])[0]
+
+def test_cache_can_be_disabled(monkeypatch):
+    """Test: HTTP_CACHE_PATH=off bypasses the cache."""
+    monkeypatch.setenv("HTTP_CACHE_PATH", "off")
+    rc.reset()
+    calls = []
+    rc.cached("places", {"q": "x"}, lambda: calls.append(1))
+    rc.cached("places", {"q": "x"}, lambda: calls.append(1))
+    assert len(calls) == 2
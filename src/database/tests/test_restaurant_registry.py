@@ -0,0 +1,44 @@
+
+import sqlite3
+import restaurant_registry as rr  # module under test
+
+def _conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "r.db"))
+    rr.create_registry_tables(conn)
+    return conn
+
+def _place(pid, name, cuisines, address="1 Main St"):
+    return {"place_id": pid, "name": name, "address": address, "cuisines": set(cuisines)}
+
+def test_create_registry_tables_indexes_lookup_columns(tmp_path):
+    """Test: the registry tables exist with an index on every lookup column."""
+    conn = _conn(tmp_path)
+    rr.create_registry_tables(conn)  # idempotent
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_registry_name", "idx_registry_address", "idx_registry_location",
+            "idx_registry_url", "idx_cuisines_cuisine"} <= indexes
+
+def test_upsert_places_dedupes_on_place_id_and_merges_cuisines(tmp_path):
+    """Test: re-registering a place updates it in place and adds cuisine tags."""
+    conn = _conn(tmp_path)
+    assert rr.upsert_places(conn, [_place("p1", "A", ["Thai"]), _place("p2", "B", ["Thai"])], "Raleigh") == 2
+    rr.upsert_places(conn, [_place("p1", "A", ["Asian"], address="2 Oak St")], "Raleigh")
+    assert conn.execute("SELECT COUNT(*) FROM restaurant_registry").fetchone()[0] == 2
+    assert conn.execute("SELECT address FROM restaurant_registry WHERE place_id = 'p1'").fetchone()[0] == "2 Oak St"
+    assert [r[1] for r in rr.places_for_cuisine(conn, "Thai")] == ["A", "B"]
+    assert [r[1] for r in rr.places_for_cuisine(conn, "Asian")] == ["A"]
+
+def test_restaurant_names_are_distinct_in_discovery_order(tmp_path):
+    """Test: chain locations sharing a name are listed once, in the order found."""
+    conn = _conn(tmp_path)
+    rr.upsert_places(conn, [_place("p2", "Zeta", []), _place("p1", "Alpha", []),
+                            _place("p3", "Zeta", [], address="9 Elm St")], "Raleigh")
+    assert rr.restaurant_names(conn) == ["Zeta", "Alpha"]
+
+def test_set_urls_survives_later_upserts(tmp_path):
+    """Test: resolved URLs are stored per name and not cleared by a new search."""
+    conn = _conn(tmp_path)
+    rr.upsert_places(conn, [_place("p1", "A", ["Thai"])], "Raleigh")
+    rr.set_urls(conn, {"A": "http://a/menu"})
+    rr.upsert_places(conn, [_place("p1", "A", ["Thai"])], "Raleigh")
+    assert rr.places_for_cuisine(conn, "Thai") == [("p1", "A", "http://a/menu")]
@@ -0,0 +1,52 @@
+
+import pickle
+import zlib
+import snapshot_store as ss  # module under test
+from manifest import hash_text
+
+def _store(tmp_path, keep=5):
+    return ss.SnapshotStore(str(tmp_path / "s.db"), keep)
+
+def test_identical_pages_are_stored_once_and_compressed(tmp_path):
+    """Test: two restaurants with the same page share one compressed blob."""
+    store = _store(tmp_path)
+    page = "\n".join(f"Dish {i} $9.99" for i in range(200))
+    h1 = store.put("Chain A", page)
+    h2 = store.put("Chain B", page)
+    assert h1 == h2 == hash_text(page)
+    stats = store.stats()
+    assert stats["blobs"] == 1 and stats["versions"] == 2
+    assert stats["stored_bytes"] < stats["bytes"] == len(page.encode("utf-8"))
+    data = store.conn.execute("SELECT data FROM snapshot_blobs").fetchone()[0]
+    assert zlib.decompress(data).decode("utf-8") == page
+    assert store.latest("Chain B") == page
+    assert store.latest_by_hash() == {h1: ["Chain A", "Chain B"]}
+
+def test_history_only_grows_on_change_and_evicts_old_versions(tmp_path):
+    """Test: unchanged puts add no version; versions past keep_versions and orphan blobs are dropped."""
+    store = _store(tmp_path, keep=2)
+    store.put("R", "v1")
+    store.put("R", "v1")
+    assert len(store.history("R")) == 1
+    store.put("R", "v2")
+    store.put("R", "v3")
+    assert [h for h, _ in store.history("R")] == [hash_text("v3"), hash_text("v2")]
+    assert store.get(hash_text("v1")) is None
+    assert store.stats()["blobs"] == 2
+
+def test_eviction_keeps_blobs_still_used_by_other_restaurants(tmp_path):
+    """Test: a blob evicted from one restaurant's history survives if another still refers to it."""
+    store = _store(tmp_path, keep=1)
+    store.put("A", "shared")
+    store.put("B", "shared")
+    store.put("A", "new")
+    assert store.get(hash_text("shared")) == "shared"
+    assert store.latest_by_hash() == {hash_text("new"): ["A"], hash_text("shared"): ["B"]}
+
+def test_store_sink_is_picklable_and_writes_to_the_store(tmp_path):
+    """Test: a pickled StoreSink stores text under its restaurant."""
+    db = str(tmp_path / "s.db")
+    sink = pickle.loads(pickle.dumps(ss.StoreSink(db, "R")))
+    assert sink("menu text") == hash_text("menu text")
+    assert str(sink) == "R snapshot"
+    assert ss.SnapshotStore(db).latest("R") == "menu text"
@@ -1,5 +1,7 @@
 
 import os, sqlite3
+from array import array
+import pytest
 import sqlite_connection as sc  # module under test
 
 def _fetchall(conn, q, params=()):
@@ -137,3 +139,247 @@ def test_insert_persists_after_reopen(tmp_path):
     conn2 = sqlite3.connect(str(dbp))
     rows = _fetchall(conn2, "SELECT name, price FROM local_menu")
     assert rows == [("Noodles", "$7")]
+
+def test_insert_rows_inserts_many_for_restaurant(tmp_path):
+    """Test: insert_rows writes every row with the given restaurant and returns the count."""
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    n = sc.insert_rows(conn, [("A", "$1", "DA"), ("B", "$2", "DB")], "R")
+    rows = _fetchall(conn, "SELECT name, restaurant FROM local_menu ORDER BY name")
+    assert n == 2 and rows == [("A", "R"), ("B", "R")]
+
+def test_process_file_loads_single_file_and_returns_count(tmp_path, capsys):
+    """Test: process_file loads one file, commits, and reports the row count."""
+    f = tmp_path / "R9"
+    f.write_text("A,$1,DA\nB,$2,DB\n", encoding="utf-8")
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    assert sc.process_file(conn, str(f)) == 2
+    assert "✅ 2 rows inserted from R9 (restaurant='R9')" in capsys.readouterr().out
+
+def test_process_file_keeps_multiline_quoted_descriptions(tmp_path):
+    """Test: a quoted description spanning lines is one row, not a malformed line."""
+    f = tmp_path / "R"
+    f.write_text('A,$1,"Line one,\nline two"\nB,$2,DB\n', encoding="utf-8")
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    assert sc.process_file(conn, str(f)) == 2
+    rows = _fetchall(conn, "SELECT name, description FROM local_menu ORDER BY name")
+    assert rows == [("A", "Line one,\nline two"), ("B", "DB")]
+
+def test_bulk_load_is_one_transaction_and_restores_settings(tmp_path):
+    """Test: a load into an empty table is one transaction of batched executemany calls, with indexes rebuilt after."""
+    class RecordingCursor(sqlite3.Cursor):
+        def executemany(self, sql, params):
+            params = list(params)
+            batches.append((sql.split("(")[0].strip(), len(params)))
+            return super().executemany(sql, params)
+
+    class RecordingConnection(sqlite3.Connection):
+        def cursor(self, factory=RecordingCursor):
+            return super().cursor(factory)
+
+    folder = tmp_path / "menus"
+    folder.mkdir()
+    paths = []
+    for r in range(20):
+        p = folder / f"R{r}.csv"
+        p.write_text("".join(f'Dish {i},$9.99,"Tasty, {i}"\n' for i in range(1500)), encoding="utf-8")
+        paths.append(str(p))
+    conn = sqlite3.connect(str(tmp_path / "t.db"), factory=RecordingConnection)
+    sc.create_table(conn)
+    sync = _fetchall(conn, "PRAGMA synchronous")[0][0]
+
+    batches, statements = [], []
+    conn.set_trace_callback(statements.append)
+    diffs = sc.bulk_load(conn, paths, batch_size=1000)
+    conn.set_trace_callback(None)
+    assert statements.count("BEGIN") == 1 and statements.count("COMMIT") == 1
+    assert batches == [("INSERT INTO menu_items", 1000), ("INSERT INTO menu_items", 500)] * 20
+    first_insert = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT INTO menu_items"))
+    last_insert = max(i for i, sql in enumerate(statements) if sql.startswith("INSERT INTO menu_items"))
+    dropped = [i for i, sql in enumerate(statements) if sql.startswith("DROP INDEX")]
+    created = [i for i, sql in enumerate(statements) if sql.startswith("CREATE INDEX")]
+    assert len(dropped) == len(created) == len(sc.MENU_INDEXES)
+    assert max(dropped) < first_insert and min(created) > last_insert
+    assert sum(d.inserted for d in diffs.values()) == 30000 and diffs[paths[3]] == sc.MenuDiff(inserted=1500)
+    assert _fetchall(conn, "SELECT COUNT(*) FROM local_menu WHERE restaurant = 'R7'")[0][0] == 1500
+    assert _fetchall(conn, "PRAGMA synchronous")[0][0] == sync
+    indexes = [r[0] for r in _fetchall(conn, "SELECT name FROM sqlite_master WHERE type = 'index'")]
+    assert "idx_menu_items_restaurant" in indexes
+
+    fresh = sc.connect_db(str(tmp_path / "fresh.db"))
+    sc.create_table(fresh)
+    (folder / "bad.csv").write_bytes(b"\xff\xfe not utf-8")
+    with pytest.raises(UnicodeDecodeError):
+        sc.bulk_load(fresh, [paths[0], str(folder / "bad.csv")])
+    assert _fetchall(fresh, "SELECT COUNT(*) FROM local_menu")[0][0] == 0
+    assert "idx_menu_items_restaurant" in [
+        r[0] for r in _fetchall(fresh, "SELECT name FROM sqlite_master WHERE type = 'index'")]
+
+def test_reloads_are_idempotent_and_apply_only_the_diff(tmp_path, capsys):
+    """Test: an unchanged CSV is skipped, a changed one is diffed and duplicates from old loads go away."""
+    folder = tmp_path / "menus"
+    folder.mkdir()
+    (folder / "R1").write_text("A,$1,DA\nB,$2,DB\nC,$3,DC\n", encoding="utf-8")
+    (folder / "R2").write_text("X,$9,DX\n", encoding="utf-8")
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    sc.insert_data(conn, "A", "$1", "DA", "R1")  # left over from an append-only load
+    conn.commit()
+    sc.process_all_files(conn, str(folder))
+    sc.process_all_files(conn, str(folder))
+    assert _fetchall(conn, "SELECT COUNT(*) FROM local_menu")[0][0] == 4
+    assert "⏭️ R2 unchanged since it was loaded" in capsys.readouterr().out
+
+    (folder / "R1").write_text("A,$1,DA\nB,$2.50,DB\nD,$4,DD\n", encoding="utf-8")
+    diffs = sc.process_all_files(conn, str(folder))
+    assert diffs[str(folder / "R1")] == sc.MenuDiff(inserted=1, updated=1, deleted=1, unchanged=1)
+    assert diffs[str(folder / "R2")] is None
+    assert _fetchall(conn, "SELECT name, price FROM local_menu WHERE restaurant = 'R1' ORDER BY name") == [
+        ("A", "$1"), ("B", "$2.50"), ("D", "$4")]
+    assert sc.bulk_load(conn, [str(folder / "R2")], force=True)[str(folder / "R2")] == sc.MenuDiff(unchanged=1)
+
+def test_upsert_row_and_prune_menu_replace_a_streamed_menu(tmp_path):
+    """Test: rows upserted one by one plus prune_menu leave exactly the new menu."""
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    sc.insert_rows(conn, [("A", "$1", "DA"), ("B", "$2", "DB"), ("B", "$2", "DB")], "R")
+    assert [sc.upsert_row(conn, *row, "R") for row in [("A", "$1", "DA"), ("B", "$3", "DB"), ("C", "$4", "DC"),
+                                                        ("C", "$4", "New")]] == [
+        "unchanged", "inserted", "inserted", "updated"]
+    assert sc.prune_menu(conn, "R", [("B", "$3"), ("C", "$4")]) == 3
+    assert _fetchall(conn, "SELECT name, price FROM local_menu ORDER BY name") == [("B", "$3"), ("C", "$4")]
+
+def test_dishes_listed_at_two_prices_keep_both_rows_on_every_path(tmp_path):
+    """Test: bulk loads, diffs and streamed upserts all keep one row per (dish, price)."""
+    rows = [("Fajitas (Steak)", "14.99", "Lunch"), ("Fajitas (Steak)", "20.99", "Dinner"), ("Rice", "$3", "Side")]
+    menu = tmp_path / "R"
+    menu.write_text("".join(f"{n},{p},{d}\n" for n, p, d in rows), encoding="utf-8")
+    expected = sorted(rows)
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    assert sc.bulk_load(conn, [str(menu)])[str(menu)] == sc.MenuDiff(inserted=3)
+    assert sorted(_fetchall(conn, "SELECT name, price, description FROM local_menu")) == expected
+    assert sc.sync_menu(conn, "R", rows) == sc.MenuDiff(unchanged=3)
+    for row in rows:
+        sc.upsert_row(conn, *row, "S")
+    sc.prune_menu(conn, "S", [(n, p) for n, p, _ in rows])
+    assert sorted(_fetchall(conn, "SELECT name, price, description FROM local_menu WHERE restaurant = 'S'")) == expected
+
+    diff = sc.sync_menu(conn, "R", [("Fajitas (Steak)", "15.99", "Lunch"), ("Fajitas (Steak)", "20.99", "Dinner")])
+    assert diff == sc.MenuDiff(updated=1, deleted=1, unchanged=1)
+    assert sorted(_fetchall(conn, "SELECT id, price FROM local_menu WHERE restaurant = 'R'")) == [(1, "15.99"), (2, "20.99")]
+
+def test_parse_price_handles_single_prices_ranges_and_text():
+    """Test: prices become integer cents; ranges give min and max; no number gives None."""
+    assert sc.parse_price("$9.99") == (999, 999)
+    assert sc.parse_price("9.99/12.99") == (999, 1299)
+    assert sc.parse_price("$10") == (1000, 1000)
+    assert sc.parse_price("1,299.5") == (129950, 129950)
+    assert sc.parse_price("Market price") == (None, None)
+    assert sc.parse_price(None) == (None, None)
+
+def test_parse_price_skips_quantities_and_add_ons():
+    """Test: piece counts, "2 for" deals and add-on charges are not read as prices."""
+    assert sc.parse_price("$10.00 (5pc) / $16.00 (10pc)") == (1000, 1600)
+    assert sc.parse_price("2 for $10") == (1000, 1000)
+    assert sc.parse_price("6 pcs $8.50") == (850, 850)
+    assert sc.parse_price("$9.99 (add $2 for chicken)") == (999, 999)
+    assert sc.parse_price("$12 + $3 extra cheese") == (1200, 1200)
+    assert sc.parse_price("1 lb 14.99") == (1499, 1499)
+    assert sc.parse_price("Small 9 / Large 12") == (900, 1200)
+
+def test_create_table_migrates_a_flat_local_menu(tmp_path):
+    """Test: an old flat table moves into restaurants/menu_items and stays readable as local_menu."""
+    conn = sqlite3.connect(str(tmp_path / "old.db"))
+    conn.execute("CREATE TABLE local_menu (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, "
+                  "price TEXT DEFAULT NULL, description TEXT, restaurant TEXT)")
+    conn.executemany("INSERT INTO local_menu (name, price, description, restaurant) VALUES (?, ?, ?, ?)",
+                     [("A", "$1.50", "DA", "R1"), ("B", "8/12", "DB", "R2"), ("C", None, "DC", "R1")])
+    conn.commit()
+    sc.create_table(conn)
+    assert _fetchall(conn, "SELECT type FROM sqlite_master WHERE name = 'local_menu'") == [("view",)]
+    assert _fetchall(conn, "SELECT * FROM local_menu ORDER BY id") == [
+        (1, "A", "$1.50", "DA", "R1"), (2, "B", "8/12", "DB", "R2"), (3, "C", None, "DC", "R1")]
+    assert _fetchall(conn, "SELECT name, price_cents, price_max_cents FROM menu_items ORDER BY id") == [
+        ("A", 150, 150), ("B", 800, 1200), ("C", None, None)]
+    assert _fetchall(conn, "SELECT name FROM restaurants ORDER BY id") == [("R1",), ("R2",)]
+    sc.insert_data(conn, "D", "$2", "DD", "R2")
+    assert _fetchall(conn, "SELECT id, restaurant FROM local_menu WHERE name = 'D'") == [(4, "R2")]
+
+def test_menu_search_follows_loads_edits_and_older_databases(tmp_path):
+    """Test: menu_search is rebuilt after a bulk load, tracks row edits and is added to older databases."""
+    def matches(conn, text):
+        return _fetchall(conn, "SELECT m.name FROM menu_search JOIN menu_items m ON m.id = menu_search.rowid "
+                               "WHERE menu_search MATCH ? ORDER BY m.name", (text,))
+    menu = tmp_path / "R"
+    menu.write_text('Pad Thai,$9,"Rice noodles, tofu"\nGreen Curry,$11,Coconut and basil\n', encoding="utf-8")
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    sc.bulk_load(conn, [str(menu)])
+    assert matches(conn, "noodle") == [("Pad Thai",)]
+    assert len(_fetchall(conn, "SELECT name FROM sqlite_master WHERE type = 'trigger'")) == len(sc.SEARCH_TRIGGERS)
+
+    sc.upsert_row(conn, "Green Curry", "$12", "Coconut, no basil", "R")
+    sc.prune_menu(conn, "R", [("Green Curry", "$12")])
+    conn.commit()
+    assert matches(conn, "noodle") == [] and matches(conn, "basil") == [("Green Curry",)]
+    conn.execute("INSERT INTO menu_search (menu_search) VALUES ('integrity-check')")
+
+    for name in ["menu_search", *sc.SEARCH_TRIGGERS]:
+        conn.execute(f"DROP {'TABLE' if name == 'menu_search' else 'TRIGGER'} {name}")
+    conn.commit()
+    sc.create_table(conn)
+    assert matches(conn, "coconut") == [("Green Curry",)]
+
+def test_embed_text_is_unit_length_and_ignores_filler_words():
+    """Test: embeddings are deterministic unit vectors; filler words and bare numbers add nothing."""
+    vector = sc.embed_text("Pad Thai Noodles", "Rice noodles, tofu")
+    assert len(vector) == sc.EMBEDDING_DIM and len(vector.tobytes()) == 4 * sc.EMBEDDING_DIM
+    assert abs(sum(v * v for v in vector) - 1.0) < 1e-5
+    assert list(vector) == list(sc.embed_text("pad thai noodles", "rice noodles tofu"))
+    assert list(sc.embed_text("something with noodles 12")) == list(sc.embed_text("noodles"))
+    assert not any(sc.embed_text("something with", "12"))
+
+def test_menu_vectors_follow_inserts_edits_and_deletes(tmp_path):
+    """Test: loads leave embedding to embed_missing, which fills in new and edited items; deleted items lose theirs."""
+    def vectors(conn):
+        return {name: array("f", vector) for name, vector in
+                _fetchall(conn, "SELECT m.name, v.vector FROM menu_vectors v JOIN menu_items m ON m.id = v.item_id")}
+    def embedded(*items):
+        return {name: sc.embed_text(name, description) for name, description in items}
+    def close(a, b):
+        return a.keys() == b.keys() and all(abs(x - y) < 1e-6 for k in a for x, y in zip(a[k], b[k]))
+    menu = tmp_path / "R"
+    menu.write_text("Pad Thai,$9,Rice noodles\nGreen Curry,$11,Coconut and basil\n", encoding="utf-8")
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    sc.bulk_load(conn, [str(menu)])
+    sc.insert_rows(conn, [("Pho", "$10", "Beef noodle soup")], "S")
+    assert vectors(conn) == {}
+    assert sc.embed_missing(conn) == 3 and sc.embed_missing(conn) == 0
+    assert close(vectors(conn), embedded(("Pad Thai", "Rice noodles"), ("Green Curry", "Coconut and basil"),
+                                         ("Pho", "Beef noodle soup")))
+
+    sc.upsert_row(conn, "Pho", "$10", "Chicken noodle soup", "S")
+    sc.prune_menu(conn, "R", [("Green Curry", "$11")])
+    assert vectors(conn).keys() == {"Green Curry"}
+    assert sc.embed_missing(conn, batch_size=1) == 1
+    assert close(vectors(conn), embedded(("Green Curry", "Coconut and basil"), ("Pho", "Chicken noodle soup")))
+
+def test_embed_missing_matches_embed_text_without_numpy(tmp_path, monkeypatch):
+    """Test: the NumPy batches and the pure-Python fallback store the same vectors."""
+    conn = sc.connect_db(str(tmp_path / "t.db"))
+    sc.create_table(conn)
+    rows = [("Pad Thai", "$9", "Rice noodles, tofu"), ("Something with", "$1", ""), ("Dan Dan Noodles", "$8", None)]
+    sc.insert_rows(conn, rows, "R")
+    sc.embed_missing(conn, batch_size=2)
+    batched = _fetchall(conn, "SELECT item_id, vector FROM menu_vectors ORDER BY item_id")
+    conn.execute("DELETE FROM menu_vectors")
+    monkeypatch.setattr(sc, "np", None)
+    sc.embed_missing(conn)
+    expected = _fetchall(conn, "SELECT item_id, vector FROM menu_vectors ORDER BY item_id")
+    assert [i for i, _ in batched] == [i for i, _ in expected] == [1, 2, 3]
+    assert all(abs(x - y) < 1e-6 for (_, a), (_, b) in zip(batched, expected)
+               for x, y in zip(array("f", a), array("f", b)))
@@ -0,0 +1,64 @@
+
+import threading
+import time
+import streaming as st
+
+def test_run_streaming_passes_items_through_all_stages():
+    """Test: every item reaches the sink after each stage transformed it."""
+    out = []
+    stages = [("a", lambda x: x + 1, 2), ("b", lambda x: x * 10, 3)]
+    stats = st.run_streaming(range(20), stages, out.append, queue_size=2)
+    assert sorted(out) == [(i + 1) * 10 for i in range(20)]
+    assert [s.name for s in stats] == ["a", "b", "sink"]
+    assert stats[0].items == 20 and stats[-1].items == 20
+
+def test_run_streaming_none_drops_item():
+    """Test: a stage returning None filters the item out."""
+    out = []
+    stages = [("even", lambda x: x if x % 2 == 0 else None, 2)]
+    st.run_streaming(range(10), stages, out.append)
+    assert sorted(out) == [0, 2, 4, 6, 8]
+
+def test_run_streaming_stage_error_drops_item_and_continues(capsys):
+    """Test: an exception in a stage is logged and the rest keep flowing."""
+    def f(x):
+        if x == 3:
+            raise RuntimeError("bad page")
+        return x
+    out = []
+    st.run_streaming(range(6), [("fetch", f, 2)], out.append)
+    assert sorted(out) == [0, 1, 2, 4, 5]
+    assert "fetch stage failed: bad page" in capsys.readouterr().out
+
+def test_run_streaming_sink_runs_in_calling_thread():
+    """Test: the sink is invoked on the caller's thread (safe for sqlite connections)."""
+    caller = threading.current_thread()
+    threads = set()
+    st.run_streaming(range(5), [("a", lambda x: x, 2)], lambda _: threads.add(threading.current_thread()))
+    assert threads == {caller}
+
+def test_run_streaming_first_result_arrives_before_last_item_is_processed():
+    """Test: results stream out while later items are still in flight."""
+    arrivals = []
+    def slow(x):
+        time.sleep(0.02)
+        return x
+    start = time.perf_counter()
+    st.run_streaming(range(10), [("slow", slow, 1)], lambda _: arrivals.append(time.perf_counter() - start))
+    assert arrivals[0] < arrivals[-1] / 2
+
+def test_run_streaming_bounded_queues_limit_in_flight_items():
+    """Test: a blocked sink holds back the feeder instead of buffering everything."""
+    fed = []
+    def items():
+        for i in range(100):
+            fed.append(i)
+            yield i
+    seen_when_first_sunk = []
+    def sink(_):
+        if not seen_when_first_sunk:
+            time.sleep(0.05)
+            seen_when_first_sunk.append(len(fed))
+    st.run_streaming(items(), [("a", lambda x: x, 1)], sink, queue_size=2)
+    # feeder can only be a few items ahead: two queues of 2 plus the items in hand
+    assert seen_when_first_sunk[0] <= 8
@@ -0,0 +1,60 @@
+
+import threading
+import time
+import url_resolver as ur
+
+def _query(name):
+    return f"{name}-Raleigh Menu"
+
+def test_resolve_urls_maps_every_restaurant():
+    """Test: each restaurant gets the URL for its query."""
+    urls, failures, stats = ur.resolve_urls(["A", "B"], _query, lambda q: "http://" + q[0])
+    assert urls == {"A": "http://A", "B": "http://B"}
+    assert failures == {} and stats.items == 2
+
+def test_resolve_urls_deduplicates_identical_queries():
+    """Test: restaurants sharing a (normalized) query trigger one lookup."""
+    calls = []
+    def resolve(q):
+        calls.append(q)
+        return "http://chain"
+    urls, _, _ = ur.resolve_urls(["Chain", "chain", "CHAIN"], _query, resolve)
+    assert len(calls) == 1
+    assert set(urls) == {"Chain", "chain", "CHAIN"}
+
+def test_resolve_urls_records_failures_without_aborting():
+    """Test: one failing lookup does not stop the rest of the batch."""
+    def resolve(q):
+        if q.startswith("Bad"):
+            raise Exception("No Results")
+        return "http://ok"
+    urls, failures, _ = ur.resolve_urls(["Good", "Bad", "Fine"], _query, resolve)
+    assert urls == {"Good": "http://ok", "Fine": "http://ok"}
+    assert failures == {"Bad": "No Results"}
+
+def test_resolve_urls_runs_lookups_concurrently_within_limit():
+    """Test: lookups overlap but never exceed the concurrency limit."""
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+    def resolve(q):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.03)
+        with lock:
+            state["now"] -= 1
+        return q
+    start = time.perf_counter()
+    ur.resolve_urls([str(i) for i in range(12)], _query, resolve, concurrency=4)
+    assert state["peak"] == 4
+    assert time.perf_counter() - start < 12 * 0.03
+
+def test_resolve_urls_reports_each_result_incrementally():
+    """Test: on_result fires once per restaurant, including failures."""
+    seen = []
+    def resolve(q):
+        if q.startswith("X"):
+            raise RuntimeError("boom")
+        return "u"
+    ur.resolve_urls(["A", "X"], _query, resolve, on_result=lambda *r: seen.append(r))
+    assert sorted(seen) == [("A", "u", None), ("X", None, "boom")]
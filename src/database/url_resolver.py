@@ -0,0 +1,76 @@
+"""Async batch resolution of restaurant names into menu URLs.
+
+`resolve_urls` looks up many restaurants concurrently instead of one blocking
+Custom Search request at a time:
+- identical queries (e.g., several locations of a chain) are sent only once;
+- at most `concurrency` lookups are in flight, on worker threads, so the pooled
+  `http_client` session, `rate_limiter` and `response_cache` are shared as usual;
+- a failed lookup (HTTP error, no results) is recorded for that restaurant and
+  the batch carries on;
+- `on_result` is called as each restaurant resolves, so callers can persist
+  progress incrementally and a crash loses at most the in-flight lookups.
+"""
+import asyncio
+import time
+
+from executor import StageStats
+
+
+def normalize_query(query):
+    """Collapse whitespace and case so equivalent queries deduplicate."""
+    return " ".join(query.split()).casefold()
+
+
+async def resolve_urls_async(restaurants, to_query, resolve, concurrency=8, on_result=None):
+    """Coroutine behind :func:`resolve_urls`; see there for the parameters."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    by_query = {}
+    for restaurant in restaurants:
+        by_query.setdefault(normalize_query(to_query(restaurant)), []).append(restaurant)
+
+    urls, failures = {}, {}
+
+    async def lookup(names):
+        async with semaphore:
+            try:
+                url, error = await asyncio.to_thread(resolve, to_query(names[0])), None
+            except Exception as e:
+                url, error = None, str(e) or type(e).__name__
+        for name in names:
+            if error is None:
+                urls[name] = url
+            else:
+                failures[name] = error
+            if on_result is not None:
+                on_result(name, url, error)
+
+    await asyncio.gather(*(lookup(names) for names in by_query.values()))
+    return urls, failures
+
+
+def resolve_urls(restaurants, to_query, resolve, concurrency=8, on_result=None):
+    """Resolve every restaurant to a URL concurrently, recording failures per restaurant.
+
+    Parameters
+    ----------
+    restaurants : Iterable[str]
+        Restaurant names to resolve.
+    to_query : Callable[[str], str]
+        Builds the search query for a restaurant (e.g., `"{name}-Raleigh Menu"`).
+    resolve : Callable[[str], str]
+        Blocking lookup returning the URL for a query; raising marks a failure.
+    concurrency : int, optional
+        Maximum number of lookups in flight, by default 8.
+    on_result : Callable[[str, str | None, str | None], None] | None, optional
+        Called as `on_result(restaurant, url, error)` when each restaurant finishes.
+
+    Returns
+    -------
+    tuple[dict[str, str], dict[str, str], StageStats]
+        URLs by restaurant, error messages by restaurant, and stage timing.
+    """
+    restaurants = list(restaurants)
+    start = time.perf_counter()
+    urls, failures = asyncio.run(resolve_urls_async(restaurants, to_query, resolve, concurrency, on_result))
+    stats = StageStats("url", len(restaurants), max(1, concurrency), time.perf_counter() - start)
+    return urls, failures, stats